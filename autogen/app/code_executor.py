@@ -0,0 +1,354 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import atexit
+import runpy
+import signal
+import importlib
+import threading
+import traceback
+import subprocess
+import queue
+from hashlib import md5
+from pathlib import Path
+from autogen.code_utils import PYTHON_VARIANTS, TIMEOUT_MSG
+from autogen.coding.base import CommandLineCodeResult
+from autogen.coding.markdown_code_extractor import MarkdownCodeExtractor
+from autogen.coding.local_commandline_code_executor import LocalCommandLineCodeExecutor
+from autogen.coding.utils import _get_file_name_from_content, silence_pip
+
+# Backend for the examples' generated code: "pool" (warm sandboxed interpreters) or "local" (AutoGen's executor)
+CODE_EXECUTOR = os.environ.get("CODE_EXECUTOR", "pool")
+# Warm interpreter processes per example process; bounds how many code blocks run at once
+CODE_EXEC_WORKERS = int(os.environ.get("CODE_EXEC_WORKERS", "2"))
+# Modules imported by each interpreter before it accepts code
+CODE_EXEC_PRELOAD_MODULES = os.environ.get("CODE_EXEC_PRELOAD_MODULES", "numpy,pandas,matplotlib.pyplot")
+# Seconds a code block may run before it is killed
+CODE_EXEC_TIMEOUT = float(os.environ.get("CODE_EXEC_TIMEOUT", "60"))
+# Address space limit of a running code block in MB (0 = unlimited)
+CODE_EXEC_MEMORY_MB = int(os.environ.get("CODE_EXEC_MEMORY_MB", "4096"))
+# Largest file a code block may write in MB (0 = unlimited)
+CODE_EXEC_MAX_FILE_MB = int(os.environ.get("CODE_EXEC_MAX_FILE_MB", "256"))
+# Characters of output returned to the agents; longer output keeps its head and tail
+CODE_EXEC_MAX_OUTPUT = int(os.environ.get("CODE_EXEC_MAX_OUTPUT", "20000"))
+# Parent directory of the per-run workspaces
+CODE_WORKSPACES_DIR = os.environ.get("CODE_WORKSPACES_DIR", "workspaces")
+# Most recent per-run workspaces kept; older ones are removed when a new one is created (0 = keep all)
+CODE_WORKSPACES_KEEP = int(os.environ.get("CODE_WORKSPACES_KEEP", "50"))
+
+SHELL_LANGUAGES = ("bash", "shell", "sh")
+
+# Seconds between checks on a running code block
+_POLL_INTERVAL = 0.005
+# Names of the per-run workspaces: creation time plus a random suffix
+_WORKSPACE_NAME = re.compile(r"\d{8}-\d{6}-[0-9a-f]{6}")
+
+def _set_limits(timeout, memory_mb, max_file_mb):
+    import resource
+    # The CPU limit backs up the wall-clock timeout for code that blocks signals
+    cpu_seconds = int(timeout) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+    if memory_mb:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024, memory_mb * 1024 * 1024))
+    if max_file_mb:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_mb * 1024 * 1024, max_file_mb * 1024 * 1024))
+
+def _run_files(files, work_dir):
+    """Run saved code blocks in order, stopping at the first failure; return the exit code."""
+    for language, path in files:
+        if language == "python":
+            sys.argv = [path]
+            try:
+                runpy.run_path(path, run_name="__main__")
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                if exit_code:
+                    return exit_code
+            except BaseException:
+                traceback.print_exc()
+                return 1
+        else:
+            sys.stdout.flush()
+            exit_code = subprocess.run(["bash", path], cwd=work_dir).returncode
+            if exit_code:
+                return exit_code
+    return 0
+
+def _execute_in_child(job, output_path):
+    """Fork a child that runs the job's code blocks in its workspace; return (exit_code, timed_out)."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            # The child writes its output to a file and never touches the interpreter's pipes
+            fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.dup2(fd, 1)
+            os.dup2(fd, 2)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(devnull, 0)
+            os.setsid()
+            os.chdir(job["work_dir"])
+            sys.path.insert(0, job["work_dir"])
+            _set_limits(job["timeout"], job["memory_mb"], job["max_file_mb"])
+            exit_code = _run_files(job["files"], job["work_dir"])
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
+
+    deadline = time.monotonic() + job["timeout"]
+    while True:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            return os.waitstatus_to_exitcode(status), False
+        if time.monotonic() >= deadline:
+            # The child leads its own process group, so shell commands it started are killed too
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+            return 124, True
+        time.sleep(_POLL_INTERVAL)
+
+def _interpreter_main(preload_modules):
+    """Entry point of a warm interpreter: import the heavy modules, then run jobs read from stdin."""
+    started = time.perf_counter()
+    # Keep the job protocol on private descriptors so nothing the code prints can corrupt it
+    requests = os.fdopen(os.dup(0), "r")
+    replies = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(2, 1)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for module in preload_modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"WARNING: could not preload {module}: {e}")
+    replies.write(json.dumps({"ready": time.perf_counter() - started}) + "\n")
+    replies.flush()
+
+    output_path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"code-output-{os.getpid()}.txt")
+    for line in requests:
+        job = json.loads(line)
+        exit_code, timed_out = _execute_in_child(job, output_path)
+        with open(output_path, encoding="utf-8", errors="replace") as f:
+            output = f.read()
+        os.unlink(output_path)
+        if timed_out:
+            output += "\n" + TIMEOUT_MSG
+        replies.write(json.dumps({"exit_code": exit_code, "output": output}) + "\n")
+        replies.flush()
+
+class _Interpreter:
+    """A warm interpreter process and the pipes used to send it jobs."""
+
+    def __init__(self, preload_modules):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), ",".join(preload_modules)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            env={**os.environ, "OPENBLAS_NUM_THREADS": "1", "MPLBACKEND": "Agg"}
+        )
+        self.warmup_seconds = None
+
+    def _read(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("Code interpreter exited unexpectedly")
+        return json.loads(line)
+
+    def run(self, job):
+        if self.warmup_seconds is None:
+            self.warmup_seconds = self._read()["ready"]
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        return self._read()
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+class InterpreterPool:
+    """
+    Pool of warm Python interpreters that run generated code in sandboxed children.
+
+    Each interpreter imports the data-science modules once at startup. A job
+    is run in a child forked from a warm interpreter, so it starts with pandas
+    and matplotlib already imported yet cannot change the interpreter's state.
+    The child runs in the job's workspace in its own process group, under CPU,
+    memory and file size limits, and is killed with everything it started
+    once the timeout passes.
+    """
+
+    def __init__(self, size=CODE_EXEC_WORKERS, preload_modules=CODE_EXEC_PRELOAD_MODULES):
+        self.preload_modules = [module.strip() for module in preload_modules.split(",") if module.strip()]
+        self._idle = queue.Queue()
+        # Start every interpreter now, so their warm-up overlaps the agents' first model calls
+        for _ in range(size):
+            self._idle.put(_Interpreter(self.preload_modules))
+        self.jobs = 0
+
+    def run(self, job):
+        interpreter = self._idle.get()
+        try:
+            result = interpreter.run(job)
+        except (RuntimeError, OSError, ValueError):
+            # Replace the broken interpreter and report the failure to the agent
+            interpreter.close()
+            interpreter = _Interpreter(self.preload_modules)
+            result = {"exit_code": 1, "output": "Code interpreter exited unexpectedly"}
+        finally:
+            self._idle.put(interpreter)
+        self.jobs += 1
+        return result
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the interpreter pool, starting it once per process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InterpreterPool()
+            atexit.register(_pool.close)
+        return _pool
+
+def truncate_middle(text, limit):
+    """Shorten `text` to about `limit` characters, keeping its head and tail around a marker."""
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n... [{len(text) - 2 * half} characters truncated] ...\n{text[-half:]}"
+
+def _new_workspace(parent=CODE_WORKSPACES_DIR, keep=CODE_WORKSPACES_KEEP):
+    """Create a per-run workspace under `parent` and remove the oldest ones beyond `keep`."""
+    os.makedirs(parent, exist_ok=True)
+    work_dir = os.path.join(parent, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}")
+    os.makedirs(work_dir)
+    if keep:
+        # Only directories named like the ones created here; their names sort by creation time
+        older = sorted(
+            entry.name for entry in os.scandir(parent)
+            if entry.is_dir() and _WORKSPACE_NAME.fullmatch(entry.name) and entry.path != work_dir
+        )
+        for name in older[:max(len(older) - keep + 1, 0)]:
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+    return work_dir
+
+class PooledCodeExecutor:
+    """
+    AutoGen code executor that runs code blocks on the shared InterpreterPool.
+
+    Select it with `code_execution_config={"executor": PooledCodeExecutor()}`.
+    Every executor gets its own workspace under CODE_WORKSPACES_DIR unless a
+    `work_dir` is given, so concurrent runs never overwrite each other's files.
+    Only the newest CODE_WORKSPACES_KEEP of these are kept; a given `work_dir`
+    is never removed.
+    Code blocks are saved to the workspace the same way AutoGen's local
+    executor does, including `# filename:` comments.
+    """
+
+    def __init__(self, work_dir=None, timeout=CODE_EXEC_TIMEOUT, memory_mb=CODE_EXEC_MEMORY_MB,
+                 max_file_mb=CODE_EXEC_MAX_FILE_MB, pool=None):
+        if work_dir is None:
+            work_dir = _new_workspace()
+        self.work_dir = os.path.abspath(work_dir)
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_file_mb = max_file_mb
+        self.pool = pool or get_pool()
+        self._code_extractor = MarkdownCodeExtractor()
+
+    @property
+    def code_extractor(self):
+        return self._code_extractor
+
+    def _save(self, code_block):
+        """Write a code block to the workspace; return (language, path) or an error result."""
+        language = code_block.language.lower()
+        code = silence_pip(code_block.code, language)
+        if language in PYTHON_VARIANTS:
+            language = "python"
+        if language not in ("python",) + SHELL_LANGUAGES:
+            return CommandLineCodeResult(exit_code=1, output=f"unknown language {language}")
+        LocalCommandLineCodeExecutor.sanitize_command(language, code)
+
+        try:
+            filename = _get_file_name_from_content(code, Path(self.work_dir))
+        except ValueError:
+            return CommandLineCodeResult(exit_code=1, output="Filename is not in the workspace")
+        if filename is None:
+            filename = f"tmp_code_{md5(code.encode()).hexdigest()}.{'py' if language == 'python' else 'sh'}"
+        path = os.path.join(self.work_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+        return language, path
+
+    def execute_code_blocks(self, code_blocks):
+        files = []
+        for code_block in code_blocks:
+            saved = self._save(code_block)
+            if isinstance(saved, CommandLineCodeResult):
+                return saved
+            files.append(saved)
+
+        result = self.pool.run({
+            "files": files,
+            "work_dir": self.work_dir,
+            "timeout": self.timeout,
+            "memory_mb": self.memory_mb,
+            "max_file_mb": self.max_file_mb
+        })
+        return CommandLineCodeResult(
+            exit_code=result["exit_code"],
+            output=truncate_middle(result["output"], CODE_EXEC_MAX_OUTPUT),
+            code_file=files[0][1] if files else None
+        )
+
+    def restart(self):
+        # Every job already starts from a fresh child of a warm interpreter
+        pass
+
+def code_execution_config(work_dir, **options):
+    """
+    `code_execution_config` for a UserProxyAgent, using the backend chosen by CODE_EXECUTOR.
+
+    With the pool, `work_dir` is replaced by a fresh workspace for this run;
+    use `code_work_dir(agent)` to find it.
+    """
+    if CODE_EXECUTOR == "local":
+        return {"work_dir": work_dir, "use_docker": False, **options}
+    return {"executor": PooledCodeExecutor(), **options}
+
+def code_work_dir(agent):
+    """The directory an agent's code blocks run in."""
+    executor = agent.code_executor
+    if isinstance(executor, PooledCodeExecutor):
+        return executor.work_dir
+    return os.path.abspath(agent._code_execution_config.get("work_dir") or ".")
+
+if __name__ == "__main__":
+    try:
+        _interpreter_main([module for module in sys.argv[1].split(",") if module])
+    except BrokenPipeError:
+        # The process that started the interpreter has exited
+        os._exit(0)
@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 from autogen.agentchat.assistant_agent import AssistantAgent
 from autogen.agentchat.user_proxy_agent import UserProxyAgent
 from llm_config import LLMConfig
+from code_executor import code_execution_config, code_work_dir
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -65,15 +66,13 @@ user_proxy = UserProxyAgent(
     human_input_mode="NEVER",
     max_consecutive_auto_reply=5,
     is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
-    code_execution_config={
-        "work_dir": "workspace",
-        "use_docker": False,  # Set to True to execute code in Docker
-    }
+    # Runs code on the warm sandboxed interpreter pool; CODE_EXECUTOR=local uses the "workspace" directory instead
+    code_execution_config=code_execution_config("workspace")
 )
 
 if __name__ == "__main__":
     # Create workspace directory and dataset
-    workspace_dir = os.path.join(os.getcwd(), "workspace")
+    workspace_dir = code_work_dir(user_proxy)
     data_path = create_temperature_data(workspace_dir)
     
     print("Starting AutoGen code generation example...")
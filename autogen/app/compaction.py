@@ -0,0 +1,217 @@
+import os
+import copy
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from autogen.oai.client import OpenAIWrapper
+from autogen.agentchat.contrib.capabilities.transform_messages import TransformMessages
+from code_executor import truncate_middle
+
+# Set to "on" to compact the transcripts the example agents send to the model
+TRANSCRIPT_COMPACTION = os.environ.get("TRANSCRIPT_COMPACTION", "off")
+# Approximate tokens of recent messages each agent sends verbatim; older ones are summarized
+COMPACTION_TOKEN_BUDGET = int(os.environ.get("COMPACTION_TOKEN_BUDGET", "2000"))
+# Approximate tokens of a code execution output kept, split between its head and tail
+COMPACTION_CODE_OUTPUT_TOKENS = int(os.environ.get("COMPACTION_CODE_OUTPUT_TOKENS", "400"))
+# Words the running summary of older messages may use
+COMPACTION_SUMMARY_WORDS = int(os.environ.get("COMPACTION_SUMMARY_WORDS", "200"))
+
+# Recent messages always sent verbatim, even when they exceed the budget on their own
+_KEEP_LAST_MESSAGES = 2
+
+# Transforms of the agents add_compaction was applied to, for summarize_ahead
+_summarizers = weakref.WeakKeyDictionary()
+# Summaries are written off the reply path; a few threads cover the agents of one chat
+_summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="compaction")
+
+SUMMARY_SYSTEM_MESSAGE = """You keep a running summary of a conversation between several participants.
+Update the current summary with the new messages. Keep names, decisions, facts, numbers, file paths,
+errors and open questions; drop pleasantries and repetition. Reply with the updated summary only."""
+
+def estimate_tokens(text):
+    """Rough token count (4 characters per token); avoids loading a tokenizer for every turn."""
+    return len(text or "") // 4 + 1
+
+def _content(message):
+    content = message.get("content")
+    return content if isinstance(content, str) else ""
+
+def _window_start(messages, budget):
+    """Index of the oldest message that, with the ones after it, still fits in `budget` tokens."""
+    used = 0
+    start = len(messages)
+    while start > 0:
+        tokens = estimate_tokens(_content(messages[start - 1]))
+        if len(messages) - start >= _KEEP_LAST_MESSAGES and used + tokens > budget:
+            break
+        used += tokens
+        start -= 1
+    return start
+
+class CodeOutputTruncator:
+    """Transform that shortens large code execution outputs to their head and tail."""
+
+    MARKER = "Code output:"
+
+    def __init__(self, max_tokens=COMPACTION_CODE_OUTPUT_TOKENS):
+        self.max_chars = max_tokens * 4
+
+    def apply_transform(self, messages):
+        for message in messages:
+            content = _content(message)
+            if not content.startswith("exitcode:") or self.MARKER not in content:
+                continue
+            header, output = content.split(self.MARKER, 1)
+            if len(output) > self.max_chars:
+                message["content"] = f"{header}{self.MARKER}{truncate_middle(output, self.max_chars)}"
+        return messages
+
+    def get_logs(self, pre_transform_messages, post_transform_messages):
+        saved = sum(len(_content(m)) for m in pre_transform_messages) - sum(len(_content(m)) for m in post_transform_messages)
+        return f"Truncated code outputs by {saved} characters.", saved > 0
+
+class IncrementalSummarizer:
+    """
+    Transform that keeps an agent's transcript within a token budget.
+
+    The most recent messages that fit in `max_tokens` are sent verbatim. Older
+    ones are folded into a running summary that is only extended with the
+    messages that left the window since it was last extended. When the budget
+    is exceeded the summary is extended in the background, down to half the
+    budget, so the next few turns need no summarization call and no turn waits
+    for one; until it is ready the turn is sent with the previous summary and
+    a few more verbatim messages than the budget allows. The summary is kept
+    per transcript and starts over when the agent's conversation is cleared.
+    """
+
+    SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+    def __init__(self, llm_config, max_tokens=COMPACTION_TOKEN_BUDGET, summary_words=COMPACTION_SUMMARY_WORDS, name="summary"):
+        self.client = OpenAIWrapper(**llm_config)
+        self.max_tokens = max_tokens
+        self.summary_words = summary_words
+        self.name = name
+        self.summary = ""
+        self._summarized = 0
+        self._first_message = None
+        self._pending = None
+        # Speculative replies can compact the same transcript from another thread
+        self._lock = threading.Lock()
+
+    def _summarize(self, summary, new_messages, end):
+        transcript = "\n\n".join(f"{m.get('name') or m.get('role')}: {_content(m)}" for m in new_messages)
+        response = self.client.create(
+            messages=[
+                {"role": "system", "content": SUMMARY_SYSTEM_MESSAGE},
+                {"role": "user", "content": (
+                    f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}\n\n"
+                    f"Updated summary in at most {self.summary_words} words:"
+                )}
+            ],
+            # Roughly 2 tokens per word leaves room for names and numbers
+            max_tokens=2 * self.summary_words,
+            agent=self.name
+        )
+        return self.client.extract_text_or_completion_object(response)[0] or summary, end
+
+    def _collect(self):
+        # Take the background summary if it has finished
+        if self._pending is None or not self._pending.done():
+            return
+        future, self._pending = self._pending, None
+        try:
+            self.summary, self._summarized = future.result()
+        except Exception as e:
+            print(f"WARNING: Could not summarize the transcript of {self.name}: {str(e)}")
+
+    def _update(self, messages):
+        if _content(messages[0]) != self._first_message or len(messages) < self._summarized:
+            # A new conversation: forget the old summary, and any being written
+            self.summary = ""
+            self._summarized = 0
+            self._first_message = _content(messages[0])
+            self._pending = None
+        self._collect()
+
+        start = max(_window_start(messages, self.max_tokens), self._summarized)
+        if start > self._summarized and self._pending is None:
+            end = max(_window_start(messages, self.max_tokens // 2), start)
+            self._pending = _summary_executor.submit(self._summarize, self.summary, messages[self._summarized:end], end)
+
+    def summarize_ahead(self, messages):
+        """Start extending the summary for a transcript that just grew, before the agent is asked to reply."""
+        if messages:
+            with self._lock:
+                self._update(messages)
+
+    def apply_transform(self, messages):
+        if not messages:
+            return messages
+        with self._lock:
+            self._update(messages)
+            if self._summarized == 0:
+                return messages
+            summary = {"role": "user", "content": f"{self.SUMMARY_PREFIX}\n{self.summary}"}
+            return [summary] + messages[self._summarized:]
+
+    def get_logs(self, pre_transform_messages, post_transform_messages):
+        if not post_transform_messages or not _content(post_transform_messages[0]).startswith(self.SUMMARY_PREFIX):
+            return "", False
+        compacted = len(pre_transform_messages) - len(post_transform_messages) + 1
+        return f"Replaced {compacted} earlier messages with a summary.", True
+
+class SelectionWindow:
+    """
+    Transform for the speaker selection prompt: the opening task plus the newest messages within `max_tokens`.
+
+    Picking the next speaker only needs the task and the latest turns, so
+    unlike IncrementalSummarizer it makes no model calls; the messages in
+    between are replaced with a one-line note.
+    """
+
+    def __init__(self, max_tokens=COMPACTION_TOKEN_BUDGET):
+        self.max_tokens = max_tokens
+
+    def apply_transform(self, messages):
+        if len(messages) <= _KEEP_LAST_MESSAGES + 1:
+            return messages
+        budget = self.max_tokens - estimate_tokens(_content(messages[0]))
+        start = max(_window_start(messages, budget), 1)
+        if start == 1:
+            return messages
+        note = {"role": "user", "content": f"[{start - 1} earlier messages omitted]"}
+        return [messages[0], note] + messages[start:]
+
+    def get_logs(self, pre_transform_messages, post_transform_messages):
+        omitted = len(pre_transform_messages) - len(post_transform_messages)
+        return f"Omitted {omitted} messages from speaker selection.", omitted > 0
+
+def add_compaction(agent, llm_config, max_tokens=COMPACTION_TOKEN_BUDGET, code_output_tokens=COMPACTION_CODE_OUTPUT_TOKENS, summarizer=None):
+    """
+    Compact the transcript `agent` sends to the model: truncate code outputs, then summarize old turns.
+
+    Agents of one group chat all receive the same messages, so they can share
+    a `summarizer` and each part of the chat is summarized once for all of them.
+    """
+    truncator = CodeOutputTruncator(code_output_tokens)
+    summarizer = summarizer or IncrementalSummarizer(llm_config, max_tokens=max_tokens, name=f"{agent.name} (summary)")
+    TransformMessages(transforms=[truncator, summarizer], verbose=False).add_to_agent(agent)
+    _summarizers[agent] = (truncator, summarizer)
+
+def summarize_ahead(manager):
+    """
+    Let a group chat manager start the summaries of compacted agents as it broadcasts to them.
+
+    Agents in a group chat only reply every few rounds, so summarizing when
+    they are picked would always be a turn behind; the manager sends every
+    message to every agent, so the summary can be brought up to date then.
+    """
+    def hook(sender, message, recipient, silent):
+        if recipient in _summarizers:
+            truncator, summarizer = _summarizers[recipient]
+            received = message if isinstance(message, dict) else {"content": message}
+            messages = copy.deepcopy(recipient.chat_messages[sender]) + [dict(received, role="user")]
+            summarizer.summarize_ahead(truncator.apply_transform(messages))
+        return message
+
+    manager.register_hook("process_message_before_send", hook)
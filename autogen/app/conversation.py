@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import uuid
+import queue
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from autogen.agentchat.assistant_agent import AssistantAgent
+from autogen.agentchat.user_proxy_agent import UserProxyAgent
+from llm_config import LLMConfig
+from metrics import registry
+import telemetry
+
+# Threads running conversations; bounds how many chats talk to the model at once
+CONVERSATION_WORKERS = int(os.environ.get("CONVERSATION_WORKERS", "8"))
+# Conversations allowed to wait for a thread before new ones are rejected
+CONVERSATION_QUEUE_SIZE = int(os.environ.get("CONVERSATION_QUEUE_SIZE", "32"))
+
+ASSISTANT_SYSTEM_MESSAGE = """You are a helpful AI assistant chatting with a user through a web page.
+Answer the user's message directly and concisely."""
+
+_SECONDS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+class ConversationQueueFullError(Exception):
+    """Raised when every conversation thread is busy and the wait queue is full."""
+
+class AgentPair:
+    """An assistant and the user proxy that talks to it on behalf of the web user."""
+
+    def __init__(self, llm_config):
+        self.assistant = AssistantAgent(
+            name="assistant",
+            llm_config=llm_config,
+            system_message=ASSISTANT_SYSTEM_MESSAGE
+        )
+        # The web user is the only human; the proxy just relays their message
+        self.user_proxy = UserProxyAgent(
+            name="user",
+            human_input_mode="NEVER",
+            max_consecutive_auto_reply=0,
+            code_execution_config=False
+        )
+
+    def chat(self, message, conversation_id=None):
+        """Send one message to the assistant and return the exchange."""
+        with telemetry.conversation(conversation_id):
+            result = self.user_proxy.initiate_chat(self.assistant, message=message, clear_history=True, silent=True)
+        return [
+            {"role": "user" if item.get("name") == self.user_proxy.name else "assistant", "content": item.get("content") or ""}
+            for item in result.chat_history
+        ]
+
+@functools.lru_cache(maxsize=None)
+def _llm_config(provider):
+    # The configuration only depends on environment variables, so build it once per provider
+    return LLMConfig.get_config(provider)
+
+class ConversationRunner:
+    """
+    Runs web UI conversations on a bounded thread pool with reusable agents.
+
+    `initiate_chat` is synchronous, so each conversation runs on one of
+    `workers` threads instead of blocking the event loop. Agent pairs are
+    built once per provider/configuration and reused: a conversation checks a
+    pair out, clears its history, and returns it when done, so concurrent
+    conversations never share an agent.
+    """
+
+    def __init__(self, workers=CONVERSATION_WORKERS, queue_size=CONVERSATION_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="conversation")
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.pending = 0
+
+        self.conversation_seconds = registry.histogram(
+            "conversation_seconds", "Wall time of /run_conversation chats", _SECONDS_BUCKETS, ("provider",)
+        )
+        self.conversations_total = registry.counter(
+            "conversations_total", "Conversations by provider and outcome", ("provider", "status")
+        )
+        self.agent_pairs_created = registry.counter(
+            "conversation_agent_pairs_created_total", "Agent pairs built for conversations", ("provider",)
+        )
+        registry.gauge("conversations_pending", "Conversations running or waiting for a thread", lambda: self.pending)
+        registry.gauge("conversation_agent_pairs_idle", "Agent pairs ready for reuse", self.idle_pairs)
+
+    def idle_pairs(self):
+        with self._lock:
+            return sum(pairs.qsize() for pairs in self._idle.values())
+
+    def _checkout(self, provider):
+        llm_config = _llm_config(provider)
+        key = (provider, json.dumps(llm_config, sort_keys=True, default=str))
+        with self._lock:
+            pairs = self._idle.setdefault(key, queue.LifoQueue())
+        try:
+            return key, pairs.get_nowait()
+        except queue.Empty:
+            self.agent_pairs_created.inc(provider=provider)
+            return key, AgentPair(llm_config)
+
+    def _chat(self, provider, message):
+        key, pair = self._checkout(provider)
+        try:
+            # Tag the agent turns of this conversation in the telemetry trace
+            return pair.chat(message, conversation_id=uuid.uuid4().hex[:12])
+        finally:
+            self._idle[key].put(pair)
+
+    async def run(self, provider, message):
+        """Run a conversation, raising ConversationQueueFullError if too many are waiting."""
+        if self.pending >= self.workers + self.queue_size:
+            self.conversations_total.inc(provider=provider, status="rejected")
+            raise ConversationQueueFullError(f"{self.pending} conversations are already in progress")
+
+        self.pending += 1
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            loop = asyncio.get_running_loop()
+            history = await loop.run_in_executor(self._executor, self._chat, provider, message)
+            status = "succeeded"
+            return history
+        finally:
+            self.pending -= 1
+            self.conversation_seconds.observe(time.perf_counter() - start, provider=provider)
+            self.conversations_total.inc(provider=provider, status=status)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,219 @@
+import os
+import copy
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from autogen.agentchat.conversable_agent import ConversableAgent
+from autogen.agentchat.groupchat import GroupChat
+
+# Speaker selection for the group chat examples: "auto" (an LLM call every round) or "fast" (rules and speculation)
+GROUPCHAT_MODE = os.environ.get("GROUPCHAT_MODE", "auto")
+# Likely next speakers whose replies are generated while the LLM picks the speaker (0 disables speculation)
+GROUPCHAT_SPECULATION = int(os.environ.get("GROUPCHAT_SPECULATION", "1"))
+
+@dataclass
+class TimedGroupChat(GroupChat):
+    """
+    GroupChat that records how long each round spends selecting the speaker and generating the reply.
+
+    An optional `selection_transform` (anything with `apply_transform(messages)`,
+    e.g. compaction.SelectionWindow) shortens the transcript the manager's LLM
+    reads when it picks the next speaker.
+    """
+
+    selection_transform: Optional[object] = None
+
+    def __post_init__(self):
+        super().__post_init__()
+        # The manager runs the chat on a shallow copy of the group chat, so keep all state in this shared list
+        self.rounds = []
+
+    def select_speaker(self, last_speaker, selector):
+        now = time.perf_counter()
+        self._close_round(now)
+        speaker = super().select_speaker(last_speaker, selector)
+        self.rounds.append({"speaker": speaker.name, "started": now, "selection_seconds": time.perf_counter() - now})
+        return speaker
+
+    def _auto_select_speaker(self, last_speaker, selector, messages, agents):
+        if self.selection_transform is not None:
+            messages = self.selection_transform.apply_transform(copy.deepcopy(messages))
+        return super()._auto_select_speaker(last_speaker, selector, messages, agents)
+
+    def _close_round(self, now):
+        # A round ends when the next speaker selection starts
+        if self.rounds and "round_seconds" not in self.rounds[-1]:
+            self.rounds[-1]["round_seconds"] = now - self.rounds[-1]["started"]
+
+    def report(self):
+        """Return the per-round timings, closing the round still in progress."""
+        self._close_round(time.perf_counter())
+        for entry in self.rounds:
+            entry["reply_seconds"] = entry["round_seconds"] - entry["selection_seconds"]
+        return self.rounds
+
+def print_round_timings(groupchat):
+    """Print the round-by-round wall time of a TimedGroupChat."""
+    rounds = groupchat.report()
+    print(f"\n{'round':>5}  {'speaker':<16} {'select s':>9} {'reply s':>9} {'total s':>9}")
+    for i, entry in enumerate(rounds, 1):
+        print(f"{i:>5}  {entry['speaker']:<16} {entry['selection_seconds']:>9.2f} "
+              f"{entry['reply_seconds']:>9.2f} {entry['round_seconds']:>9.2f}")
+    total = sum(entry["round_seconds"] for entry in rounds)
+    selection = sum(entry["selection_seconds"] for entry in rounds)
+    print(f"{'':>5}  {'total':<16} {selection:>9.2f} {total - selection:>9.2f} {total:>9.2f}")
+
+class FastSpeakerSelector:
+    """
+    Speaker selection for GroupChat that avoids serial LLM round trips.
+
+    Pass an instance as `speaker_selection_method`. Each round it first tries
+    the `rules`: callables taking (last_speaker, groupchat) and returning the
+    name of the next speaker or None. When a rule matches, no LLM call is made
+    to pick the speaker. Otherwise it falls back to AutoGen's "auto" selection,
+    and while the manager's LLM picks the speaker, the replies of the
+    `speculation` most likely speakers are generated in parallel. Likely
+    speakers are the ones that most often followed the last speaker so far in
+    this chat. If the pick matches one of them its reply is used as is, so the
+    round costs one LLM round trip instead of two; otherwise it is discarded.
+
+    Only LLM agents without code execution are speculated for, since
+    generating their reply has no side effects.
+    """
+
+    def __init__(self, rules=(), speculation=GROUPCHAT_SPECULATION):
+        self.rules = list(rules)
+        self.speculation = speculation
+        self.transitions = defaultdict(Counter)
+        # Room for one round of speculation plus the discarded ones still finishing
+        self._executor = ThreadPoolExecutor(max_workers=max(1, 2 * speculation), thread_name_prefix="speculation")
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._installed = set()
+        self._previous_speaker = None
+        self.rule_hits = 0
+        self.llm_selections = 0
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+
+    def __call__(self, last_speaker, groupchat):
+        # The speaker picked last round is the one that just spoke
+        if self._previous_speaker is not None:
+            self.transitions[self._previous_speaker][last_speaker.name] += 1
+        self._previous_speaker = last_speaker.name
+        self._discard_pending()
+
+        for rule in self.rules:
+            name = rule(last_speaker, groupchat)
+            if name:
+                self.rule_hits += 1
+                return groupchat.agent_by_name(name)
+
+        self.llm_selections += 1
+        self._speculate(last_speaker, groupchat)
+        return "auto"
+
+    def _candidates(self, last_speaker, groupchat):
+        eligible = [
+            agent for agent in groupchat.agents
+            if agent is not last_speaker and self._can_speculate(agent)
+        ]
+        seen = self.transitions[last_speaker.name]
+        # Most frequent successors first, then the group order
+        eligible.sort(key=lambda agent: -seen[agent.name])
+        return eligible[:self.speculation]
+
+    @staticmethod
+    def _can_speculate(agent):
+        return isinstance(agent, ConversableAgent) and agent.llm_config and not agent._code_execution_config
+
+    def _speculate(self, last_speaker, groupchat):
+        manager = self._manager(groupchat)
+        if manager is None or not self.speculation:
+            return
+        for agent in self._candidates(last_speaker, groupchat):
+            self._install(agent, groupchat)
+            # The manager already broadcast the last message, so the agent's view is final for this round
+            messages = list(agent.chat_messages[manager])
+            future = self._executor.submit(self._generate, agent, messages, manager)
+            with self._lock:
+                self._pending[agent.name] = (len(groupchat.messages), future)
+
+    @staticmethod
+    def _generate(agent, messages, manager):
+        # Apply the agent's message hooks (e.g. transcript compaction) as its regular reply would
+        messages = agent.process_all_messages_before_reply(messages)
+        return agent.generate_oai_reply(messages=messages, sender=manager)
+
+    @staticmethod
+    def _manager(groupchat):
+        # The manager is the agent every participant is chatting with; it holds a copy of the group chat sharing its messages
+        for agent in groupchat.agents:
+            for partner in agent.chat_messages:
+                if getattr(getattr(partner, "groupchat", None), "messages", None) is groupchat.messages:
+                    return partner
+        return None
+
+    def _install(self, agent, groupchat):
+        """Register the reply function that hands out speculative replies, just before the LLM reply."""
+        if agent.name in self._installed:
+            return
+        position = next(
+            i for i, entry in enumerate(agent._reply_func_list)
+            if entry["reply_func"] is ConversableAgent.generate_oai_reply
+        )
+        selector = self
+
+        def speculative_reply(recipient, messages=None, sender=None, config=None):
+            with selector._lock:
+                pending = selector._pending.pop(recipient.name, None)
+            if pending is None or pending[0] != len(groupchat.messages):
+                return False, None
+            try:
+                final, reply = pending[1].result()
+            except Exception:
+                # Let the regular reply function try again
+                return False, None
+            selector.speculation_hits += 1
+            return final, reply
+
+        agent.register_reply([ConversableAgent, None], speculative_reply, position=position)
+        self._installed.add(agent.name)
+
+    def _discard_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for _, future in pending.values():
+            future.cancel()
+            self.speculation_misses += 1
+
+    def stats(self):
+        return {
+            "rule_selections": self.rule_hits,
+            "llm_selections": self.llm_selections,
+            "speculation_hits": self.speculation_hits,
+            "speculation_misses": self.speculation_misses
+        }
+
+    def shutdown(self):
+        self._discard_pending()
+        self._executor.shutdown(wait=False)
+
+def code_execution_rule(executor_name):
+    """Rule: after a message with a code block from anyone else, the code executor speaks."""
+    def rule(last_speaker, groupchat):
+        if last_speaker.name != executor_name and "```" in (groupchat.messages[-1].get("content") or ""):
+            return executor_name
+        return None
+    return rule
+
+def failed_execution_rule(executor_name, fixer_name):
+    """Rule: after the code executor reports a failure, the fixer speaks."""
+    def rule(last_speaker, groupchat):
+        if last_speaker.name == executor_name and "exitcode: 1" in (groupchat.messages[-1].get("content") or ""):
+            return fixer_name
+        return None
+    return rule
@@ -0,0 +1,207 @@
+import os
+import time
+import atexit
+import pickle
+import sqlite3
+import threading
+
+# Response cache used by every agent: "sqlite" (shared, bounded), "disk" (AutoGen's per-seed cache) or "off"
+LLM_CACHE = os.environ.get("LLM_CACHE", "sqlite")
+# SQLite file shared by the web UI and every example run
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.sqlite3")
+)
+# Total size of cached responses before the least recently used ones are evicted
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a cached response stays valid
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
+
+class SQLiteResponseStore:
+    """
+    Size-bounded LLM response store in a single SQLite file.
+
+    The file is opened in WAL mode so the web UI and parallel example runs can
+    read and write it at the same time. Entries expire after `ttl` seconds and
+    the least recently used ones are evicted once the stored responses exceed
+    `max_bytes`. Hit and miss counts are kept in the file as well, so they
+    cover every process using the cache; each process counts them in memory
+    and adds them to the file with its next write, at most every
+    `STATS_FLUSH_INTERVAL` seconds otherwise, and on close.
+    """
+
+    # Run the eviction sweep once every this many writes
+    SWEEP_INTERVAL = 50
+    # Only refresh an entry's last access time if it is older than this, to keep hits read-mostly
+    TOUCH_INTERVAL = 60
+    # Seconds between writes of the hit and miss counts when nothing else is written
+    STATS_FLUSH_INTERVAL = 10
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL_SECONDS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stats ("
+            "namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL DEFAULT 0, misses INTEGER NOT NULL DEFAULT 0, "
+            "evictions INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+        self._writes = 0
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+
+    def _count(self, namespace, column, amount=1):
+        self._conn.execute("INSERT OR IGNORE INTO stats (namespace) VALUES (?)", (namespace,))
+        self._conn.execute(f"UPDATE stats SET {column} = {column} + ? WHERE namespace = ?", (amount, namespace))
+
+    def _count_later(self, namespace, column):
+        counts = self._pending.setdefault(namespace, {"hits": 0, "misses": 0})
+        counts[column] += 1
+
+    def _flush_counts(self):
+        for namespace, counts in self._pending.items():
+            for column, amount in counts.items():
+                if amount:
+                    self._count(namespace, column, amount)
+        self._pending.clear()
+        self._flushed_at = time.monotonic()
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, accessed_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            hit = row is not None and now - row[1] < self.ttl
+            self._count_later(namespace, "hits" if hit else "misses")
+            write = time.monotonic() - self._flushed_at >= self.STATS_FLUSH_INTERVAL
+            if hit and now - row[2] >= self.TOUCH_INTERVAL:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                write = True
+            if write:
+                self._flush_counts()
+                self._conn.commit()
+        return pickle.loads(row[0]) if hit else None
+
+    def set(self, namespace, key, value):
+        data = pickle.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, namespace, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, data, len(data), now, now)
+            )
+            self._writes += 1
+            if self._writes % self.SWEEP_INTERVAL == 0:
+                self._sweep(now)
+            self._flush_counts()
+            self._conn.commit()
+
+    def _sweep(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of the cap so the next few writes do not trigger another sweep
+        excess = total - int(self.max_bytes * 0.9)
+        evicted = []
+        for key, namespace, size in self._conn.execute(
+            "SELECT key, namespace, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if excess <= 0:
+                break
+            evicted.append((key, namespace))
+            excess -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in evicted])
+        for _, namespace in evicted:
+            self._count(namespace, "evictions")
+
+    def flush(self):
+        """Write this process's pending hit and miss counts to the file."""
+        with self._lock:
+            if self._pending:
+                self._flush_counts()
+                self._conn.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def metrics(self):
+        self.flush()
+        with self._lock:
+            sizes = self._conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM responses GROUP BY namespace"
+            ).fetchall()
+            stats = self._conn.execute("SELECT namespace, hits, misses, evictions FROM stats").fetchall()
+        namespaces = {}
+        for namespace, entries, size in sizes:
+            namespaces[namespace] = {"entries": entries, "bytes": size, "hits": 0, "misses": 0, "evictions": 0}
+        for namespace, hits, misses, evictions in stats:
+            entry = namespaces.setdefault(namespace, {"entries": 0, "bytes": 0})
+            entry.update({"hits": hits, "misses": misses, "evictions": evictions})
+        return namespaces
+
+class LLMResponseCache:
+    """
+    AutoGen cache for one provider and model, backed by the shared response store.
+
+    AutoGen's cache keys are derived from the request parameters only, so they
+    are prefixed with the provider and model to keep providers that serve the
+    same model name apart.
+    """
+
+    def __init__(self, store, provider, model):
+        self.store = store
+        self.namespace = f"{provider}:{model}"
+
+    def get(self, key, default=None):
+        value = self.store.get(self.namespace, f"{self.namespace}:{key}")
+        return default if value is None else value
+
+    def set(self, key, value):
+        self.store.set(self.namespace, f"{self.namespace}:{key}", value)
+
+    def close(self):
+        # The store is shared by every agent in the process and stays open
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __deepcopy__(self, memo):
+        # Agents deep-copy their llm_config; every copy must use the same store
+        return self
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path=LLM_CACHE_PATH):
+    """Return the response store for `path`, opening it once per process."""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SQLiteResponseStore(path)
+            # Keep the hit and miss counts of runs that end between flushes
+            atexit.register(_stores[path].flush)
+        return _stores[path]
+
+def get_cache(provider, model):
+    """Return the response cache for a provider and model."""
+    return LLMResponseCache(get_store(), provider, model)
@@ -1,9 +1,21 @@
 import os
+import json
 from dotenv import load_dotenv
+from llm_cache import LLM_CACHE, get_cache
+from llm_router import route_config_list
+import telemetry
 
 # Load environment variables from .env file if present
 load_dotenv()
 
+# JSON file with the endpoints of each provider, e.g. {"lm_studio": [{"base_url": "...", "model": "..."}]}
+LLM_ENDPOINTS_FILE = os.environ.get("LLM_ENDPOINTS_FILE")
+# Route requests across a provider's endpoints by latency and health ("on"), or let AutoGen try them in order ("off")
+LLM_ROUTER = os.environ.get("LLM_ROUTER", "on")
+
+# Prefix of the environment variables configuring each provider
+ENV_PREFIXES = {"openai": "OPENAI", "lm_studio": "LM_STUDIO", "deepseek": "DEEPSEEK"}
+
 class LLMConfig:
     """Utility class for managing LLM configurations."""
     
@@ -14,12 +26,10 @@ class LLMConfig:
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
         
-        config_list = [
-            {
-                "model": "gpt-4o-mini",
-                "api_key": api_key,
-            }
-        ]
+        config_list = LLMConfig.get_endpoints("openai", {
+            "model": "gpt-4o-mini",
+            "api_key": api_key,
+        })
         
         llm_config = {
             "config_list": config_list,
@@ -34,16 +44,14 @@ class LLMConfig:
         base_url = os.environ.get("LM_STUDIO_BASE_URL", "http://host.docker.internal:1234/v1")
         model = os.environ.get("LM_STUDIO_MODEL", "default_model")
         
-        print(f"Connecting to LM Studio at: {base_url}")
+        config_list = LLMConfig.get_endpoints("lm_studio", {
+            "model": model,
+            "base_url": base_url,
+            "api_key": "not-needed",  # LM Studio doesn't require an API key
+            "price": [0.0, 0.0]  # Add pricing information [prompt_price_per_1k, completion_price_per_1k]
+        })
         
-        config_list = [
-            {
-                "model": model,
-                "base_url": base_url,
-                "api_key": "not-needed",  # LM Studio doesn't require an API key
-                "price": [0.0, 0.0]  # Add pricing information [prompt_price_per_1k, completion_price_per_1k]
-            }
-        ]
+        print(f"Connecting to LM Studio at: {', '.join(entry['base_url'] for entry in config_list)}")
         
         llm_config = {
             "config_list": config_list,
@@ -62,16 +70,14 @@ class LLMConfig:
         base_url = os.environ.get("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
         model = os.environ.get("DEEPSEEK_MODEL", "deepseek-reasoner")
         
-        print(f"Connecting to DeepSeek API at: {base_url}")
+        config_list = LLMConfig.get_endpoints("deepseek", {
+            "model": model,
+            "base_url": base_url,
+            "api_key": api_key,
+            "price": [0.0005, 0.0015]  # Approximate pricing [prompt_price_per_1k, completion_price_per_1k]
+        })
         
-        config_list = [
-            {
-                "model": model,
-                "base_url": base_url,
-                "api_key": api_key,
-                "price": [0.0005, 0.0015]  # Approximate pricing [prompt_price_per_1k, completion_price_per_1k]
-            }
-        ]
+        print(f"Connecting to DeepSeek API at: {', '.join(entry['base_url'] for entry in config_list)}")
         
         llm_config = {
             "config_list": config_list,
@@ -80,14 +86,58 @@ class LLMConfig:
         
         return llm_config
     
+    @staticmethod
+    def get_endpoints(provider, default):
+        """
+        Build the config list of a provider's endpoints.
+        
+        Endpoints come from LLM_ENDPOINTS_FILE, or from a comma-separated
+        <PROVIDER>_BASE_URLS variable. Each endpoint inherits the settings of
+        `default` that it does not override. Without either, `default` is the only endpoint.
+        """
+        if LLM_ENDPOINTS_FILE:
+            with open(LLM_ENDPOINTS_FILE) as f:
+                endpoints = json.load(f).get(provider)
+            if endpoints:
+                return [{**default, **endpoint} for endpoint in endpoints]
+        
+        base_urls = os.environ.get(f"{ENV_PREFIXES[provider]}_BASE_URLS")
+        if base_urls:
+            return [{**default, "base_url": url.strip()} for url in base_urls.split(",") if url.strip()]
+        
+        return [default]
+    
     @staticmethod
     def get_config(provider="openai"):
         """Get LLM configuration based on provider."""
         if provider == "openai":
-            return LLMConfig.get_openai_config()
+            llm_config = LLMConfig.get_openai_config()
         elif provider == "lm_studio":
-            return LLMConfig.get_lm_studio_config()
+            llm_config = LLMConfig.get_lm_studio_config()
         elif provider == "deepseek":
-            return LLMConfig.get_deepseek_config()
+            llm_config = LLMConfig.get_deepseek_config()
         else:
-            raise ValueError(f"Unsupported provider: {provider}") 
\ No newline at end of file
+            raise ValueError(f"Unsupported provider: {provider}")
+        
+        if LLM_ROUTER == "on":
+            llm_config["config_list"] = route_config_list(provider, llm_config["config_list"])
+        
+        # Record tokens, latency and cost of every agent turn
+        if telemetry.start() is not None:
+            llm_config["config_list"] = telemetry.timed_config_list(llm_config["config_list"])
+        
+        return LLMConfig.add_cache(llm_config, provider)
+    
+    @staticmethod
+    def add_cache(llm_config, provider):
+        """Attach the response cache selected by LLM_CACHE to a configuration."""
+        if LLM_CACHE == "sqlite":
+            model = llm_config["config_list"][0]["model"]
+            llm_config["cache"] = get_cache(provider, model)
+        elif LLM_CACHE == "off":
+            # Also disables AutoGen's default per-seed disk cache
+            llm_config["cache_seed"] = None
+        elif LLM_CACHE != "disk":
+            raise ValueError(f"Unsupported LLM cache: {LLM_CACHE}")
+        
+        return llm_config 
\ No newline at end of file
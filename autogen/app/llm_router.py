@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import httpx
+
+# Requests per endpoint kept for the rolling latency and error rate
+ROUTER_WINDOW = int(os.environ.get("ROUTER_WINDOW", "50"))
+# Error rate over the window above which an endpoint is put into cooldown
+ROUTER_MAX_ERROR_RATE = float(os.environ.get("ROUTER_MAX_ERROR_RATE", "0.5"))
+# Seconds an endpoint is skipped after consecutive failures
+ROUTER_COOLDOWN_SECONDS = float(os.environ.get("ROUTER_COOLDOWN_SECONDS", "30"))
+# Consecutive failures that put an endpoint into cooldown
+ROUTER_FAILURES_BEFORE_COOLDOWN = int(os.environ.get("ROUTER_FAILURES_BEFORE_COOLDOWN", "3"))
+# Send a hedged request to the next endpoint after this many ms; 0 hedges at ROUTER_HEDGE_PERCENTILE of the endpoint's latency
+ROUTER_HEDGE_DELAY_MS = float(os.environ.get("ROUTER_HEDGE_DELAY_MS", "0"))
+# Latency percentile of the primary endpoint after which a request is hedged
+ROUTER_HEDGE_PERCENTILE = float(os.environ.get("ROUTER_HEDGE_PERCENTILE", "95"))
+# Set to "off" to disable hedged requests
+ROUTER_HEDGE = os.environ.get("ROUTER_HEDGE", "on")
+# Non-streaming requests (including hedges) in flight at once per provider
+ROUTER_MAX_IN_FLIGHT = int(os.environ.get("ROUTER_MAX_IN_FLIGHT", "64"))
+
+# Base URL given to the OpenAI client; requests to it are sent to one of the real endpoints
+ROUTED_BASE_URL = "http://llm-router.local"
+
+# Smallest number of samples before an endpoint's latency percentile is used as the hedge delay
+_MIN_HEDGE_SAMPLES = 5
+# Smallest number of samples before an endpoint's error rate can put it into cooldown
+_MIN_ERROR_SAMPLES = 10
+
+class EndpointStats:
+    """Rolling latency and error statistics for one endpoint."""
+
+    def __init__(self, window=ROUTER_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.errors = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def record(self, latency, error):
+        self.requests += 1
+        self.errors.append(1 if error else 0)
+        if error:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if (self.consecutive_failures >= ROUTER_FAILURES_BEFORE_COOLDOWN
+                    or (len(self.errors) >= _MIN_ERROR_SAMPLES and self.error_rate > ROUTER_MAX_ERROR_RATE)):
+                self._cool_down()
+        else:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+
+    def _cool_down(self):
+        # Start from a clean slate once the cooldown ends, so the next request probes the endpoint
+        self.cooldown_until = time.monotonic() + ROUTER_COOLDOWN_SECONDS
+        self.consecutive_failures = 0
+        self.errors.clear()
+
+    @property
+    def error_rate(self):
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    @property
+    def latency(self):
+        # Endpoints without samples sort first, so every endpoint gets measured
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[len(ordered) // 2]
+
+    def percentile(self, fraction):
+        if len(self.latencies) < _MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.cooldown_until
+
+class _RetryableResponse(Exception):
+    """An endpoint answered with a status worth retrying elsewhere."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+class RoutingTransport(httpx.BaseTransport):
+    """
+    httpx transport that spreads OpenAI API requests over several endpoints.
+
+    Each request goes to the healthy endpoint with the lowest median latency.
+    Connection errors, timeouts, 429 and 5xx answers count as failures and the
+    request fails over to the next endpoint; an endpoint with repeated failures
+    or a high error rate sits out a cooldown before it is probed again.
+    Non-streaming requests still running after the hedge delay are also sent
+    to the next endpoint, and the first answer wins. Per-endpoint API keys and
+    model names are applied to each attempt.
+    """
+
+    def __init__(self, endpoints, hedge=ROUTER_HEDGE != "off", hedge_delay_ms=ROUTER_HEDGE_DELAY_MS, max_in_flight=ROUTER_MAX_IN_FLIGHT):
+        self.endpoints = endpoints
+        self.hedge = hedge and len(endpoints) > 1
+        self.hedge_delay = hedge_delay_ms / 1000
+        self.stats = [EndpointStats() for _ in endpoints]
+        self._lock = threading.Lock()
+        self._transport = httpx.HTTPTransport()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm-router")
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def _ranked(self):
+        """Endpoint indexes, healthy ones first, each group fastest first."""
+        with self._lock:
+            return sorted(
+                range(len(self.endpoints)),
+                key=lambda i: (not self.stats[i].healthy, self.stats[i].latency)
+            )
+
+    def _hedge_delay(self, index):
+        if self.hedge_delay > 0:
+            return self.hedge_delay
+        with self._lock:
+            return self.stats[index].percentile(ROUTER_HEDGE_PERCENTILE / 100)
+
+    def _build_request(self, request, index):
+        endpoint = self.endpoints[index]
+        path = request.url.raw_path.decode("ascii")
+        url = endpoint["base_url"].rstrip("/") + path
+
+        headers = {key: value for key, value in request.headers.items() if key.lower() not in ("host", "content-length")}
+        headers["authorization"] = f"Bearer {endpoint.get('api_key', 'not-needed')}"
+
+        content = request.content
+        if content and endpoint.get("model"):
+            body = json.loads(content)
+            if "model" in body:
+                body["model"] = endpoint["model"]
+                content = json.dumps(body).encode("utf-8")
+
+        return httpx.Request(request.method, url, headers=headers, content=content, extensions=request.extensions)
+
+    def _attempt(self, request, index, read_body):
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self._transport.handle_request(self._build_request(request, index))
+            if response.status_code == 429 or response.status_code >= 500:
+                response.read()
+                response.close()
+                raise _RetryableResponse(response)
+            if read_body:
+                response.read()
+                response.close()
+            error = False
+            return response
+        finally:
+            with self._lock:
+                self.stats[index].record(time.perf_counter() - start, error)
+
+    def _send_streaming(self, request, ranked):
+        # Streamed answers cannot be hedged, but a failure before the first byte still fails over
+        last_error = None
+        for attempt, index in enumerate(ranked):
+            if attempt:
+                with self._lock:
+                    self.failovers += 1
+            try:
+                return self._attempt(request, index, read_body=False)
+            except (httpx.TransportError, _RetryableResponse) as e:
+                last_error = e
+        raise last_error
+
+    def _send_hedged(self, request, ranked):
+        remaining = list(ranked)
+        running = {}
+        last_error = None
+
+        def launch():
+            index = remaining.pop(0)
+            running[self._executor.submit(self._attempt, request, index, True)] = index
+
+        launch()
+        while running:
+            delay = self._hedge_delay(running[next(iter(running))]) if self.hedge and remaining and len(running) == 1 else None
+            done, _ = wait(running, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # The request is slower than usual for this endpoint: race it against the next one
+                with self._lock:
+                    self.hedged += 1
+                launch()
+                continue
+            for future in done:
+                index = running.pop(future)
+                try:
+                    response = future.result()
+                except (httpx.TransportError, _RetryableResponse) as e:
+                    last_error = e
+                    continue
+                if index != ranked[0] and len(running) > 0:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return response
+            if remaining and not running:
+                with self._lock:
+                    self.failovers += 1
+                launch()
+        raise last_error
+
+    def handle_request(self, request):
+        ranked = self._ranked()
+        streaming = False
+        if request.content:
+            try:
+                streaming = bool(json.loads(request.content).get("stream"))
+            except (ValueError, AttributeError):
+                pass
+
+        try:
+            if streaming:
+                return self._send_streaming(request, ranked)
+            return self._send_hedged(request, ranked)
+        except _RetryableResponse as e:
+            # Every endpoint failed; hand the last error answer to the OpenAI client
+            headers = {key: value for key, value in e.response.headers.items()
+                       if key.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+            return httpx.Response(e.response.status_code, headers=headers, content=e.response.content)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self._transport.close()
+
+    def metrics(self):
+        with self._lock:
+            endpoints = [
+                {
+                    "base_url": endpoint["base_url"],
+                    "model": endpoint.get("model"),
+                    "requests": stats.requests,
+                    "failures": stats.failures,
+                    "error_rate": stats.error_rate,
+                    "median_latency": stats.latency,
+                    "p95_latency": stats.percentile(0.95),
+                    "healthy": stats.healthy
+                }
+                for endpoint, stats in zip(self.endpoints, self.stats)
+            ]
+            return {"endpoints": endpoints, "hedged": self.hedged, "hedge_wins": self.hedge_wins, "failovers": self.failovers}
+
+class RoutedHTTPClient(httpx.Client):
+    """HTTP client for the OpenAI SDK that routes requests through a RoutingTransport."""
+
+    def __init__(self, transport):
+        super().__init__(transport=transport, timeout=None)
+        self.router = transport
+
+    def __deepcopy__(self, memo):
+        # Agents deep-copy their llm_config; every copy must share the router and its statistics
+        return self
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+def get_router(provider, endpoints):
+    """Return the router for a provider's endpoints, creating it once per process."""
+    key = (provider, json.dumps(endpoints, sort_keys=True))
+    with _routers_lock:
+        if key not in _routers:
+            _routers[key] = RoutingTransport(endpoints)
+        return _routers[key]
+
+def routers():
+    """Return the routers created in this process, by provider."""
+    with _routers_lock:
+        return {provider: router for (provider, _), router in _routers.items()}
+
+def route_config_list(provider, config_list):
+    """
+    Turn a multi-endpoint config list into a single entry whose requests are routed.
+
+    The entry keeps the first endpoint's model and price, so cost tracking and
+    cache keys stay the same as with a single endpoint.
+    """
+    if len(config_list) < 2:
+        return config_list
+    endpoints = [
+        {"base_url": entry.get("base_url", "https://api.openai.com/v1"), "api_key": entry.get("api_key"), "model": entry.get("model")}
+        for entry in config_list
+    ]
+    routed = {key: value for key, value in config_list[0].items() if key not in ("base_url", "api_key")}
+    routed["base_url"] = ROUTED_BASE_URL
+    routed["api_key"] = "routed"
+    routed["http_client"] = RoutedHTTPClient(get_router(provider, endpoints))
+    return [routed]
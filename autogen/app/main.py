@@ -1,13 +1,17 @@
-from fastapi import FastAPI, Request, Form, Depends, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Form, Depends, Cookie, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import uvicorn
 import os
+import json
 import autogen
-import subprocess
-import sys
 from typing import Optional
+from metrics import registry
+from worker_pool import ExampleWorkerPool, QueueFullError
+from conversation import ConversationRunner, ConversationQueueFullError
+from llm_cache import LLM_CACHE, get_store
+from llm_router import routers
 
 app = FastAPI(title="AutoGen Web UI")
 
@@ -20,31 +24,83 @@ templates = Jinja2Templates(directory="templates")
 # Default model provider
 DEFAULT_PROVIDER = "openai"
 
+# Example scripts that can be run from the examples page
+EXAMPLES = [
+    {"name": "Code Generation Example", "script": "code_generation_example.py", "description": "Demonstrates code generation capabilities"},
+    {"name": "Multi-Agent Conversation", "script": "multi_agent_conversation.py", "description": "Shows conversation between multiple agents"},
+    {"name": "Research Assistant", "script": "research_assistant.py", "description": "Demonstrates research assistant functionality"},
+    {"name": "Romantic Conversation", "script": "romantic_conversation.py", "description": "Example of agents engaging in romantic dialogue"},
+    {"name": "Simple Flirt", "script": "simple_flirt.py", "description": "Demonstrates flirtatious conversation between agents"}
+]
+
+# Pool of pre-warmed worker processes that run the examples
+example_pool = ExampleWorkerPool()
+
+# Runs /run_conversation chats on a bounded thread pool with reusable agents
+conversation_runner = ConversationRunner()
+
+def llm_cache_metric(field):
+    """Read one statistic per provider/model from the shared LLM response cache."""
+    return lambda: {(namespace,): values[field] for namespace, values in get_store().metrics().items()}
+
+# The cache statistics live in the cache file, so they include example runs
+if LLM_CACHE == "sqlite":
+    registry.gauge("llm_cache_hits", "LLM response cache hits", llm_cache_metric("hits"), ("namespace",))
+    registry.gauge("llm_cache_misses", "LLM response cache misses", llm_cache_metric("misses"), ("namespace",))
+    registry.gauge("llm_cache_evictions", "LLM responses evicted from the cache", llm_cache_metric("evictions"), ("namespace",))
+    registry.gauge("llm_cache_entries", "LLM responses in the cache", llm_cache_metric("entries"), ("namespace",))
+    registry.gauge("llm_cache_bytes", "Size of the cached LLM responses", llm_cache_metric("bytes"), ("namespace",))
+
+def router_endpoint_metric(field):
+    """Read one statistic per endpoint from the routers used by the web UI's agents."""
+    return lambda: {
+        (provider, endpoint["base_url"]): float(endpoint[field]) if endpoint[field] is not None else float("nan")
+        for provider, router in routers().items()
+        for endpoint in router.metrics()["endpoints"]
+    }
+
+def router_metric(field):
+    return lambda: {(provider,): router.metrics()[field] for provider, router in routers().items()}
+
+registry.gauge("llm_endpoint_requests", "Requests sent to each LLM endpoint", router_endpoint_metric("requests"), ("provider", "endpoint"))
+registry.gauge("llm_endpoint_failures", "Failed requests per LLM endpoint", router_endpoint_metric("failures"), ("provider", "endpoint"))
+registry.gauge("llm_endpoint_median_latency_seconds", "Rolling median latency per LLM endpoint", router_endpoint_metric("median_latency"), ("provider", "endpoint"))
+registry.gauge("llm_endpoint_p95_latency_seconds", "Rolling p95 latency per LLM endpoint", router_endpoint_metric("p95_latency"), ("provider", "endpoint"))
+registry.gauge("llm_endpoint_healthy", "1 if the LLM endpoint is not in cooldown", router_endpoint_metric("healthy"), ("provider", "endpoint"))
+registry.gauge("llm_router_hedged_requests", "Requests hedged to a second endpoint", router_metric("hedged"), ("provider",))
+registry.gauge("llm_router_hedge_wins", "Hedged requests answered first by the hedge", router_metric("hedge_wins"), ("provider",))
+registry.gauge("llm_router_failovers", "Requests retried on another endpoint after an error", router_metric("failovers"), ("provider",))
+
+@app.on_event("startup")
+async def startup():
+    """Start the example workers so the heavy imports happen before the first run."""
+    await example_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await example_pool.stop()
+    conversation_runner.shutdown()
+
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """Render the main page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
 
 @app.post("/run_conversation", response_class=HTMLResponse)
-async def run_conversation(request: Request, user_message: str = Form(...)):
+async def run_conversation(request: Request, user_message: str = Form(...), llm_provider: Optional[str] = Cookie(None)):
     """Run a conversation with AutoGen agents based on user input"""
-    # Here you would implement your AutoGen agent conversation
-    # This is a placeholder that you can customize based on your needs
-    
-    # Example:
-    # config_list = [{"model": "gpt-3.5-turbo", "api_key": os.getenv("OPENAI_API_KEY")}]
-    # assistant = autogen.AssistantAgent("assistant", llm_config={"config_list": config_list})
-    # user_proxy = autogen.UserProxyAgent("user_proxy")
-    # user_proxy.initiate_chat(assistant, message=user_message)
-    # conversation_history = user_proxy.chat_history
-    
-    # For now, just echo back the message
-    conversation_history = [{"role": "user", "content": user_message}, 
-                           {"role": "assistant", "content": f"Received: {user_message}"}]
+    provider = llm_provider or DEFAULT_PROVIDER
+    try:
+        conversation_history = await conversation_runner.run(provider, user_message)
+    except ConversationQueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Too many conversations: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running conversation: {str(e)}")
     
     return templates.TemplateResponse(
+        request,
         "conversation.html", 
-        {"request": request, "conversation": conversation_history, "user_message": user_message}
+        {"conversation": conversation_history, "user_message": user_message}
     )
 
 @app.get("/examples", response_class=HTMLResponse)
@@ -53,17 +109,10 @@ async def examples_page(request: Request, llm_provider: Optional[str] = Cookie(N
     # Set default provider if not in cookie
     if not llm_provider:
         llm_provider = DEFAULT_PROVIDER
-        
-    examples = [
-        {"name": "Code Generation Example", "script": "code_generation_example.py", "description": "Demonstrates code generation capabilities"},
-        {"name": "Multi-Agent Conversation", "script": "multi_agent_conversation.py", "description": "Shows conversation between multiple agents"},
-        {"name": "Research Assistant", "script": "research_assistant.py", "description": "Demonstrates research assistant functionality"},
-        {"name": "Romantic Conversation", "script": "romantic_conversation.py", "description": "Example of agents engaging in romantic dialogue"},
-        {"name": "Simple Flirt", "script": "simple_flirt.py", "description": "Demonstrates flirtatious conversation between agents"}
-    ]
-    return templates.TemplateResponse("examples.html", {
-        "request": request, 
-        "examples": examples,
+
+    return templates.TemplateResponse(request, "examples.html", {
+        "examples": EXAMPLES,
+        "jobs": example_pool.list_jobs(),
         "current_provider": llm_provider
     })
 
@@ -76,18 +125,84 @@ async def set_provider(provider: str = Form(...)):
 
 @app.post("/run-example")
 async def run_example(script: str = Form(...), provider: str = Form(...)):
-    """Run the selected example script."""
-    # Get the absolute path to the script
-    script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
-    
-    # Run the script as a subprocess with the provider as an environment variable
-    print(f"\n\n=== Running {script} with provider: {provider} ===\n")
-    env = os.environ.copy()
-    env["LLM_PROVIDER"] = provider
-    subprocess.Popen([sys.executable, script_path], env=env)
+    """Queue the selected example script on the worker pool."""
+    if script not in {example["script"] for example in EXAMPLES}:
+        raise HTTPException(status_code=404, detail=f"Unknown example: {script}")
+
+    # Reject the run instead of piling up processes when every worker is busy
+    try:
+        job = example_pool.submit(script, provider)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Example queue is full: {str(e)}")
     
-    # Redirect back to examples page
-    return RedirectResponse(url="/examples", status_code=303)
+    # Redirect to the page following the run
+    return RedirectResponse(url=f"/jobs/{job.id}/view", status_code=303)
+
+def get_job_or_404(job_id):
+    job = example_pool.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+def format_sse(event, data, event_id=None):
+    """Format one Server-Sent Event."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/jobs")
+async def list_jobs():
+    """List active and recently finished example runs."""
+    return {"jobs": [job.to_dict() for job in example_pool.list_jobs()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the status of an example run."""
+    return get_job_or_404(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str, request: Request, after: int = 0):
+    """
+    Stream the output of an example run as Server-Sent Events.
+
+    Each output line is sent with its line number as the event id, so a reconnecting
+    EventSource resumes where it left off. Lines that already fell out of the job's
+    buffer are reported as a `skipped` event.
+    """
+    job = get_job_or_404(job_id)
+    last_event_id = request.headers.get("last-event-id")
+    seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else after
+
+    async def events():
+        nonlocal seq
+        status = None
+        while True:
+            if job.status != status:
+                status = job.status
+                yield format_sse("status", job.to_dict())
+            lines = job.lines_after(seq)
+            if lines and lines[0][0] > seq + 1:
+                yield format_sse("skipped", {"lines": lines[0][0] - seq - 1})
+            for line_seq, text in lines:
+                yield format_sse("output", {"text": text}, event_id=line_seq)
+                seq = line_seq
+            if job.finished and seq >= job.lines:
+                yield format_sse("done", job.to_dict())
+                return
+            if await request.is_disconnected():
+                return
+            await job.wait(seq, status)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/view", response_class=HTMLResponse)
+async def view_job(request: Request, job_id: str):
+    """Render the page following an example run."""
+    return templates.TemplateResponse(request, "job.html", {"job": get_job_or_404(job_id)})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Expose worker pool, agent telemetry, LLM cache and LLM router metrics in the Prometheus text format."""
+    return registry.render()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,105 @@
+import threading
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, dict(zip(self.labels, key)), value) for key, value in self._values.items()]
+
+class Gauge:
+    """
+    Value read from a callback each time metrics are collected.
+
+    With labels, the callback returns a dict mapping label value tuples to values.
+    """
+
+    def __init__(self, name, help_text, read, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.labels = labels
+
+    def samples(self):
+        if not self.labels:
+            return [(self.name, {}, self.read())]
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in self.read().items()]
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds."""
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, {"counts": [0] * len(self.buckets), "count": 0, "sum": 0.0})
+            series["count"] += 1
+            series["sum"] += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, series in self._series.items():
+                labels = dict(zip(self.labels, key))
+                for bound, count in zip(self.buckets, series["counts"]):
+                    result.append((f"{self.name}_bucket", {**labels, "le": str(bound)}, count))
+                result.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, series["count"]))
+                result.append((f"{self.name}_count", labels, series["count"]))
+                result.append((f"{self.name}_sum", labels, series["sum"]))
+        return result
+
+class MetricsRegistry:
+    """Collects metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric, kind):
+        self._metrics.append((metric, kind))
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels), "counter")
+
+    def gauge(self, name, help_text, read, labels=()):
+        return self._register(Gauge(name, help_text, read, labels), "gauge")
+
+    def histogram(self, name, help_text, buckets, labels=()):
+        return self._register(Histogram(name, help_text, buckets, labels), "histogram")
+
+    def render(self):
+        lines = []
+        for metric, kind in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for name, labels, value in metric.samples():
+                label_text = ",".join(f'{key}="{_escape(label_value)}"' for key, label_value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
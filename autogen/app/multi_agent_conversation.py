@@ -2,8 +2,11 @@ import os
 from dotenv import load_dotenv
 from autogen.agentchat.assistant_agent import AssistantAgent
 from autogen.agentchat.user_proxy_agent import UserProxyAgent
-from autogen.agentchat.groupchat import GroupChat, GroupChatManager
+from autogen.agentchat.groupchat import GroupChatManager
 from llm_config import LLMConfig
+from code_executor import code_execution_config, code_work_dir
+from compaction import TRANSCRIPT_COMPACTION, IncrementalSummarizer, SelectionWindow, add_compaction, summarize_ahead
+from fast_groupchat import GROUPCHAT_MODE, TimedGroupChat, FastSpeakerSelector, code_execution_rule, failed_execution_rule, print_round_timings
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -15,10 +18,9 @@ print(f"Using LLM provider: {llm_provider}")
 # Get the LLM configuration based on provider
 llm_config = LLMConfig.get_config(llm_provider)
 
-# Create the temperature data file in the current working directory
-def create_temperature_data():
-    current_dir = os.getcwd()
-    data_path = os.path.join(current_dir, "temperature_data.csv")
+# Create the temperature data file in the directory the generated code runs in
+def create_temperature_data(work_dir):
+    data_path = os.path.join(work_dir, "temperature_data.csv")
     
     # Write the temperature data
     with open(data_path, "w") as f:
@@ -73,26 +75,44 @@ programmer = AssistantAgent(
 user_proxy = UserProxyAgent(
     name="User",
     human_input_mode="NEVER",  # No human input for non-interactive examples
-    code_execution_config={
-        "last_n_messages": 3,
-        "work_dir": "."  # Execute code in the current directory
-    },  # Configured to execute in current directory
+    # Runs code on the warm sandboxed interpreter pool; CODE_EXECUTOR=local uses the current directory instead
+    code_execution_config=code_execution_config(".", last_n_messages=3),
 )
 
+# Keep each model agent's transcript within a token budget instead of resending the whole chat;
+# they all see the same group messages, so one running summary serves them all
+if TRANSCRIPT_COMPACTION == "on":
+    group_summary = IncrementalSummarizer(llm_config, name="GroupChat (summary)")
+    for agent in (assistant, data_scientist, programmer):
+        add_compaction(agent, llm_config, summarizer=group_summary)
+
 # Define a function to initialize a group chat
 def start_group_chat():
     # Create the temperature data file
-    data_path = create_temperature_data()
+    data_path = create_temperature_data(code_work_dir(user_proxy))
+    
+    # "fast" mode routes predictable turns by rule and speculates on the rest
+    selector = None
+    if GROUPCHAT_MODE == "fast":
+        selector = FastSpeakerSelector(rules=[
+            code_execution_rule("User"),  # Code blocks are run by the user proxy
+            failed_execution_rule("User", "Programmer")  # Failed runs go back to the programmer
+        ])
     
-    groupchat = GroupChat(
+    groupchat = TimedGroupChat(
         agents=[user_proxy, assistant, data_scientist, programmer],
         messages=[],
-        max_round=10
+        max_round=10,
+        speaker_selection_method=selector or "auto",
+        # The manager only needs the task and the latest turns to pick the next speaker
+        selection_transform=SelectionWindow() if TRANSCRIPT_COMPACTION == "on" else None
     )
     manager = GroupChatManager(
         groupchat=groupchat,
         llm_config=llm_config  # Provide the LLM config to the manager
     )
+    if TRANSCRIPT_COMPACTION == "on":
+        summarize_ahead(manager)
     
     # Start the conversation
     user_proxy.initiate_chat(
@@ -156,6 +176,12 @@ plt.show()
 Please execute these code blocks in order, making sure each runs successfully before proceeding to the next.
 """
     )
+    
+    # Show where the time went, round by round
+    print_round_timings(groupchat)
+    if selector is not None:
+        print(f"Speaker selection: {selector.stats()}")
+        selector.shutdown()
 
 # Run the group chat
 if __name__ == "__main__":
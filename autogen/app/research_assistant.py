@@ -14,12 +14,16 @@ print(f"Using LLM provider: {llm_provider}")
 # Get the LLM configuration based on provider
 llm_config = LLMConfig.get_config(llm_provider)
 
+# Topics file created with the default topics on first use
+RESEARCH_TOPICS_FILE = "research_topics.json"
+
 # Set up a research task
-def setup_research_task():
+def setup_research_task(config=None, work_dir=None):
+    """Create the research agents; `config` defaults to the provider above."""
     # Create an assistant agent to perform research
     assistant = autogen.AssistantAgent(
         name="Assistant",
-        llm_config=llm_config,
+        llm_config=config or llm_config,
         system_message="""You are a research assistant. Your goal is to provide accurate, factual 
         information about the given topic. Use your knowledge to provide well-structured, 
         comprehensive responses, but be honest about the limitations of your knowledge. 
@@ -27,18 +31,27 @@ def setup_research_task():
         """
     )
     
+    # Don't use Docker for code execution; concurrent runs each get their own work_dir
+    code_execution_config = {"use_docker": False}
+    if work_dir:
+        code_execution_config["work_dir"] = work_dir
+    
     # Create a user proxy agent that will converse with the assistant
     user_proxy = autogen.UserProxyAgent(
         name="User",
         human_input_mode="NEVER",  # No human input for automatic execution
-        code_execution_config={"use_docker": False},  # Don't use Docker for code execution
+        code_execution_config=code_execution_config,
         max_consecutive_auto_reply=5  # Allow up to 5 automatic replies before requiring user input
     )
     
     return assistant, user_proxy
 
-def load_research_topics():
+def load_research_topics(path=RESEARCH_TOPICS_FILE):
     """Load or create research topics if they don't exist."""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    
     research_topics = [
         {
             "topic": "Quantum Computing",
@@ -55,11 +68,37 @@ def load_research_topics():
     ]
     
     # Save the research topics to a JSON file
-    with open("research_topics.json", "w") as f:
+    with open(path, "w") as f:
         json.dump(research_topics, f, indent=4)
     
     return research_topics
 
+def research_message(topic):
+    """The request sent to the assistant for one topic."""
+    return f"""Please research the following topic and provide a comprehensive summary:
+        
+        TOPIC: {topic['topic']}
+        
+        DETAILS: {topic['description']}
+        
+        Please structure your response as follows:
+        1. Overview (a brief introduction to the topic)
+        2. Key Points (the most important information about the topic)
+        3. Current Status (where we stand today on this topic)
+        4. Future Outlook (where this field is heading)
+        5. Conclusion (summary of your findings)
+        
+        Make your response informative but concise, focusing on factual information.
+        """
+
+def research_report(chat_result, assistant):
+    """Return the assistant's last substantive message from a research chat."""
+    for message in reversed(chat_result.chat_history):
+        content = (message.get("content") or "").replace("TERMINATE", "").strip()
+        if message.get("name") == assistant.name and content:
+            return content
+    return ""
+
 def conduct_research(topic_index=0):
     """Conduct research on the specified topic."""
     # Load research topics
@@ -81,24 +120,7 @@ def conduct_research(topic_index=0):
     assistant, user_proxy = setup_research_task()
     
     # Initiate a chat between the user proxy and the assistant
-    user_proxy.initiate_chat(
-        assistant,
-        message=f"""Please research the following topic and provide a comprehensive summary:
-        
-        TOPIC: {topic['topic']}
-        
-        DETAILS: {topic['description']}
-        
-        Please structure your response as follows:
-        1. Overview (a brief introduction to the topic)
-        2. Key Points (the most important information about the topic)
-        3. Current Status (where we stand today on this topic)
-        4. Future Outlook (where this field is heading)
-        5. Conclusion (summary of your findings)
-        
-        Make your response informative but concise, focusing on factual information.
-        """
-    )
+    user_proxy.initiate_chat(assistant, message=research_message(topic))
     
     print("=" * 80)
     print("Research complete!")
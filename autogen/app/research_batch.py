@@ -0,0 +1,215 @@
+"""
+Batch mode for the research assistant: research every topic in a topics file.
+
+Topics run concurrently on a pool of worker threads, each reusing its own
+agent pair. Model calls are rate limited per provider, and every finished
+topic is appended to a JSONL output file right away, so an interrupted run
+can be resumed: topics that already succeeded in the output are skipped.
+
+    python research_batch.py --topics topics.json --output research_results.jsonl --workers 8
+
+The topics file is a JSON array or a JSONL file of objects with "topic" and
+"description", plus optional "id" and "provider" (default: LLM_PROVIDER).
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from autogen.agentchat.conversable_agent import ConversableAgent
+from llm_config import LLMConfig
+from research_assistant import llm_provider, setup_research_task, research_message, research_report
+
+# Topics researched at once
+RESEARCH_WORKERS = int(os.environ.get("RESEARCH_WORKERS", "4"))
+# Model calls per minute by provider, e.g. "openai=500,deepseek=60"; unlisted providers are not limited
+RESEARCH_RATE_LIMITS = os.environ.get("RESEARCH_RATE_LIMITS", "")
+# Parent directory of the per-worker code execution directories
+RESEARCH_WORK_DIR = os.environ.get("RESEARCH_WORK_DIR", "research_work")
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` calls per minute, with bursts of up to `burst` calls."""
+
+    def __init__(self, per_minute, burst=1):
+        self.interval = 60.0 / per_minute
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) * self.interval
+                self.waited_seconds += delay
+            time.sleep(delay)
+
+def parse_rate_limits(value):
+    """Parse "provider=calls_per_minute,..." into RateLimiters by provider."""
+    limiters = {}
+    for item in value.split(","):
+        if item.strip():
+            provider, per_minute = item.split("=")
+            limiters[provider.strip()] = RateLimiter(float(per_minute))
+    return limiters
+
+def load_topics(path):
+    """Load topics from a JSON array or a JSONL file, giving each one a stable id."""
+    with open(path) as f:
+        if path.endswith(".jsonl"):
+            topics = [json.loads(line) for line in f if line.strip()]
+        else:
+            topics = json.load(f)
+    for topic in topics:
+        if "id" not in topic:
+            key = f"{topic['topic']}\n{topic.get('description', '')}"
+            topic["id"] = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return topics
+
+def completed_topic_ids(path):
+    """Ids of the topics that already succeeded in an output file."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            if record.get("status") == "succeeded":
+                completed.add(record["id"])
+    return completed
+
+@functools.lru_cache(maxsize=None)
+def _llm_config(provider):
+    # Built once per provider so every worker shares its cache and router
+    return LLMConfig.get_config(provider)
+
+class ResearchBatch:
+    """Runs topics on `workers` threads and appends each result to `output`."""
+
+    def __init__(self, output, workers=RESEARCH_WORKERS, rate_limits=None, work_dir=RESEARCH_WORK_DIR):
+        self.output = output
+        self.workers = workers
+        self.rate_limits = parse_rate_limits(RESEARCH_RATE_LIMITS) if rate_limits is None else rate_limits
+        self.work_dir = work_dir
+        self._local = threading.local()
+
+    def _agents(self, provider):
+        """This thread's agent pair for a provider, built on first use."""
+        pairs = getattr(self._local, "pairs", None)
+        if pairs is None:
+            pairs = self._local.pairs = {}
+        if provider not in pairs:
+            # Code blocks from concurrent topics must not overwrite each other's files
+            work_dir = os.path.join(self.work_dir, threading.current_thread().name)
+            assistant, user_proxy = setup_research_task(_llm_config(provider), work_dir=work_dir)
+            limiter = self.rate_limits.get(provider)
+            if limiter is not None:
+                self._throttle(assistant, limiter)
+            pairs[provider] = (assistant, user_proxy)
+        return pairs[provider]
+
+    def _throttle(self, assistant, limiter):
+        """Make the assistant wait for the provider's rate limit before each model call."""
+        def rate_limited_reply(recipient, messages=None, sender=None, config=None):
+            limiter.acquire()
+            # Fall through to the model reply
+            return False, None
+
+        position = next(
+            i for i, entry in enumerate(assistant._reply_func_list)
+            if entry["reply_func"] is ConversableAgent.generate_oai_reply
+        )
+        assistant.register_reply([ConversableAgent, None], rate_limited_reply, position=position)
+
+    def research(self, topic):
+        """Research one topic and return its result record."""
+        provider = topic.get("provider", llm_provider)
+        record = {"id": topic["id"], "topic": topic["topic"], "provider": provider}
+        start = time.perf_counter()
+        try:
+            assistant, user_proxy = self._agents(provider)
+            result = user_proxy.initiate_chat(
+                assistant, message=research_message(topic), clear_history=True, silent=True
+            )
+            record.update({
+                "status": "succeeded",
+                "report": research_report(result, assistant),
+                "cost": result.cost.get("usage_including_cached_inference", {}).get("total_cost", 0)
+            })
+        except Exception as e:
+            record.update({"status": "failed", "error": f"{type(e).__name__}: {str(e)}"})
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        record["finished_at"] = time.time()
+        return record
+
+    @property
+    def rate_limited_seconds(self):
+        """Total seconds model calls waited for rate limits."""
+        return sum(limiter.waited_seconds for limiter in self.rate_limits.values())
+
+    def _checkpoint(self, record):
+        # Results are written from the main thread only, one complete line at a time
+        with open(self.output, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def run(self, topics):
+        """Research the topics not yet completed in the output file; return (succeeded, failed, skipped)."""
+        completed = completed_topic_ids(self.output)
+        pending = [topic for topic in topics if topic["id"] not in completed]
+        skipped = len(topics) - len(pending)
+        if skipped:
+            print(f"Skipping {skipped} topics already completed in {self.output}")
+
+        succeeded = failed = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="research") as executor:
+            futures = [executor.submit(self.research, topic) for topic in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                self._checkpoint(record)
+                if record["status"] == "succeeded":
+                    succeeded += 1
+                else:
+                    failed += 1
+                print(f"[{done}/{len(pending)}] {record['topic']}: {record['status']} in {record['seconds']:.1f}s"
+                      + (f" ({record['error']})" if record["status"] == "failed" else ""))
+        return succeeded, failed, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", default="research_topics.json", help="JSON or JSONL topics file")
+    parser.add_argument("--output", default="research_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=RESEARCH_WORKERS)
+    parser.add_argument("--rate-limits", default=RESEARCH_RATE_LIMITS,
+                        help='Model calls per minute by provider, e.g. "openai=500,deepseek=60"')
+    args = parser.parse_args()
+
+    topics = load_topics(args.topics)
+    batch = ResearchBatch(args.output, workers=args.workers, rate_limits=parse_rate_limits(args.rate_limits))
+    start = time.perf_counter()
+    succeeded, failed, skipped = batch.run(topics)
+    print(f"Researched {succeeded + failed} topics in {time.perf_counter() - start:.1f}s: "
+          f"{succeeded} succeeded, {failed} failed, {skipped} skipped; "
+          f"{batch.rate_limited_seconds:.1f}s waited for rate limits")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
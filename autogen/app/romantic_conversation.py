@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 from autogen.agentchat.assistant_agent import AssistantAgent
 from autogen.agentchat.user_proxy_agent import UserProxyAgent
 from llm_config import LLMConfig
+from compaction import TRANSCRIPT_COMPACTION, add_compaction
 
 # Load environment variables from .env file if present
 load_dotenv()
@@ -49,6 +50,11 @@ def create_romantic_agents():
         is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("THE_END") or x.get("content", "").strip() == ""
     )
     
+    # Keep each character's transcript within a token budget instead of resending the whole date
+    if TRANSCRIPT_COMPACTION == "on":
+        add_compaction(alicia, llm_config)
+        add_compaction(james, llm_config)
+    
     return alicia, james, user_proxy
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+"""
+Per-agent, per-turn telemetry for AutoGen conversations.
+
+Every model call made by an agent is recorded with its prompt and completion
+tokens, time to first token, total latency and cost (from the `price` in the
+LLM configuration). Records are appended to a JSONL trace and counted in the
+Prometheus metrics served at /metrics.
+
+Summarize a trace by agent and by round:
+
+    python telemetry.py .cache/agent_trace.jsonl
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import datetime
+import threading
+import contextlib
+from collections import defaultdict
+import httpx
+from autogen import runtime_logging
+from autogen.logger.base_logger import BaseLogger
+from metrics import registry
+
+# Set to "off" to stop recording agent turns
+AGENT_TELEMETRY = os.environ.get("AGENT_TELEMETRY", "on")
+# JSONL file every agent turn is appended to; empty keeps turns in the metrics only
+AGENT_TRACE_FILE = os.environ.get(
+    "AGENT_TRACE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "agent_trace.jsonl")
+)
+
+_SECONDS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+llm_calls_total = registry.counter(
+    "agent_llm_calls_total", "Model calls by agent, model and whether they were answered from the cache",
+    ("agent", "model", "cached")
+)
+llm_errors_total = registry.counter("agent_llm_errors_total", "Failed model calls by agent and model", ("agent", "model"))
+prompt_tokens_total = registry.counter("agent_prompt_tokens_total", "Prompt tokens by agent and model", ("agent", "model"))
+completion_tokens_total = registry.counter(
+    "agent_completion_tokens_total", "Completion tokens by agent and model", ("agent", "model")
+)
+cost_total = registry.counter("agent_cost_dollars_total", "Estimated model cost by agent and model", ("agent", "model"))
+latency_seconds = registry.histogram(
+    "agent_llm_latency_seconds", "Wall time of uncached model calls by agent", _SECONDS_BUCKETS, ("agent",)
+)
+ttft_seconds = registry.histogram(
+    "agent_llm_ttft_seconds", "Time to the first response byte of uncached model calls by agent", _SECONDS_BUCKETS, ("agent",)
+)
+
+# Timing of the last HTTP request made by each thread, read by the logger right after the call
+_timing = threading.local()
+# Conversation the current thread is working on, added to its records
+_context = threading.local()
+
+class _TimedStream(httpx.SyncByteStream):
+    """Response body that notes when its first chunk arrives."""
+
+    def __init__(self, stream, timing):
+        self.stream = stream
+        self.timing = timing
+
+    def __iter__(self):
+        for chunk in self.stream:
+            if self.timing["first_byte"] is None:
+                self.timing["first_byte"] = time.perf_counter()
+            yield chunk
+
+    def close(self):
+        self.stream.close()
+
+class TimingTransport(httpx.BaseTransport):
+    """
+    httpx transport that times the first byte of each response body.
+
+    With `"stream": True` in the LLM configuration that is the time to the
+    first token; otherwise the whole answer arrives at once and it is close to
+    the total latency.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def handle_request(self, request):
+        timing = {"sent": time.perf_counter(), "first_byte": None}
+        _timing.last = timing
+        response = self.transport.handle_request(request)
+        response.stream = _TimedStream(response.stream, timing)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+class TimedHTTPClient(httpx.Client):
+    """HTTP client for the OpenAI SDK whose requests go through a TimingTransport."""
+
+    def __init__(self, transport=None):
+        super().__init__(transport=TimingTransport(transport or httpx.HTTPTransport()), timeout=None)
+
+    def __deepcopy__(self, memo):
+        # Agents deep-copy their llm_config; the copies can share the client
+        return self
+
+def timed_config_list(config_list):
+    """Send each endpoint's requests through a TimingTransport, keeping a router if there is one."""
+    for entry in config_list:
+        client = entry.get("http_client")
+        entry["http_client"] = TimedHTTPClient(getattr(client, "router", None) or getattr(client, "_transport", None))
+    return config_list
+
+@contextlib.contextmanager
+def conversation(conversation_id):
+    """Tag the agent turns made by this thread with a conversation id."""
+    previous = getattr(_context, "conversation", None)
+    _context.conversation = conversation_id
+    try:
+        yield
+    finally:
+        _context.conversation = previous
+
+def _round(request):
+    # The position of this turn in the conversation: the messages the agent has seen so far
+    return sum(1 for message in request.get("messages", []) if message.get("role") != "system")
+
+class TelemetryLogger(BaseLogger):
+    """
+    AutoGen runtime logger that turns every chat completion into a telemetry record.
+
+    AutoGen calls `log_chat_completion` on the thread that made the call right
+    after it returns, so the latency is measured up to that moment and the
+    time to first byte is taken from that thread's last HTTP request.
+    """
+
+    def __init__(self, trace_file=AGENT_TRACE_FILE):
+        self.trace_file = trace_file
+        self.session_id = None
+        self.forwarders = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.session_id = str(uuid.uuid4())
+        if self.trace_file:
+            os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+        return self.session_id
+
+    def log_chat_completion(self, invocation_id, client_id, wrapper_id, source, request, response, is_cached, cost, start_time):
+        finished = datetime.datetime.now(datetime.timezone.utc)
+        started = datetime.datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=datetime.timezone.utc)
+        timing = getattr(_timing, "last", None)
+        _timing.last = None
+
+        usage = getattr(response, "usage", None)
+        record = {
+            "ts": time.time(),
+            "session": self.session_id,
+            "conversation": getattr(_context, "conversation", None),
+            "agent": getattr(source, "name", source),
+            "round": _round(request),
+            "model": getattr(response, "model", None) or request.get("model"),
+            "status": "error" if isinstance(response, str) else "ok",
+            "cached": bool(is_cached),
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cost": cost or 0.0,
+            "latency_seconds": (finished - started).total_seconds(),
+            "ttft_seconds": None
+        }
+        if timing is not None and timing["first_byte"] is not None and not is_cached:
+            record["ttft_seconds"] = timing["first_byte"] - timing["sent"]
+        self.emit(record)
+
+    def emit(self, record):
+        if self.trace_file:
+            line = json.dumps(record) + "\n"
+            with self._lock:
+                with open(self.trace_file, "a") as f:
+                    f.write(line)
+        observe(record)
+        for forward in self.forwarders:
+            forward(record)
+
+    # The other runtime events are not needed for turn telemetry
+    def log_new_agent(self, agent, init_args):
+        pass
+
+    def log_event(self, source, name, **kwargs):
+        pass
+
+    def log_new_wrapper(self, wrapper, init_args):
+        pass
+
+    def log_new_client(self, client, wrapper, init_args):
+        pass
+
+    def log_function_use(self, source, function, args, returns):
+        pass
+
+    def stop(self):
+        pass
+
+    def get_connection(self):
+        return None
+
+def observe(record):
+    """Count a turn record in the Prometheus metrics."""
+    labels = {"agent": record["agent"], "model": record["model"]}
+    if record["status"] == "error":
+        llm_errors_total.inc(**labels)
+        return
+    llm_calls_total.inc(cached=str(record["cached"]).lower(), **labels)
+    prompt_tokens_total.inc(record["prompt_tokens"], **labels)
+    completion_tokens_total.inc(record["completion_tokens"], **labels)
+    cost_total.inc(record["cost"], **labels)
+    if not record["cached"]:
+        latency_seconds.observe(record["latency_seconds"], agent=record["agent"])
+        if record["ttft_seconds"] is not None:
+            ttft_seconds.observe(record["ttft_seconds"], agent=record["agent"])
+
+_logger = None
+_logger_lock = threading.Lock()
+
+def start():
+    """Start recording agent turns in this process, once; returns the logger or None when disabled."""
+    global _logger
+    if AGENT_TELEMETRY == "off":
+        return None
+    with _logger_lock:
+        if _logger is None:
+            _logger = TelemetryLogger()
+            runtime_logging.start(logger=_logger)
+        return _logger
+
+def summarize(path):
+    """Print the calls, tokens, latency and cost of a trace by agent and by round."""
+    by_agent = defaultdict(list)
+    by_round = defaultdict(list)
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["status"] == "ok":
+                by_agent[record["agent"]].append(record)
+                by_round[record["round"]].append(record)
+
+    def table(title, groups):
+        print(f"\n{title:<16} {'calls':>6} {'cached':>7} {'prompt':>9} {'completion':>11} "
+              f"{'mean s':>7} {'ttft s':>7} {'total s':>8} {'cost $':>9}")
+        for key, records in groups:
+            uncached = [record for record in records if not record["cached"]]
+            ttfts = [record["ttft_seconds"] for record in uncached if record["ttft_seconds"] is not None]
+            total = sum(record["latency_seconds"] for record in uncached)
+            print(f"{str(key):<16} {len(records):>6} {len(records) - len(uncached):>7} "
+                  f"{sum(record['prompt_tokens'] for record in records):>9} "
+                  f"{sum(record['completion_tokens'] for record in records):>11} "
+                  f"{total / len(uncached) if uncached else 0:>7.2f} "
+                  f"{sum(ttfts) / len(ttfts) if ttfts else 0:>7.2f} {total:>8.2f} "
+                  f"{sum(record['cost'] for record in records):>9.4f}")
+
+    # Slowest agents first, rounds in conversation order
+    table("agent", sorted(by_agent.items(), key=lambda item: -sum(r["latency_seconds"] for r in item[1] if not r["cached"])))
+    table("round", sorted(by_round.items()))
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else AGENT_TRACE_FILE)
@@ -0,0 +1,407 @@
+import io
+import os
+import sys
+import time
+import uuid
+import runpy
+import asyncio
+import importlib
+import threading
+import traceback
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import registry
+import telemetry
+
+# Number of pre-warmed worker processes running examples
+EXAMPLE_WORKERS = int(os.environ.get("EXAMPLE_WORKERS", "2"))
+# Maximum number of example runs waiting for a worker; further submissions are rejected
+EXAMPLE_QUEUE_SIZE = int(os.environ.get("EXAMPLE_QUEUE_SIZE", "10"))
+# Seconds an example may run before its worker is killed
+EXAMPLE_JOB_TIMEOUT = float(os.environ.get("EXAMPLE_JOB_TIMEOUT", "900"))
+# Jobs a worker runs before it is replaced by a fresh one (1 = every run gets a clean process)
+EXAMPLE_WORKER_MAX_JOBS = int(os.environ.get("EXAMPLE_WORKER_MAX_JOBS", "1"))
+# Modules imported by each worker before it accepts a job
+EXAMPLE_PRELOAD_MODULES = os.environ.get("EXAMPLE_PRELOAD_MODULES", "autogen,pandas,matplotlib.pyplot")
+# Output lines kept per job; older lines are dropped once the buffer is full
+EXAMPLE_OUTPUT_LINES = int(os.environ.get("EXAMPLE_OUTPUT_LINES", "2000"))
+# Finished jobs kept for the job list before the oldest are forgotten
+EXAMPLE_JOB_HISTORY = int(os.environ.get("EXAMPLE_JOB_HISTORY", "50"))
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_SECONDS_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+# Delay before retrying a worker that died while starting, doubled per failure up to the maximum
+_SPAWN_RETRY_SECONDS = 1
+_SPAWN_RETRY_MAX_SECONDS = 60
+
+class QueueFullError(Exception):
+    """Raised when the example queue is at capacity."""
+
+class Job:
+    """
+    A single example run submitted to the worker pool.
+
+    Output lines are numbered and kept in a ring buffer of `max_lines`, so a
+    chatty run uses bounded memory; readers resume from the last line they saw.
+    """
+
+    FINISHED = ("succeeded", "failed", "timeout", "cancelled")
+
+    def __init__(self, script, provider, max_lines=EXAMPLE_OUTPUT_LINES):
+        self.id = uuid.uuid4().hex[:12]
+        self.script = script
+        self.provider = provider
+        self.status = "queued"
+        self.exit_code = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.output = deque(maxlen=max_lines)
+        self.lines = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status in self.FINISHED
+
+    @property
+    def wall_time(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def _notify(self):
+        # Wake every reader, then start a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def append(self, text):
+        self.lines += 1
+        self.output.append((self.lines, text))
+        self._notify()
+
+    def set_status(self, status):
+        self.status = status
+        self._notify()
+
+    def lines_after(self, seq):
+        """Return buffered (seq, text) lines newer than `seq`."""
+        return [line for line in self.output if line[0] > seq]
+
+    async def wait(self, seq, status):
+        """
+        Wait until there is output newer than `seq` or the status differs from `status`.
+
+        The check is made against what the caller has already seen, so a change that
+        lands before the wait starts returns at once instead of being missed.
+        """
+        while self.lines <= seq and self.status == status:
+            await self._changed.wait()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "script": self.script,
+            "provider": self.provider,
+            "status": self.status,
+            "exit_code": self.exit_code,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wall_time": self.wall_time,
+            "output_lines": self.lines
+        }
+
+class _PipeWriter(io.TextIOBase):
+    """Text stream that forwards complete lines of a job's output to the server."""
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+        self.job_id = None
+        self._buffer = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        with self.lock:
+            self._buffer += text
+            if "\n" in self._buffer:
+                complete, self._buffer = self._buffer.rsplit("\n", 1)
+                self.conn.send(("output", self.job_id, complete + "\n"))
+        return len(text)
+
+    def flush(self):
+        with self.lock:
+            if self._buffer:
+                self.conn.send(("output", self.job_id, self._buffer))
+                self._buffer = ""
+
+def _worker_main(conn, preload_modules):
+    """Entry point of a worker process: import the heavy modules, then run jobs sent over `conn`."""
+    started = time.perf_counter()
+    os.chdir(APP_DIR)
+    sys.path.insert(0, APP_DIR)
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for module in preload_modules:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"WARNING: could not preload {module}: {e}")
+    conn.send(("ready", time.perf_counter() - started))
+
+    # Send everything the scripts print, including the agents' chat messages, to the server
+    lock = threading.Lock()
+    writer = _PipeWriter(conn, lock)
+    sys.stdout = sys.stderr = writer
+
+    # Forward agent turns too, so the server's /metrics covers example runs
+    logger = telemetry.start()
+    if logger is not None:
+        def forward_turn(record):
+            with lock:
+                conn.send(("turn", writer.job_id, record))
+        logger.forwarders.append(forward_turn)
+
+    base_env = dict(os.environ)
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            # The server went away
+            break
+        if message is None:
+            break
+        job_id, script_path, env = message
+        writer.job_id = job_id
+
+        os.environ.clear()
+        os.environ.update(base_env)
+        os.environ.update(env)
+        try:
+            with telemetry.conversation(job_id):
+                runpy.run_path(script_path, run_name="__main__")
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        writer.flush()
+        with lock:
+            conn.send(("done", job_id, exit_code))
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+class ExampleWorkerPool:
+    """
+    Bounded pool of pre-warmed worker processes that run the example scripts.
+
+    Each worker imports autogen, pandas and matplotlib once at startup, so a run
+    only pays for the script itself. Submissions wait in a bounded queue and are
+    rejected when it is full; a run exceeding the timeout has its worker killed.
+    The most recent `history` jobs stay available with their buffered output.
+    """
+
+    def __init__(self, size=EXAMPLE_WORKERS, queue_size=EXAMPLE_QUEUE_SIZE, job_timeout=EXAMPLE_JOB_TIMEOUT,
+                 max_jobs_per_worker=EXAMPLE_WORKER_MAX_JOBS, preload_modules=EXAMPLE_PRELOAD_MODULES,
+                 history=EXAMPLE_JOB_HISTORY):
+        self.size = size
+        self.queue_size = queue_size
+        self.history = history
+        self.jobs = OrderedDict()
+        self.job_timeout = job_timeout
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.preload_modules = [module.strip() for module in preload_modules.split(",") if module.strip()]
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = None
+        self._slots = []
+        self._executor = None
+        self.busy = 0
+        self.idle = 0
+
+        self.warmup_seconds = registry.histogram(
+            "example_worker_warmup_seconds", "Time for a worker process to start and preload modules", _SECONDS_BUCKETS
+        )
+        self.queue_wait_seconds = registry.histogram(
+            "example_job_queue_wait_seconds", "Time an example run waited for a worker", _SECONDS_BUCKETS
+        )
+        self.run_seconds = registry.histogram(
+            "example_job_run_seconds", "Wall time of example runs", _SECONDS_BUCKETS
+        )
+        self.jobs_total = registry.counter("example_jobs_total", "Example runs by final status", ("status",))
+        registry.gauge("example_queue_depth", "Example runs waiting for a worker", self.queue_depth)
+        registry.gauge("example_workers_busy", "Workers currently running an example", lambda: self.busy)
+        registry.gauge("example_workers_idle", "Warm workers waiting for an example", lambda: self.idle)
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the worker slots; each keeps one warm worker ready."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        # One thread per slot waits on its worker's pipe
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="example-worker")
+        self._slots = [asyncio.create_task(self._run_slot()) for _ in range(self.size)]
+
+    async def stop(self):
+        for job in self.jobs.values():
+            if job.status == "queued":
+                job.set_status("cancelled")
+        for slot in self._slots:
+            slot.cancel()
+        await asyncio.gather(*self._slots, return_exceptions=True)
+        self._slots = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, script, provider):
+        """Queue an example run, raising QueueFullError if the queue is at capacity."""
+        job = Job(script, provider)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.jobs_total.inc(status="rejected")
+            raise QueueFullError(f"{self.queue_size} example runs are already queued")
+        self.jobs[job.id] = job
+        self._forget_finished()
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        """Return tracked jobs, newest first."""
+        return list(reversed(self.jobs.values()))
+
+    async def _recv(self, worker, timeout):
+        loop = asyncio.get_running_loop()
+        ready = await loop.run_in_executor(self._executor, worker.conn.poll, timeout)
+        if not ready:
+            raise asyncio.TimeoutError()
+        return worker.conn.recv()
+
+    async def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.preload_modules),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        try:
+            _, warmup = await self._recv(worker, None)
+        except (EOFError, OSError) as e:
+            await self._stop_worker(worker, kill=True)
+            raise OSError(f"example worker exited with code {process.exitcode} before it was ready") from e
+        except BaseException:
+            await self._stop_worker(worker, kill=True)
+            raise
+        self.warmup_seconds.observe(warmup)
+        return worker
+
+    async def _join(self, worker, timeout=5):
+        # Process.join blocks, so wait for it off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, worker.process.join, timeout)
+
+    async def _stop_worker(self, worker, kill=False):
+        if kill:
+            worker.process.kill()
+        else:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        await self._join(worker)
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.conn.close()
+
+    async def _run_slot(self):
+        retry_seconds = _SPAWN_RETRY_SECONDS
+        while True:
+            try:
+                worker = await self._spawn()
+            except OSError as e:
+                # Keep the slot alive: a worker that cannot start must not shrink the pool for good
+                print(f"WARNING: {e}; retrying in {retry_seconds}s")
+                await asyncio.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, _SPAWN_RETRY_MAX_SECONDS)
+                continue
+            retry_seconds = _SPAWN_RETRY_SECONDS
+            healthy = True
+            try:
+                for _ in range(self.max_jobs_per_worker):
+                    self.idle += 1
+                    try:
+                        job = await self._queue.get()
+                    finally:
+                        self.idle -= 1
+                    healthy = await self._run_job(worker, job)
+                    if not healthy:
+                        break
+            finally:
+                await self._stop_worker(worker, kill=not healthy)
+
+    async def _run_job(self, worker, job):
+        """Run one job on a worker; returns False if the worker must be discarded."""
+        if job.status == "cancelled":
+            return True
+        job.started_at = time.time()
+        job.set_status("running")
+        self.busy += 1
+        self.queue_wait_seconds.observe(job.started_at - job.submitted_at)
+        print(f"\n\n=== Running {job.script} with provider: {job.provider} (job {job.id}) ===\n")
+
+        healthy = True
+        status = "failed"
+        deadline = time.monotonic() + self.job_timeout
+        try:
+            worker.conn.send((job.id, os.path.join(APP_DIR, job.script), {"LLM_PROVIDER": job.provider}))
+            while True:
+                message = await self._recv(worker, max(0, deadline - time.monotonic()))
+                if message[0] == "output":
+                    job.append(message[2])
+                    # Keep the output in the container logs as well
+                    sys.stdout.write(message[2])
+                    continue
+                if message[0] == "turn":
+                    telemetry.observe(message[2])
+                    continue
+                job.exit_code = message[2]
+                status = "succeeded" if job.exit_code == 0 else "failed"
+                break
+        except asyncio.TimeoutError:
+            job.append(f"Run exceeded {self.job_timeout}s and was stopped\n")
+            status = "timeout"
+            healthy = False
+        except (EOFError, OSError):
+            # The script killed its worker, e.g. with os._exit
+            await self._join(worker)
+            job.exit_code = worker.process.exitcode
+            healthy = False
+        finally:
+            self.busy -= 1
+            job.finished_at = time.time()
+            job.set_status(status)
+            self.run_seconds.observe(job.finished_at - job.started_at)
+            self.jobs_total.inc(status=job.status)
+        return healthy
+
+    def metrics(self):
+        return {"queue_depth": self.queue_depth(), "busy": self.busy, "idle": self.idle}
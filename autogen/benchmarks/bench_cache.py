@@ -0,0 +1,51 @@
+"""
+Replay benchmark for the shared LLM response cache.
+
+Runs an example script twice against the stub OpenAI server with a slow,
+fixed per-call latency, using a fresh cache file. The first run pays for every
+model call; the replay is answered from the cache, so it takes about as long
+as the interpreter start.
+
+    python bench_cache.py --script romantic_conversation.py --latency-ms 3000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+import httpx
+from harness import APP_DIR, stub_openai_server, stub_env
+
+def _run_example(script, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, script], cwd=APP_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default="romantic_conversation.py")
+    parser.add_argument("--latency-ms", type=float, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir, stub_openai_server(latency_ms=args.latency_ms) as stub_url:
+        env = os.environ.copy()
+        env.update(stub_env(stub_url))
+        env["LLM_CACHE"] = "sqlite"
+        env["LLM_CACHE_PATH"] = os.path.join(cache_dir, "llm_cache.sqlite3")
+
+        print(f"{'run':>8} {'seconds':>8} {'model calls':>12}")
+        for run in ("cold", "replay"):
+            calls_before = httpx.get(f"{stub_url}/stats").json()["chat_completions"]
+            elapsed = _run_example(args.script, env)
+            calls = httpx.get(f"{stub_url}/stats").json()["chat_completions"] - calls_before
+            print(f"{run:>8} {elapsed:>8.1f} {calls:>12}")
+
+        sys.path.insert(0, APP_DIR)
+        from llm_cache import SQLiteResponseStore
+        for namespace, stats in SQLiteResponseStore(env["LLM_CACHE_PATH"]).metrics().items():
+            print(f"\n{namespace}: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['entries']} entries, {stats['bytes']} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-block latency of AutoGen's local command line executor vs. the pooled sandbox.
+
+Runs the same pandas + matplotlib code block repeatedly with each executor,
+each in its own temporary workspace. The local executor starts a new Python
+process per block that imports pandas and matplotlib again; the pooled
+executor forks a warm interpreter that already has them loaded. The pool's
+one-off warm-up is reported separately.
+
+    python bench_code_execution.py --blocks 20
+"""
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from harness import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+
+from autogen.coding.base import CodeBlock
+from autogen.coding.local_commandline_code_executor import LocalCommandLineCodeExecutor
+from code_executor import PooledCodeExecutor, InterpreterPool
+
+CODE = """import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+df = pd.DataFrame({"day": range(30), "temperature": [20 + (i % 7) for i in range(30)]})
+print(df["temperature"].describe())
+df.plot(x="day", y="temperature")
+plt.savefig("temperature_trends.png")
+"""
+
+def _measure(executor, blocks):
+    latencies = []
+    for _ in range(blocks):
+        start = time.perf_counter()
+        result = executor.execute_code_blocks([CodeBlock(language="python", code=CODE)])
+        latencies.append(time.perf_counter() - start)
+        if result.exit_code != 0:
+            raise RuntimeError(f"Code block failed:\n{result.output}")
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as local_dir, tempfile.TemporaryDirectory() as pool_dir:
+        local = LocalCommandLineCodeExecutor(work_dir=local_dir)
+
+        start = time.perf_counter()
+        pool = InterpreterPool(size=1)
+        pooled = PooledCodeExecutor(work_dir=pool_dir, pool=pool)
+        # The first block waits for the interpreter to finish importing
+        pooled.execute_code_blocks([CodeBlock(language="python", code="pass")])
+        warmup = time.perf_counter() - start
+
+        print(f"{'executor':>8} {'blocks':>7} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+        for name, executor in (("local", local), ("pool", pooled)):
+            latencies = sorted(_measure(executor, args.blocks))
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{name:>8} {len(latencies):>7} {statistics.median(latencies) * 1000:>8.0f} "
+                  f"{p95 * 1000:>8.0f} {statistics.mean(latencies) * 1000:>8.0f}")
+        print(f"\nPool warm-up (once per process): {warmup:.1f}s")
+        pool.close()
+
+if __name__ == "__main__":
+    main()
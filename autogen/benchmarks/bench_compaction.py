@@ -0,0 +1,73 @@
+"""
+Transcript compaction benchmark: the 10-round group chat with and without it.
+
+Runs multi_agent_conversation.py against the stub OpenAI server, once with
+TRANSCRIPT_COMPACTION=off and once with it on, with the response cache off.
+The stub writes long answers and charges prefill time per prompt token, so
+resending the whole transcript every round costs both tokens and latency.
+Tokens are summed from each run's agent trace, including the summarization
+calls; the speaker selection prompt of the manager is not compacted.
+
+    python bench_compaction.py --latency-ms 300 --completion-words 300
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import httpx
+from harness import APP_DIR, stub_openai_server, stub_env
+
+def _run_group_chat(env, trace_file):
+    env = dict(env, AGENT_TRACE_FILE=trace_file)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "multi_agent_conversation.py"], cwd=APP_DIR, env=env, check=True,
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    prompt = completion = 0
+    with open(trace_file) as f:
+        for line in f:
+            record = json.loads(line)
+            prompt += record["prompt_tokens"]
+            completion += record["completion_tokens"]
+    return elapsed, prompt, completion
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--completion-words", type=int, default=300)
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=200)
+    parser.add_argument("--token-budget", type=int, default=1000)
+    parser.add_argument("--summary-words", type=int, default=100)
+    args = parser.parse_args()
+
+    with stub_openai_server(
+        latency_ms=args.latency_ms,
+        STUB_COMPLETION_WORDS=args.completion_words,
+        STUB_PREFILL_MS_PER_1K_TOKENS=args.prefill_ms_per_1k_tokens
+    ) as stub_url, tempfile.TemporaryDirectory() as trace_dir:
+        env = os.environ.copy()
+        env.update(stub_env(stub_url))
+        env["LLM_CACHE"] = "off"
+        env["GROUPCHAT_MODE"] = "auto"
+        env["COMPACTION_TOKEN_BUDGET"] = str(args.token_budget)
+        env["COMPACTION_SUMMARY_WORDS"] = str(args.summary_words)
+
+        results = []
+        for compaction in ("off", "on"):
+            env["TRANSCRIPT_COMPACTION"] = compaction
+            calls_before = httpx.get(f"{stub_url}/stats").json()["chat_completions"]
+            elapsed, prompt, completion = _run_group_chat(env, os.path.join(trace_dir, f"{compaction}.jsonl"))
+            calls = httpx.get(f"{stub_url}/stats").json()["chat_completions"] - calls_before
+            results.append((compaction, elapsed, calls, prompt, completion))
+
+        print(f"{'compaction':>10} {'seconds':>8} {'model calls':>12} {'prompt tokens':>14} {'completion tokens':>18}")
+        for compaction, elapsed, calls, prompt, completion in results:
+            print(f"{compaction:>10} {elapsed:>8.1f} {calls:>12} {prompt:>14} {completion:>18}")
+
+if __name__ == "__main__":
+    main()
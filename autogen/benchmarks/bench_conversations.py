@@ -0,0 +1,74 @@
+"""
+Load test for /run_conversation.
+
+Starts the stub OpenAI server with a fixed per-call latency and the web UI
+pointed at it, then fires batches of simultaneous conversations and reports
+throughput and latency per concurrency level. Conversations run on a bounded
+thread pool, so throughput grows with the number of clients up to
+CONVERSATION_WORKERS instead of serializing on `initiate_chat`.
+
+    python bench_conversations.py --latency-ms 500 --workers 8
+"""
+import time
+import asyncio
+import argparse
+import httpx
+from harness import stub_openai_server, autogen_app
+
+async def _run_level(base_url, clients, requests_per_client):
+    latencies = []
+    errors = 0
+
+    async def client(http, client_id):
+        nonlocal errors
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            response = await http.post(
+                "/run_conversation",
+                data={"user_message": f"benchmark question {client_id}-{i}-{time.time()}"},
+                cookies={"llm_provider": "lm_studio"}
+            )
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http, c) for c in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latencies) or [0.0]
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    args = parser.parse_args()
+
+    with stub_openai_server(latency_ms=args.latency_ms) as stub_url:
+        with autogen_app(stub_url, CONVERSATION_WORKERS=args.workers, CONVERSATION_QUEUE_SIZE=1000) as app_url:
+            print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+            for level in [int(x) for x in args.levels.split(",")]:
+                result = asyncio.run(_run_level(app_url, level, args.requests_per_client))
+                print(f"{result['clients']:>8} {result['requests']:>9} {result['errors']:>7} {result['throughput']:>8.2f} "
+                      f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f}")
+
+            stub_stats = httpx.get(f"{stub_url}/stats").json()
+            print(f"\nModel calls: {stub_stats['chat_completions']}, peak concurrent calls: {stub_stats['max_in_flight']}")
+            for line in httpx.get(f"{app_url}/metrics").text.splitlines():
+                if line.startswith("conversation_agent_pairs_created_total"):
+                    print(f"Agent pairs built: {line.split()[-1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Group chat benchmark: AutoGen's "auto" speaker selection against the "fast" mode.
+
+Runs multi_agent_conversation.py against the stub OpenAI server with a fixed
+per-call latency, once per mode, with the response cache off so every round
+really talks to the model. Each run prints its round-by-round timings; the
+summary compares total wall time and model calls.
+
+    python bench_groupchat.py --latency-ms 1000
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import httpx
+from harness import APP_DIR, stub_openai_server, stub_env
+
+def _run_group_chat(env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "multi_agent_conversation.py"], cwd=APP_DIR, env=env, check=True,
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    # Keep only the timing table and selection stats printed at the end of the chat
+    report = result.stdout[result.stdout.rindex("\nround"):]
+    return elapsed, report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=1000)
+    parser.add_argument("--speculation", type=int, default=1)
+    args = parser.parse_args()
+
+    with stub_openai_server(latency_ms=args.latency_ms) as stub_url:
+        env = os.environ.copy()
+        env.update(stub_env(stub_url))
+        env["LLM_CACHE"] = "off"
+        env["GROUPCHAT_SPECULATION"] = str(args.speculation)
+
+        results = []
+        for mode in ("auto", "fast"):
+            env["GROUPCHAT_MODE"] = mode
+            calls_before = httpx.get(f"{stub_url}/stats").json()["chat_completions"]
+            elapsed, report = _run_group_chat(env)
+            calls = httpx.get(f"{stub_url}/stats").json()["chat_completions"] - calls_before
+            print(f"=== {mode} ==={report}")
+            results.append((mode, elapsed, calls))
+
+        print(f"{'mode':>6} {'seconds':>8} {'model calls':>12}")
+        for mode, elapsed, calls in results:
+            print(f"{mode:>6} {elapsed:>8.1f} {calls:>12}")
+
+if __name__ == "__main__":
+    main()
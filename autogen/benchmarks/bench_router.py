@@ -0,0 +1,98 @@
+"""
+Tail-latency benchmark for multi-endpoint routing.
+
+Starts three stub OpenAI servers standing in for replicas of one provider:
+a fast one with a slow tail, a slower but steady one, and a flaky one that
+answers 503 to a share of requests. It then sends the same load through
+AutoGen's OpenAIWrapper with the configuration built by LLMConfig:
+
+- single: only the fast endpoint (the old single-entry config list)
+- ordered: all endpoints, tried in order by AutoGen (LLM_ROUTER=off)
+- routed: all endpoints behind the latency-aware router, without hedging
+- hedged: the router with hedged requests
+
+    python bench_router.py --requests 200 --concurrency 8
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from harness import APP_DIR, stub_openai_server
+
+STUBS = [
+    {"port": 9111, "latency_ms": 200, "STUB_SLOW_FRACTION": 0.03, "STUB_SLOW_LATENCY_MS": 3000},
+    {"port": 9112, "latency_ms": 350},
+    {"port": 9113, "latency_ms": 250, "STUB_ERROR_RATE": 0.3},
+]
+
+SCENARIOS = {
+    "single": {"LLM_ROUTER": "on", "endpoints": 1},
+    "ordered": {"LLM_ROUTER": "off", "endpoints": 3},
+    "routed": {"LLM_ROUTER": "on", "ROUTER_HEDGE": "off", "endpoints": 3},
+    "hedged": {"LLM_ROUTER": "on", "ROUTER_HEDGE": "on", "endpoints": 3},
+}
+
+def _run_scenario(urls, requests, concurrency):
+    """Run in a child process so each scenario starts with fresh router statistics."""
+    sys.path.insert(0, APP_DIR)
+    from autogen import OpenAIWrapper
+    from llm_config import LLMConfig
+
+    llm_config = LLMConfig.get_config("lm_studio")
+    client = OpenAIWrapper(**llm_config)
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            client.create(messages=[{"role": "user", "content": f"question {i}"}])
+            return time.perf_counter() - start, False
+        except Exception:
+            return time.perf_counter() - start, True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(call, range(requests)))
+
+    latencies = sorted(latency for latency, error in results if not error)
+    errors = sum(1 for _, error in results if error)
+    def pct(fraction):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000 if latencies else float("nan")
+    print(f"{errors} {pct(0.5):.0f} {pct(0.95):.0f} {pct(0.99):.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        _run_scenario(os.environ["LM_STUDIO_BASE_URLS"].split(","), args.requests, args.concurrency)
+        return
+
+    with contextlib.ExitStack() as stack:
+        urls = []
+        for stub in STUBS:
+            settings = dict(stub)
+            port = settings.pop("port")
+            latency_ms = settings.pop("latency_ms")
+            urls.append(stack.enter_context(stub_openai_server(latency_ms=latency_ms, port=port, **settings)) + "/v1")
+
+        print(f"{'scenario':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, scenario in SCENARIOS.items():
+            env = os.environ.copy()
+            env.update({key: value for key, value in scenario.items() if key != "endpoints"})
+            env.update({"LLM_CACHE": "off", "LM_STUDIO_MODEL": "stub", "LM_STUDIO_BASE_URL": urls[0]})
+            env["LM_STUDIO_BASE_URLS"] = ",".join(urls[:scenario["endpoints"]])
+            output = subprocess.run(
+                [sys.executable, __file__, "--scenario", name,
+                 "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout.strip().splitlines()[-1]
+            errors, p50, p95, p99 = output.split()
+            print(f"{name:>8} {errors:>7} {p50:>8} {p95:>8} {p99:>8}")
+
+if __name__ == "__main__":
+    main()
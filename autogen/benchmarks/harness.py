@@ -0,0 +1,65 @@
+"""
+Helpers shared by the benchmark scripts: start the stub OpenAI server and the
+AutoGen web UI as uvicorn subprocesses and wait for them to accept requests.
+"""
+import os
+import sys
+import time
+import subprocess
+import contextlib
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "app")
+
+STUB_PORT = int(os.getenv("STUB_PORT", "9101"))
+APP_PORT = int(os.getenv("APP_PORT", "8101"))
+
+def _wait_until_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+@contextlib.contextmanager
+def _uvicorn(module, cwd, port, env, ready_path="/"):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=cwd,
+        env=env
+    )
+    try:
+        _wait_until_ready(f"http://127.0.0.1:{port}{ready_path}")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+@contextlib.contextmanager
+def stub_openai_server(latency_ms=500, port=STUB_PORT, **extra_env):
+    """Run the stub OpenAI server with the given latency and yield its base URL."""
+    env = os.environ.copy()
+    env["STUB_LATENCY_MS"] = str(latency_ms)
+    env.update({key: str(value) for key, value in extra_env.items()})
+    with _uvicorn("stub_openai_server:app", BENCHMARKS_DIR, port, env, ready_path="/stats") as url:
+        yield url
+
+def stub_env(stub_url):
+    """Environment that points the `lm_studio` provider at the stub server."""
+    return {"LLM_PROVIDER": "lm_studio", "LM_STUDIO_BASE_URL": f"{stub_url}/v1", "LM_STUDIO_MODEL": "stub"}
+
+@contextlib.contextmanager
+def autogen_app(stub_url, **extra_env):
+    """Run the AutoGen web UI against the stub server and yield its base URL."""
+    env = os.environ.copy()
+    env.update(stub_env(stub_url))
+    # The benchmarks only exercise conversations; keep the example workers light
+    env.setdefault("EXAMPLE_WORKERS", "1")
+    env.setdefault("EXAMPLE_PRELOAD_MODULES", "")
+    env.update({key: str(value) for key, value in extra_env.items()})
+    with _uvicorn("main:app", APP_DIR, APP_PORT, env) as url:
+        yield url
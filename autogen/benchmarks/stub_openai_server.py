@@ -0,0 +1,123 @@
+"""
+Minimal stand-in for the OpenAI chat completions API used by the benchmarks.
+
+Serves `/v1/chat/completions` (plain and streamed) with a configurable artificial
+latency so the AutoGen web UI and examples can be load tested without a real model.
+
+    STUB_LATENCY_MS=500 uvicorn stub_openai_server:app --port 9101
+"""
+import os
+import time
+import json
+import re
+import random
+import asyncio
+import hashlib
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Time spent "thinking" before the first token is returned
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "500"))
+# Fraction of requests that take STUB_SLOW_LATENCY_MS instead, to model a latency tail
+SLOW_FRACTION = float(os.getenv("STUB_SLOW_FRACTION", "0"))
+SLOW_LATENCY_MS = float(os.getenv("STUB_SLOW_LATENCY_MS", "5000"))
+# Fraction of requests answered with HTTP 503
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+# Delay between streamed tokens
+TOKEN_INTERVAL_MS = float(os.getenv("STUB_TOKEN_INTERVAL_MS", "20"))
+# Number of words in each completion
+COMPLETION_WORDS = int(os.getenv("STUB_COMPLETION_WORDS", "20"))
+# Extra latency per 1000 prompt tokens, to model the prefill cost of long prompts
+PREFILL_MS_PER_1K_TOKENS = float(os.getenv("STUB_PREFILL_MS_PER_1K_TOKENS", "0"))
+
+app = FastAPI(title="Stub OpenAI Server")
+
+stats = {"chat_completions": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+def _select_speaker(messages):
+    """Answer GroupChat speaker selection prompts: the role after the last speaker, round robin."""
+    prompt = str(messages[-1].get("content") or "") if messages else ""
+    match = re.search(r"select the next role from \[([^\]]*)\]", prompt)
+    if not match:
+        return None
+    names = [name.strip().strip("'\"") for name in match.group(1).split(",")]
+    spoken = [message.get("name") for message in messages if message.get("name") in names]
+    if not spoken:
+        return names[0]
+    return names[(names.index(spoken[-1]) + 1) % len(names)]
+
+def _completion_words(messages):
+    speaker = _select_speaker(messages)
+    if speaker:
+        return [speaker]
+    last = (messages[-1].get("content") or "") if messages else ""
+    seed = hashlib.sha256(str(last).encode("utf-8")).hexdigest()
+    return [seed[i % len(seed):i % len(seed) + 4] for i in range(COMPLETION_WORDS)]
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    # Like a real model, stop at max_tokens (one word per token here)
+    words = _completion_words(messages)[:body.get("max_tokens") or None]
+    created = int(time.time())
+    model = body.get("model", "stub")
+    prompt_tokens = len(json.dumps(messages)) // 4
+
+    stats["chat_completions"] += 1
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Stub overloaded", "type": "server_error"}}, status_code=503)
+
+    latency_ms = SLOW_LATENCY_MS if random.random() < SLOW_FRACTION else LATENCY_MS
+    latency_ms += prompt_tokens / 1000 * PREFILL_MS_PER_1K_TOKENS
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(latency_ms / 1000)
+    finally:
+        stats["in_flight"] -= 1
+
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words), "total_tokens": prompt_tokens + len(words)}
+
+    if not body.get("stream"):
+        return JSONResponse({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+    async def event_stream():
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": (" " if i else "") + word}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(TOKEN_INTERVAL_MS / 1000)
+        done = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.get("/stats")
+async def get_stats():
+    return stats
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from langchain_core.callbacks import AsyncCallbackHandler
+
+# Fraction of agent runs whose steps are written to the log
+AGENT_LOG_SAMPLE_RATE = float(os.getenv("AGENT_LOG_SAMPLE_RATE", "0.1"))
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger("agent")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            else:
+                self.counts[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {"count": self.count, "sum": round(self.sum, 6), "buckets": buckets}
+
+llm_latency = Histogram()
+tool_latency = {}
+_tool_latency_lock = threading.Lock()
+
+def _tool_histogram(name):
+    with _tool_latency_lock:
+        if name not in tool_latency:
+            tool_latency[name] = Histogram()
+        return tool_latency[name]
+
+class AgentTelemetryHandler(AsyncCallbackHandler):
+    """
+    Per-run callback handler that times LLM and tool calls of an agent.
+
+    Every call is recorded in the latency histograms; the steps of a sampled
+    fraction of runs are also logged as one JSON line each.
+    """
+
+    def __init__(self, sample_rate=AGENT_LOG_SAMPLE_RATE):
+        self.sampled = random.random() < sample_rate
+        self._started = {}
+
+    def _log(self, event, **fields):
+        if self.sampled:
+            logger.info(json.dumps({"event": event, **fields}))
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            llm_latency.observe(elapsed)
+            self._log("llm_end", run_id=str(run_id), seconds=round(elapsed, 4))
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+        self._log("llm_error", run_id=str(run_id), error=str(error))
+
+    async def on_agent_action(self, action, *, run_id, **kwargs):
+        self._log("agent_action", run_id=str(run_id), tool=action.tool, tool_input=str(action.tool_input))
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), serialized.get("name", "unknown"))
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            elapsed = time.perf_counter() - started[0]
+            _tool_histogram(started[1]).observe(elapsed)
+            self._log("tool_end", run_id=str(run_id), tool=started[1], seconds=round(elapsed, 4))
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        tool = started[1] if started else "unknown"
+        self._log("tool_error", run_id=str(run_id), tool=tool, error=str(error))
+
+    async def on_agent_finish(self, finish, *, run_id, **kwargs):
+        self._log("agent_finish", run_id=str(run_id))
+
+def metrics():
+    with _tool_latency_lock:
+        tools = dict(tool_latency)
+    return {
+        "llm_seconds": llm_latency.snapshot(),
+        "tool_seconds": {name: histogram.snapshot() for name, histogram in tools.items()}
+    }
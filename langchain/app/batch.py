@@ -0,0 +1,76 @@
+import os
+import json
+import time
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# Maximum number of prompts accepted in one /generate_batch request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+# Prompts of one batch sent to the model at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "32"))
+# Attempts per prompt, including the first, before it is reported as failed
+BATCH_MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _item(value, position):
+    # A prompt is either a string or an object with a "query" and an optional "id"
+    if isinstance(value, str):
+        return {"id": None, "query": value}
+    if isinstance(value, dict) and isinstance(value.get("query"), str):
+        return {"id": value.get("id"), "query": value["query"]}
+    raise HTTPException(status_code=400, detail=f"Item {position} must be a string or an object with a string 'query'")
+
+def parse_batch(body, content_type):
+    """
+    Parse the prompts of a batch request: a JSON array, or NDJSON with one prompt per line.
+    """
+    try:
+        text = body.decode("utf-8")
+        if NDJSON_MEDIA_TYPE in (content_type or "") or not text.lstrip().startswith("["):
+            values = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            values = json.loads(text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+    if not values:
+        raise HTTPException(status_code=400, detail="The batch is empty")
+    if len(values) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} prompts")
+    return [_item(value, position) for position, value in enumerate(values)]
+
+async def _results(chain, items, concurrency, attempts):
+    start = time.perf_counter()
+    failed = 0
+    retrying_chain = chain.with_retry(stop_after_attempt=attempts) if attempts > 1 else chain
+    outputs = retrying_chain.abatch_as_completed(
+        [{"query": item["query"]} for item in items],
+        config={"max_concurrency": concurrency},
+        return_exceptions=True
+    )
+    async for index, output in outputs:
+        result = {"index": index, "id": items[index]["id"]}
+        if isinstance(output, Exception):
+            failed += 1
+            result["error"] = f"{type(output).__name__}: {str(output)}"
+        else:
+            result["response"] = output
+        yield json.dumps(result) + "\n"
+    yield json.dumps({
+        "done": True,
+        "total": len(items),
+        "succeeded": len(items) - failed,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 3)
+    }) + "\n"
+
+def batch_response(chain, items, concurrency=BATCH_CONCURRENCY, attempts=BATCH_MAX_ATTEMPTS):
+    """
+    Run every prompt through `chain` and stream the results as NDJSON in completion order.
+
+    At most `concurrency` prompts are in flight at a time and each is retried
+    up to `attempts` times. Every result line carries the prompt's `index` (its
+    position in the request) and `id`, with either a `response` or an `error`;
+    a final line summarizes the batch.
+    """
+    return StreamingResponse(_results(chain, items, concurrency, attempts), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,226 @@
+import os
+import ast
+import math
+import operator
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from concurrency import run_blocking
+
+# Longest expression the calculator accepts
+MAX_EXPRESSION_LENGTH = int(os.getenv("CALCULATOR_MAX_EXPRESSION_LENGTH", "500"))
+# Largest integer (in bits) allowed as an operand or intermediate result
+MAX_INT_BITS = int(os.getenv("CALCULATOR_MAX_INT_BITS", "4096"))
+# Largest absolute exponent allowed in `**`
+MAX_EXPONENT = int(os.getenv("CALCULATOR_MAX_EXPONENT", "1000"))
+# Seconds an evaluation may run before its worker is killed
+CALCULATOR_TIMEOUT = float(os.getenv("CALCULATOR_TIMEOUT", "1.0"))
+# Number of worker processes evaluating expressions
+CALCULATOR_WORKERS = int(os.getenv("CALCULATOR_WORKERS", "2"))
+
+class CalculatorError(Exception):
+    """Raised for expressions the calculator refuses or fails to evaluate."""
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+_FUNCTIONS = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+    "log10": math.log10,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+}
+
+_CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+}
+
+def _check_size(value):
+    if isinstance(value, complex):
+        raise CalculatorError("Complex results are not supported")
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise CalculatorError(f"Number too large (more than {MAX_INT_BITS} bits)")
+    return value
+
+def _check_operands(op_type, left, right):
+    if op_type is ast.Pow:
+        if abs(right) > MAX_EXPONENT:
+            raise CalculatorError(f"Exponent too large (limit {MAX_EXPONENT})")
+        if isinstance(left, int) and isinstance(right, int) and right > 0:
+            if left.bit_length() * right > MAX_INT_BITS:
+                raise CalculatorError(f"Result too large (more than {MAX_INT_BITS} bits)")
+    elif op_type is ast.Mult and isinstance(left, int) and isinstance(right, int):
+        if left.bit_length() + right.bit_length() > MAX_INT_BITS:
+            raise CalculatorError(f"Result too large (more than {MAX_INT_BITS} bits)")
+
+def _validate(node):
+    """Reject any syntax outside the arithmetic whitelist."""
+    for child in ast.walk(node):
+        if isinstance(child, (ast.Expression, ast.Load)):
+            continue
+        if isinstance(child, ast.Constant):
+            if type(child.value) not in (int, float):
+                raise CalculatorError(f"Unsupported constant: {child.value!r}")
+            _check_size(child.value)
+        elif isinstance(child, ast.BinOp):
+            if type(child.op) not in _BINARY_OPERATORS:
+                raise CalculatorError(f"Unsupported operator: {type(child.op).__name__}")
+        elif isinstance(child, ast.UnaryOp):
+            if type(child.op) not in _UNARY_OPERATORS:
+                raise CalculatorError(f"Unsupported operator: {type(child.op).__name__}")
+        elif isinstance(child, ast.Call):
+            if not isinstance(child.func, ast.Name) or child.func.id not in _FUNCTIONS or child.keywords:
+                raise CalculatorError("Unsupported function call")
+        elif isinstance(child, ast.Name):
+            if child.id not in _FUNCTIONS and child.id not in _CONSTANTS:
+                raise CalculatorError(f"Unknown name: {child.id}")
+        elif not isinstance(child, (ast.operator, ast.unaryop)):
+            raise CalculatorError(f"Unsupported syntax: {type(child).__name__}")
+
+def _normalize(expression):
+    expression = expression.strip().strip("`'\"").strip()
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise CalculatorError(f"Expression too long (limit {MAX_EXPRESSION_LENGTH} characters)")
+    return expression.replace("^", "**")
+
+@functools.lru_cache(maxsize=1024)
+def compile_expression(expression):
+    """Parse and validate an expression, caching the resulting syntax tree."""
+    try:
+        tree = ast.parse(_normalize(expression), mode="eval")
+    except (SyntaxError, ValueError) as e:
+        raise CalculatorError(f"Invalid expression: {e}")
+    _validate(tree)
+    return tree
+
+def _evaluate_node(node):
+    if isinstance(node, ast.Expression):
+        return _evaluate_node(node.body)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return _CONSTANTS[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand))
+    if isinstance(node, ast.BinOp):
+        left = _evaluate_node(node.left)
+        right = _evaluate_node(node.right)
+        _check_operands(type(node.op), left, right)
+        return _check_size(_BINARY_OPERATORS[type(node.op)](left, right))
+    if isinstance(node, ast.Call):
+        args = [_evaluate_node(arg) for arg in node.args]
+        return _check_size(_FUNCTIONS[node.func.id](*args))
+    raise CalculatorError(f"Unsupported syntax: {type(node).__name__}")
+
+def evaluate(expression):
+    """Evaluate an arithmetic expression in the current process."""
+    tree = compile_expression(expression)
+    try:
+        return _evaluate_node(tree)
+    except CalculatorError:
+        raise
+    except (ArithmeticError, ValueError, TypeError) as e:
+        raise CalculatorError(f"{type(e).__name__}: {e}")
+
+class TimeBoxedCalculator:
+    """
+    Evaluates expressions in a small pool of worker processes with a time limit.
+
+    Expressions are validated and size-capped before evaluation; the time limit
+    is the last line of defence. When it is hit the worker processes are killed
+    and replaced, so a pathological expression never stalls a server process.
+    Successful results are cached.
+    """
+
+    def __init__(self, workers=CALCULATOR_WORKERS, timeout=CALCULATOR_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.evaluate = functools.lru_cache(maxsize=1024)(self._evaluate)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        # Kill the stuck workers; shutdown alone would wait for them
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _evaluate(self, expression):
+        # Reject invalid input before paying for a round trip to a worker
+        compile_expression(expression)
+        pool = self._get_pool()
+        try:
+            future = pool.submit(evaluate, expression)
+        except RuntimeError:
+            # The pool was shut down or broken after we fetched it
+            self._reset_pool(pool)
+            raise CalculatorError("The calculator was restarting; try again")
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            self._reset_pool(pool)
+            raise CalculatorError(f"Evaluation exceeded {self.timeout}s")
+        except BrokenProcessPool:
+            # Another evaluation's timeout killed the workers; the next call gets a fresh pool
+            self._reset_pool(pool)
+            raise CalculatorError("The calculator was restarted during evaluation; try again")
+
+    def run(self, expression):
+        """Tool entry point: return the result, or an error message the agent can act on."""
+        try:
+            return str(self.evaluate(expression))
+        except CalculatorError as e:
+            return f"Error: {e}"
+
+    async def arun(self, expression):
+        return await run_blocking(self.run, expression)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self):
+        info = self.evaluate.cache_info()
+        return {"cache_hits": info.hits, "cache_misses": info.misses, "timeouts": self.timeouts}
+
+calculator = TimeBoxedCalculator()
@@ -0,0 +1,129 @@
+import os
+import threading
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+# Connection pool limits shared by every model client
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+DEFAULT_CHAT_MODEL = "gpt-3.5-turbo"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+class ClientRegistry:
+    """
+    Process-wide registry of reusable model clients.
+
+    Clients are keyed by model name (and temperature for chat models) and all of
+    them share two keep-alive httpx connection pools, one for async and one for
+    sync calls, so requests skip TLS and connection setup after the first call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chat_models = {}
+        self._embeddings = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._transport = None
+        self._async_transport = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Create the shared HTTP clients and warm the default models."""
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+        self._transport = httpx.HTTPTransport(limits=limits)
+        self._http_client = httpx.Client(transport=self._transport, timeout=HTTP_TIMEOUT)
+        self._async_transport = httpx.AsyncHTTPTransport(limits=limits)
+        self._http_async_client = httpx.AsyncClient(transport=self._async_transport, timeout=HTTP_TIMEOUT)
+
+        self.get_chat_model(DEFAULT_CHAT_MODEL)
+        self.get_chat_model(DEFAULT_CHAT_MODEL, 0.7)
+        self.get_chat_model(DEFAULT_CHAT_MODEL, 0)
+
+    async def close(self):
+        """Close the shared HTTP clients and forget cached models."""
+        with self._lock:
+            self._chat_models.clear()
+            self._embeddings.clear()
+        if self._http_async_client is not None:
+            await self._http_async_client.aclose()
+        if self._http_client is not None:
+            self._http_client.close()
+        self._http_client = None
+        self._http_async_client = None
+        self._transport = None
+        self._async_transport = None
+
+    def _get_or_create(self, cache, key, factory):
+        with self._lock:
+            client = cache.get(key)
+            if client is not None:
+                self.hits += 1
+                return client
+            self.misses += 1
+            client = factory()
+            cache[key] = client
+            return client
+
+    def get_chat_model(self, model_name=DEFAULT_CHAT_MODEL, temperature=None, streaming=False):
+        """
+        Return the shared chat model for this model name and temperature.
+
+        Without a temperature the request leaves it unset, so the provider default applies.
+        """
+        options = {} if temperature is None else {"temperature": temperature}
+        return self._get_or_create(
+            self._chat_models,
+            (model_name, temperature, streaming),
+            lambda: ChatOpenAI(
+                model_name=model_name,
+                streaming=streaming,
+                http_client=self._http_client,
+                http_async_client=self._http_async_client,
+                **options
+            )
+        )
+
+    def get_embeddings(self, model=DEFAULT_EMBEDDING_MODEL):
+        """Return the shared embeddings client for this model."""
+        return self._get_or_create(
+            self._embeddings,
+            model,
+            lambda: OpenAIEmbeddings(
+                model=model,
+                http_client=self._http_client,
+                http_async_client=self._http_async_client
+            )
+        )
+
+    def metrics(self):
+        """Report registry hits and usage of the shared sync and async connection pools."""
+        return {
+            "chat_models": len(self._chat_models),
+            "embedding_models": len(self._embeddings),
+            "registry_hits": self.hits,
+            "registry_misses": self.misses,
+            "pool_max_connections": HTTP_MAX_CONNECTIONS,
+            "pool_max_keepalive_connections": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "pools": {"sync": _pool_usage(self._transport), "async": _pool_usage(self._async_transport)}
+        }
+
+def _pool_usage(transport):
+    # httpx has no public API for pool usage, so its internals are read defensively:
+    # if they change, the counts are reported as None instead of failing /metrics
+    try:
+        connections = list(transport._pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+    except (AttributeError, TypeError):
+        return None
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+registry = ClientRegistry()
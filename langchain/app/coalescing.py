@@ -0,0 +1,138 @@
+import os
+import json
+import asyncio
+import hashlib
+from langchain_core.callbacks import AsyncCallbackHandler
+
+# Set to "off" to give every request its own upstream call
+REQUEST_COALESCING = os.getenv("REQUEST_COALESCING", "on")
+
+class _Flight:
+    """One upstream call and the requests waiting for it."""
+
+    def __init__(self, key):
+        self.key = key
+        self.task = None
+        self.waiters = 0
+        self.tokens = []
+        self.finished = False
+        self.changed = asyncio.Condition()
+
+class _TokenRecorder(AsyncCallbackHandler):
+    """Callback handler that records the tokens of a shared stream for its subscribers."""
+
+    def __init__(self, flight):
+        self.flight = flight
+
+    async def on_llm_new_token(self, token, **kwargs):
+        if token:
+            async with self.flight.changed:
+                self.flight.tokens.append(token)
+                self.flight.changed.notify_all()
+
+class RequestCoalescer:
+    """
+    Single-flight layer for identical concurrent LLM requests.
+
+    Requests are keyed by a hash of their namespace (endpoint, model,
+    temperature), prompt and whether they stream. While a call for a key is in
+    flight, identical requests wait for it instead of starting their own and
+    all of them get its result or its error. A streamed call is recorded and
+    each subscriber replays the tokens at its own pace, including the ones sent
+    before it joined, so a slow client does not hold up the others. The call is
+    cancelled when every request waiting for it has gone away.
+    """
+
+    def __init__(self):
+        self.enabled = REQUEST_COALESCING == "on"
+        self._flights = {}
+        self.upstream_calls = {"call": 0, "stream": 0}
+        self.calls_saved = {"call": 0, "stream": 0}
+        self.max_waiters = 0
+
+    def _key(self, namespace, prompt, kind):
+        return hashlib.sha256(json.dumps([list(namespace), prompt, kind], default=str).encode("utf-8")).hexdigest()
+
+    def _join(self, namespace, prompt, kind, start):
+        key = self._key(namespace, prompt, kind)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(key)
+            flight.task = asyncio.ensure_future(start(flight))
+            flight.task.add_done_callback(lambda _: self._forget(flight))
+            self.upstream_calls[kind] += 1
+        else:
+            self.calls_saved[kind] += 1
+        flight.waiters += 1
+        self.max_waiters = max(self.max_waiters, flight.waiters)
+        return flight
+
+    def _forget(self, flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def _leave(self, flight):
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Nobody is waiting any more: stop the call, and let a new request start a fresh one
+            self._forget(flight)
+            flight.task.cancel()
+
+    async def run(self, namespace, prompt, compute):
+        """Return the result of `compute()`, sharing one call among identical concurrent requests."""
+        if not self.enabled:
+            return await compute()
+        flight = self._join(namespace, prompt, "call", lambda flight: compute())
+        try:
+            # Shield the shared call so one cancelled request does not cancel it for the others
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(flight)
+
+    async def _record(self, flight, run):
+        try:
+            return await run([_TokenRecorder(flight)])
+        finally:
+            async with flight.changed:
+                flight.finished = True
+                flight.changed.notify_all()
+
+    async def stream(self, namespace, prompt, run, callbacks):
+        """
+        Streaming variant of `run`: `run(callbacks)` streams to the given callback handlers.
+
+        The tokens of the shared call are sent to this request's `callbacks`
+        through `on_llm_new_token`, then its result is returned.
+        """
+        if not self.enabled:
+            return await run(callbacks)
+        flight = self._join(namespace, prompt, "stream", lambda flight: self._record(flight, run))
+        try:
+            sent = 0
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: len(flight.tokens) > sent or flight.finished)
+                    tokens = flight.tokens[sent:]
+                    finished = flight.finished
+                for token in tokens:
+                    for handler in callbacks:
+                        await handler.on_llm_new_token(token)
+                sent += len(tokens)
+                if finished and sent == len(flight.tokens):
+                    break
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(flight)
+
+    def metrics(self):
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "upstream_calls": self.upstream_calls["call"],
+            "calls_saved": self.calls_saved["call"],
+            "upstream_streams": self.upstream_calls["stream"],
+            "streams_saved": self.calls_saved["stream"],
+            "max_waiters": self.max_waiters
+        }
+
+coalescer = RequestCoalescer()
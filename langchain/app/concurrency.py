@@ -0,0 +1,34 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# Maximum number of threads used for LangChain calls that only have a synchronous path
+BLOCKING_POOL_SIZE = int(os.getenv("BLOCKING_POOL_SIZE", "16"))
+
+_blocking_pool = ThreadPoolExecutor(
+    max_workers=BLOCKING_POOL_SIZE,
+    thread_name_prefix="langchain-blocking"
+)
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a synchronous callable on the bounded thread pool so it does not block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_pool, functools.partial(func, *args, **kwargs))
+
+async def ainvoke(runnable, inputs, config=None):
+    """
+    Invoke a chain, model or agent asynchronously.
+
+    Uses the native `ainvoke` when the object provides one and falls back to
+    running `invoke` on the bounded thread pool otherwise.
+    """
+    if hasattr(runnable, "ainvoke"):
+        return await runnable.ainvoke(inputs, config=config)
+    return await run_blocking(runnable.invoke, inputs, config=config)
+
+def shutdown():
+    """Stop accepting new blocking work and wait for running calls to finish."""
+    _blocking_pool.shutdown(wait=True)
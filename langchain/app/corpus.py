@@ -0,0 +1,318 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import zlib
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from langchain_community.vectorstores import FAISS
+
+from concurrency import run_blocking
+from ingestion import spool_upload, split_files
+from document_store import document_store
+from vector_index import vector_index
+
+# Processes splitting corpus documents; one per core by default
+CORPUS_WORKERS = int(os.getenv("CORPUS_WORKERS", str(os.cpu_count() or 1)))
+# Files handed to a splitting process at a time
+CORPUS_FILES_PER_TASK = int(os.getenv("CORPUS_FILES_PER_TASK", "64"))
+# Chunks sent to the embeddings client per call
+CORPUS_EMBED_BATCH_SIZE = int(os.getenv("CORPUS_EMBED_BATCH_SIZE", "2000"))
+# Embedding calls of one corpus in flight at once
+CORPUS_EMBED_CONCURRENCY = int(os.getenv("CORPUS_EMBED_CONCURRENCY", "4"))
+# Maximum number of documents in one corpus, counting archive members
+CORPUS_MAX_FILES = int(os.getenv("CORPUS_MAX_FILES", "100000"))
+# Maximum uncompressed size of one document, archive members included
+CORPUS_MAX_FILE_BYTES = int(os.getenv("CORPUS_MAX_FILE_BYTES", str(100 * 1024 * 1024)))
+# Maximum uncompressed size of a whole corpus
+CORPUS_MAX_BYTES = int(os.getenv("CORPUS_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+# Jobs remembered for the progress endpoint, oldest forgotten first
+CORPUS_MAX_JOBS = int(os.getenv("CORPUS_MAX_JOBS", "100"))
+
+# File errors kept per job; the rest are only counted
+_MAX_REPORTED_FAILURES = 20
+_COPY_BLOCK_SIZE = 1024 * 1024
+
+def _is_archive(name):
+    name = name.lower()
+    return name.endswith((".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz"))
+
+def _too_large(source, limit):
+    return HTTPException(status_code=413, detail=f"{source} exceeds the size limit of {limit} bytes")
+
+def _copy_member(source_file, path, source, limit):
+    # Copy an archive member to disk while hashing it, stopping once it exceeds `limit` bytes
+    hasher = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as f:
+        while True:
+            block = source_file.read(_COPY_BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > limit:
+                raise _too_large(source, limit)
+            f.write(block)
+            hasher.update(block)
+    return hasher.hexdigest(), written
+
+def _extract(archive_path, archive_name, work_dir, first_number, max_files, max_bytes):
+    """
+    Write the regular files of a zip or tar archive into `work_dir` under numbered names.
+
+    Member names are only kept as the document source, never used as paths, so
+    an archive cannot write outside the work directory. No member may unpack to
+    more than CORPUS_MAX_FILE_BYTES and all of them together to more than
+    `max_bytes`; sizes are checked against the archive's headers before a member
+    is written and against the bytes actually written, so a forged header does
+    not help. Returns the files and the number of bytes written.
+    """
+    files = []
+    total = 0
+
+    def add(name, size, open_member):
+        nonlocal total
+        source = f"{archive_name}/{name}"
+        if first_number + len(files) >= max_files:
+            raise HTTPException(status_code=413, detail=f"A corpus may contain at most {max_files} files")
+        limit = min(CORPUS_MAX_FILE_BYTES, max_bytes - total)
+        if size > limit:
+            raise _too_large(source, limit)
+        path = os.path.join(work_dir, f"{first_number + len(files):08d}")
+        with open_member() as member_file:
+            digest, written = _copy_member(member_file, path, source, limit)
+        total += written
+        files.append((path, source, digest))
+
+    try:
+        if zipfile.is_zipfile(archive_path):
+            with zipfile.ZipFile(archive_path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        add(info.filename, info.file_size, lambda: archive.open(info))
+        else:
+            with tarfile.open(archive_path) as archive:
+                for member in archive:
+                    if member.isfile():
+                        add(member.name, member.size, lambda: archive.extractfile(member))
+    except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError) as e:
+        # Corrupt data, or a member whose content does not match its header
+        raise HTTPException(status_code=400, detail=f"Unreadable archive {archive_name}: {str(e)}")
+    return files, total
+
+def corpus_id(files):
+    """Content address of a corpus: the hash of its document names and content hashes."""
+    hasher = hashlib.sha256()
+    for source, digest in sorted((source, digest) for _, source, digest in files):
+        hasher.update(f"{source}\0{digest}\n".encode("utf-8"))
+    return hasher.hexdigest()
+
+class CorpusIngestion:
+    """
+    Ingests a corpus of many documents into one FAISS index in the document store.
+
+    Uploads are spooled to a work directory (archives are unpacked into it),
+    then splitting runs on a pool of worker processes, `files_per_task` files
+    per task, so it uses every core instead of the event loop thread. Chunks
+    are embedded in batches of `embed_batch_size` as soon as enough have been
+    split, with up to `embed_concurrency` batches in flight, and each embedded
+    batch is added to the corpus index. Once every chunk is indexed the index
+    is converted to the configured type (see `vector_index`), stored under the
+    corpus id and can be queried with /document_qa. Progress is kept per job.
+    """
+
+    def __init__(self, workers=CORPUS_WORKERS, files_per_task=CORPUS_FILES_PER_TASK,
+                 embed_batch_size=CORPUS_EMBED_BATCH_SIZE, embed_concurrency=CORPUS_EMBED_CONCURRENCY):
+        self.workers = workers
+        self.files_per_task = files_per_task
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self._pool = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._tasks = set()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    async def _spool(self, uploads, work_dir):
+        files = []
+        total = 0
+        for upload in uploads:
+            temp_path, digest = await spool_upload(upload)
+            name = upload.filename or f"file-{len(files)}"
+            try:
+                if _is_archive(name):
+                    extracted, written = await run_blocking(
+                        _extract, temp_path, name, work_dir, len(files), CORPUS_MAX_FILES, CORPUS_MAX_BYTES - total
+                    )
+                    files.extend(extracted)
+                    total += written
+                    continue
+                if len(files) >= CORPUS_MAX_FILES:
+                    raise HTTPException(status_code=413, detail=f"A corpus may contain at most {CORPUS_MAX_FILES} files")
+                size = os.path.getsize(temp_path)
+                limit = min(CORPUS_MAX_FILE_BYTES, CORPUS_MAX_BYTES - total)
+                if size > limit:
+                    raise _too_large(name, limit)
+                total += size
+                path = os.path.join(work_dir, f"{len(files):08d}")
+                shutil.move(temp_path, path)
+                files.append((path, name, digest))
+            finally:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+        return files
+
+    async def start(self, uploads, embeddings):
+        """Spool the uploads and start ingesting them in the background; returns the new job."""
+        work_dir = tempfile.mkdtemp(prefix="corpus-")
+        try:
+            files = await self._spool(uploads, work_dir)
+        except BaseException:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        if not files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise HTTPException(status_code=400, detail="The corpus contains no files")
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "document_id": corpus_id(files),
+            "files_total": len(files),
+            "files_split": 0,
+            "files_failed": 0,
+            "failures": [],
+            "chunks_split": 0,
+            "chunks_indexed": 0,
+            "index_type": None,
+            "seconds": 0.0,
+            "error": None
+        }
+        self._jobs[job["job_id"]] = job
+        while len(self._jobs) > CORPUS_MAX_JOBS:
+            self._jobs.popitem(last=False)
+
+        task = asyncio.create_task(self._run(job, files, work_dir, embeddings))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return dict(job)
+
+    async def _run(self, job, files, work_dir, embeddings):
+        start = time.perf_counter()
+        try:
+            if await run_blocking(document_store.exists, job["document_id"]):
+                # The same corpus was ingested before
+                job["files_split"] = job["files_total"]
+            else:
+                vectorstore = await self._ingest(job, files, embeddings)
+                job["status"] = "storing"
+                await run_blocking(document_store.put, job["document_id"], vectorstore)
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["seconds"] = round(time.perf_counter() - start, 3)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _ingest(self, job, files, embeddings):
+        job["status"] = "running"
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        async def split(group):
+            chunks, failures = await loop.run_in_executor(pool, split_files, group)
+            return len(group), chunks, failures
+
+        split_tasks = [
+            asyncio.ensure_future(split([(path, source) for path, source, _ in files[i:i + self.files_per_task]]))
+            for i in range(0, len(files), self.files_per_task)
+        ]
+        embed_tasks = set()
+        state = {"vectorstore": None}
+
+        async def embed(batch):
+            vectors = await embeddings.aembed_documents([text for text, _ in batch])
+            return batch, vectors
+
+        async def index(limit):
+            # Add finished batches to the index until at most `limit` embedding calls are in flight
+            while len(embed_tasks) > limit:
+                done, _ = await asyncio.wait(embed_tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    embed_tasks.discard(task)
+                    batch, vectors = task.result()
+                    text_embeddings = [(text, vector) for (text, _), vector in zip(batch, vectors)]
+                    metadatas = [metadata for _, metadata in batch]
+                    if state["vectorstore"] is None:
+                        state["vectorstore"] = await run_blocking(
+                            FAISS.from_embeddings, text_embeddings, embeddings, metadatas=metadatas
+                        )
+                    else:
+                        await run_blocking(state["vectorstore"].add_embeddings, text_embeddings, metadatas=metadatas)
+                    job["chunks_indexed"] += len(batch)
+
+        pending = []
+        try:
+            for next_split in asyncio.as_completed(split_tasks):
+                count, chunks, failures = await next_split
+                job["files_split"] += count
+                job["files_failed"] += len(failures)
+                job["failures"].extend(
+                    {"source": source, "error": error}
+                    for source, error in failures[:_MAX_REPORTED_FAILURES - len(job["failures"])]
+                )
+                job["chunks_split"] += len(chunks)
+                pending.extend(chunks)
+                while len(pending) >= self.embed_batch_size:
+                    batch, pending = pending[:self.embed_batch_size], pending[self.embed_batch_size:]
+                    embed_tasks.add(asyncio.ensure_future(embed(batch)))
+                    await index(self.embed_concurrency - 1)
+            if pending:
+                embed_tasks.add(asyncio.ensure_future(embed(pending)))
+            await index(0)
+        except BaseException:
+            for task in list(embed_tasks) + split_tasks:
+                task.cancel()
+            raise
+
+        if state["vectorstore"] is None:
+            raise ValueError("The corpus contains no text")
+        job["status"] = "building index"
+        job["index_type"] = await run_blocking(vector_index.convert, state["vectorstore"])
+        return state["vectorstore"]
+
+    def progress(self, job_id):
+        """Return a snapshot of a job, or None if it is unknown."""
+        job = self._jobs.get(job_id)
+        return dict(job, failures=list(job["failures"])) if job is not None else None
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # Splitting tasks are short, so wait for the workers rather than orphaning them
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def metrics(self):
+        statuses = {}
+        for job in self._jobs.values():
+            statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+        return {"workers": self.workers, "jobs": statuses}
+
+corpus_ingestion = CorpusIngestion()
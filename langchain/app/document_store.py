@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+import faiss
+from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from vector_index import tune
+
+# Directory holding one sub-directory per processed document
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", "data/documents")
+# Maximum number of FAISS indexes kept in memory at once
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", "32"))
+
+# Document ids are SHA-256 hex digests of the content
+DOCUMENT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.json"
+
+def is_document_id(value):
+    """Whether `value` has the form of a document id."""
+    return isinstance(value, str) and DOCUMENT_ID_PATTERN.fullmatch(value) is not None
+
+class DocumentStore:
+    """
+    Content-addressed store of FAISS indexes for uploaded documents.
+
+    Each document is saved under the SHA-256 of its content as a FAISS index
+    plus a JSON file with the chunk text and metadata. Indexes are memory-mapped
+    when loaded back and at most `cache_size` of them stay in memory (LRU).
+    """
+
+    def __init__(self, root=DOCUMENT_STORE_DIR, cache_size=DOCUMENT_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, document_id):
+        # Never let an id address anything but a direct child of the store
+        if not is_document_id(document_id):
+            raise ValueError(f"Invalid document_id: {document_id!r}")
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, document_id))
+        if os.path.dirname(path) != root:
+            raise ValueError(f"Invalid document_id: {document_id!r}")
+        return path
+
+    def exists(self, document_id):
+        return os.path.exists(os.path.join(self._path(document_id), INDEX_FILE))
+
+    def _remember(self, document_id, vectorstore):
+        with self._lock:
+            self._cache[document_id] = vectorstore
+            self._cache.move_to_end(document_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, document_id, embeddings):
+        """
+        Return the vector store for a document, or None if it has never been stored.
+        """
+        with self._lock:
+            vectorstore = self._cache.get(document_id)
+            if vectorstore is not None:
+                self._cache.move_to_end(document_id)
+                self.hits += 1
+                return vectorstore
+            self.misses += 1
+
+        if not self.exists(document_id):
+            return None
+
+        vectorstore = self._load(document_id, embeddings)
+        self._remember(document_id, vectorstore)
+        return vectorstore
+
+    def _load(self, document_id, embeddings):
+        path = self._path(document_id)
+        index_path = os.path.join(path, INDEX_FILE)
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type supports memory mapping
+            index = faiss.read_index(index_path)
+        tune(index)
+
+        with open(os.path.join(path, CHUNKS_FILE)) as f:
+            chunks = json.load(f)
+
+        docstore = InMemoryDocstore({
+            chunk["id"]: Document(page_content=chunk["page_content"], metadata=chunk["metadata"])
+            for chunk in chunks
+        })
+        index_to_docstore_id = {i: chunk["id"] for i, chunk in enumerate(chunks)}
+        self.loads += 1
+        return FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id
+        )
+
+    def put(self, document_id, vectorstore):
+        """Persist a vector store under the document id and keep it in memory."""
+        chunks = []
+        for position in range(len(vectorstore.index_to_docstore_id)):
+            docstore_id = vectorstore.index_to_docstore_id[position]
+            document = vectorstore.docstore.search(docstore_id)
+            chunks.append({"id": docstore_id, "page_content": document.page_content, "metadata": document.metadata})
+
+        # Write into a temporary directory first so readers never see a partial index
+        temp_dir = tempfile.mkdtemp(dir=self.root)
+        try:
+            faiss.write_index(vectorstore.index, os.path.join(temp_dir, INDEX_FILE))
+            with open(os.path.join(temp_dir, CHUNKS_FILE), "w") as f:
+                json.dump(chunks, f)
+            try:
+                os.rename(temp_dir, self._path(document_id))
+            except OSError:
+                # Another request stored the same content first
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        self._remember(document_id, vectorstore)
+
+    def metrics(self):
+        return {
+            "indexes_in_memory": len(self._cache),
+            "cache_size": self.cache_size,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "disk_loads": self.loads,
+            "evictions": self.evictions
+        }
+
+document_store = DocumentStore()
@@ -0,0 +1,286 @@
+import os
+import time
+import array
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from langchain_core.embeddings import Embeddings
+
+from concurrency import run_blocking
+from clients import registry, DEFAULT_EMBEDDING_MODEL
+from tokens import count_tokens
+
+# SQLite file holding cached embedding vectors
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embeddings.sqlite3")
+# Maximum number of cached vectors before the least recently used ones are evicted
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+# Largest number of texts sent to the embeddings API in one call
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "1000"))
+# How long the batcher waits for more texts from concurrent uploads before flushing
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "20"))
+# Price used to estimate the cost saved by cache hits, in USD per 1K tokens
+EMBEDDING_PRICE_PER_1K = float(os.getenv("EMBEDDING_PRICE_PER_1K", "0.0001"))
+
+# Maximum number of keys looked up in one SQLite query
+_LOOKUP_CHUNK = 500
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of embedding vectors keyed on model name plus text.
+
+    At most `max_entries` vectors are kept; once a write goes over the cap the
+    least recently used ones are evicted.
+    """
+
+    # Only refresh an entry's last access time if it is older than this, to keep hits read-mostly
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [column[1] for column in self._conn.execute("PRAGMA table_info(embeddings)")]
+        if "accessed_at" not in columns:
+            # Cache files written before entries were evicted; their vectors count as least recently used
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.evictions = 0
+
+    def get_many(self, model, texts):
+        """Return a dict of text -> vector for the texts that are cached."""
+        keys = {cache_key(model, text): text for text in texts}
+        found = {}
+        stale = []
+        key_list = list(keys)
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(key_list), _LOOKUP_CHUNK):
+                chunk = key_list[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, accessed_at FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob, accessed_at in rows:
+                    found[keys[key]] = array.array("f", blob).tolist()
+                    if now - accessed_at >= self.TOUCH_INTERVAL:
+                        stale.append((now, key))
+            if stale:
+                self._conn.executemany("UPDATE embeddings SET accessed_at = ? WHERE key = ?", stale)
+                self._conn.commit()
+        return found
+
+    def put_many(self, model, vectors):
+        """Store a dict of text -> vector."""
+        now = time.time()
+        rows = [
+            (cache_key(model, text), model, array.array("f", vector).tobytes(), now, now)
+            for text, vector in vectors.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if entries <= self.max_entries:
+            return
+        # Evict down to 90% of the cap so the next few writes do not trigger another sweep
+        cursor = self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)",
+            (entries - int(self.max_entries * 0.9),)
+        )
+        self.evictions += cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, hit_texts, miss_count):
+        self.hits += len(hit_texts)
+        self.misses += miss_count
+        if hit_texts:
+            self.tokens_saved += sum(count_tokens(text) for text in hit_texts)
+
+    def metrics(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "cost_saved_usd": round(self.tokens_saved / 1000 * EMBEDDING_PRICE_PER_1K, 6)
+        }
+
+class EmbeddingBatcher:
+    """
+    Micro-batcher that merges texts from concurrent callers into large embedding calls.
+
+    Texts are collected for up to `window_ms` (or until `max_batch_size` texts are
+    pending) and then embedded in one request. A text that is already pending or
+    in flight is not sent again; callers share its result.
+    """
+
+    def __init__(self, embeddings, max_batch_size=EMBEDDING_BATCH_SIZE, window_ms=EMBEDDING_BATCH_WINDOW_MS):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self._pending = {}
+        self._inflight = {}
+        self._tasks = set()
+        self._timer = None
+        self.batches = 0
+        self.texts_sent = 0
+
+    async def embed(self, texts):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = self._pending.get(text) or self._inflight.get(text)
+            if future is None:
+                future = loop.create_future()
+                self._pending[text] = future
+                if len(self._pending) >= self.max_batch_size:
+                    self._flush()
+                elif self._timer is None:
+                    self._timer = loop.call_later(self.window, self._flush)
+            futures.append(future)
+        # Shield the shared futures so one cancelled request does not fail the others
+        return await asyncio.gather(*(asyncio.shield(future) for future in futures))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        self._inflight.update(batch)
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        texts = list(batch)
+        self.batches += 1
+        self.texts_sent += len(texts)
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            for text in texts:
+                self._inflight.pop(text, None)
+        for text, vector in zip(texts, vectors):
+            future = batch[text]
+            if not future.done():
+                future.set_result(vector)
+
+    def metrics(self):
+        return {
+            "batches": self.batches,
+            "texts_sent": self.texts_sent,
+            "average_batch_size": self.texts_sent / self.batches if self.batches else 0.0,
+            "pending": len(self._pending),
+            "in_flight": len(self._inflight)
+        }
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from the cache and batches the rest."""
+
+    def __init__(self, embeddings, model, cache, batcher):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+        self.batcher = batcher
+
+    def _split(self, texts, cached):
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        # Every occurrence not sent upstream counts as a hit, including repeats within the call
+        first_seen = set(missing)
+        hit_texts = []
+        for text in texts:
+            if text in first_seen:
+                first_seen.discard(text)
+            else:
+                hit_texts.append(text)
+        return missing, hit_texts
+
+    def embed_documents(self, texts):
+        vectors = self.cache.get_many(self.model, texts)
+        missing, hit_texts = self._split(texts, vectors)
+        if missing:
+            new_vectors = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(self.model, new_vectors)
+            vectors.update(new_vectors)
+        self.cache.record(hit_texts, len(missing))
+        return [vectors[text] for text in texts]
+
+    async def aembed_documents(self, texts):
+        vectors = await run_blocking(self.cache.get_many, self.model, texts)
+        missing, hit_texts = self._split(texts, vectors)
+        if missing:
+            new_vectors = dict(zip(missing, await self.batcher.embed(missing)))
+            await run_blocking(self.cache.put_many, self.model, new_vectors)
+            vectors.update(new_vectors)
+        self.cache.record(hit_texts, len(missing))
+        return [vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+_cache = None
+_cached_embeddings = {}
+
+def get_cached_embeddings(model=DEFAULT_EMBEDDING_MODEL):
+    """Return the process-wide cached and batched embeddings client for a model."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache()
+    if model not in _cached_embeddings:
+        embeddings = registry.get_embeddings(model)
+        _cached_embeddings[model] = CachedEmbeddings(embeddings, model, _cache, EmbeddingBatcher(embeddings))
+    return _cached_embeddings[model]
+
+def close():
+    """Close the cache file and forget the wrappers so they are rebuilt on the next registry start."""
+    global _cache
+    _cached_embeddings.clear()
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+def metrics():
+    result = _cache.metrics() if _cache is not None else {}
+    result["batchers"] = {model: cached.batcher.metrics() for model, cached in _cached_embeddings.items()}
+    return result
@@ -0,0 +1,150 @@
+import os
+import codecs
+import asyncio
+import hashlib
+import tempfile
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from concurrency import run_blocking
+from vector_index import vector_index
+
+# Bytes read from the upload per iteration
+UPLOAD_READ_SIZE = int(os.getenv("UPLOAD_READ_SIZE", str(1024 * 1024)))
+# Bytes of text handed to the splitter at a time
+SPLIT_BLOCK_SIZE = int(os.getenv("SPLIT_BLOCK_SIZE", str(1024 * 1024)))
+# Chunks embedded and added to the index per batch
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+def _write_block(temp_file, hasher, block):
+    temp_file.write(block)
+    hasher.update(block)
+
+async def spool_upload(file):
+    """
+    Copy an upload to a temporary file in fixed-size blocks while hashing it.
+
+    Returns the temporary file path and the SHA-256 of the content. The caller
+    owns the file and must remove it.
+    """
+    hasher = hashlib.sha256()
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        with temp_file:
+            while True:
+                block = await file.read(UPLOAD_READ_SIZE)
+                if not block:
+                    break
+                await run_blocking(_write_block, temp_file, hasher, block)
+    except BaseException:
+        os.unlink(temp_file.name)
+        raise
+    return temp_file.name, hasher.hexdigest()
+
+def iter_chunks(path, source, block_size=SPLIT_BLOCK_SIZE):
+    """
+    Yield split chunks of a UTF-8 text file without loading the whole file.
+
+    The file is decoded and split one block at a time. The last chunk of each
+    block may be cut short by the block boundary, so its text is carried into
+    the next block and split again there.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True
+    )
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    carry = ""
+    offset = 0
+
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            final = not block
+            text = carry + decoder.decode(block, final=final)
+            if not text:
+                break
+
+            chunks = splitter.create_documents([text], metadatas=[{"source": source}])
+            if not final and len(chunks) > 1:
+                # Hold back the last chunk until the following text is known
+                tail_start = chunks[-1].metadata["start_index"]
+                chunks = chunks[:-1]
+                carry = text[tail_start:]
+            elif not final:
+                chunks = []
+                carry = text
+                tail_start = 0
+            else:
+                carry = ""
+                tail_start = len(text)
+
+            for chunk in chunks:
+                chunk.metadata["start_index"] += offset
+                yield chunk
+            offset += tail_start
+
+            if final:
+                break
+
+def split_files(files):
+    """
+    Split a group of corpus files; runs in a worker process.
+
+    `files` holds (path, source) pairs. Returns the (text, metadata) of every
+    chunk, and the (source, error) of every file that could not be read as
+    UTF-8 text.
+    """
+    chunks = []
+    failures = []
+    for path, source in files:
+        try:
+            chunks.extend([(chunk.page_content, chunk.metadata) for chunk in iter_chunks(path, source)])
+        except (OSError, UnicodeDecodeError) as e:
+            failures.append((source, str(e)))
+    return chunks, failures
+
+def _next_batch(chunks, size):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            break
+    return batch
+
+async def build_index(path, source, embeddings, batch_size=INGEST_BATCH_SIZE):
+    """
+    Split, embed and index a text file as a pipeline of fixed-size batches.
+
+    While one batch is being embedded the next one is split, so at most two
+    batches of chunk text are held outside the index at any time.
+    """
+    chunks = iter_chunks(path, source)
+    vectorstore = None
+    batch = await run_blocking(_next_batch, chunks, batch_size)
+
+    while batch:
+        embed_task = asyncio.ensure_future(embeddings.aembed_documents([chunk.page_content for chunk in batch]))
+        try:
+            next_batch = await run_blocking(_next_batch, chunks, batch_size)
+        except BaseException:
+            embed_task.cancel()
+            raise
+        vectors = await embed_task
+
+        text_embeddings = [(chunk.page_content, vector) for chunk, vector in zip(batch, vectors)]
+        metadatas = [chunk.metadata for chunk in batch]
+        if vectorstore is None:
+            vectorstore = await run_blocking(FAISS.from_embeddings, text_embeddings, embeddings, metadatas=metadatas)
+        else:
+            await run_blocking(vectorstore.add_embeddings, text_embeddings, metadatas=metadatas)
+        batch = next_batch
+
+    if vectorstore is None:
+        raise ValueError("Document is empty")
+    await run_blocking(vector_index.convert, vectorstore)
+    return vectorstore
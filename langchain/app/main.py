@@ -1,26 +1,35 @@
 import os
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, UploadFile, Request
 from pydantic import BaseModel
-import tempfile
 from typing import List, Optional
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse
 
 # LangChain core imports
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain.schema import SystemMessage, HumanMessage
-from langchain.chains import LLMChain, ConversationChain, RetrievalQA
+from langchain.chains import ConversationChain, RetrievalQA
 from langchain.memory import ConversationBufferMemory
 from langchain.agents import AgentType, initialize_agent, Tool
 
-# Imports from langchain-community
-from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from concurrency import ainvoke, run_blocking, shutdown as shutdown_blocking_pool
+from clients import registry
+from streaming import sse_response
+from document_store import document_store, is_document_id
+from ingestion import spool_upload, build_index
+from session_store import create_session_store
+from summary_memory import MEMORY_MODE, TokenBudgetMemory, summarizer
+import embedding_cache
+import agent_telemetry
+from agent_telemetry import AgentTelemetryHandler
+from calculator import calculator
+from semantic_cache import semantic_cache, cache_namespace
+from coalescing import coalescer
+from batch import parse_batch, batch_response
+from corpus import corpus_ingestion
+from vector_index import vector_index
 
 # Load environment variables
 load_dotenv()
@@ -44,171 +53,343 @@ class ChatRequest(BaseModel):
 class QueryResponse(BaseModel):
     response: str
 
+# Agent executors built once at startup, keyed by whether they stream tokens
+agents = {}
+
 # Memory storage for conversations
-conversation_memories = {}
+session_store = create_session_store(
+    new_memory=TokenBudgetMemory if MEMORY_MODE == "summary" else ConversationBufferMemory
+)
+
+@app.on_event("startup")
+async def startup_event():
+    registry.start()
+    # Executors keep no per-run state, so one instance serves concurrent requests
+    agents[False] = build_agent()
+    agents[True] = build_agent(streaming=True)
+    # Start the calculator worker processes before the first agent needs them
+    await calculator.arun("1 + 1")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await summarizer.drain()
+    embedding_cache.close()
+    await registry.close()
+    calculator.shutdown()
+    corpus_ingestion.shutdown()
+    shutdown_blocking_pool()
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to LangChain API Example"}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Report runtime metrics for the shared model clients, document indexes, embedding cache, sessions and agent.
+    """
+    return {
+        "clients": registry.metrics(),
+        "documents": document_store.metrics(),
+        "embeddings": embedding_cache.metrics(),
+        "sessions": session_store.metrics(),
+        "summaries": summarizer.metrics(),
+        "agent": agent_telemetry.metrics(),
+        "calculator": calculator.metrics(),
+        "semantic_cache": semantic_cache.metrics(),
+        "coalescing": coalescer.metrics(),
+        "corpus": corpus_ingestion.metrics(),
+        "vector_index": vector_index.metrics()
+    }
+
+def build_generate_chain(streaming=False):
+    # Get the shared LLM client
+    llm = registry.get_chat_model("gpt-3.5-turbo", temperature=0.7, streaming=streaming)
+    
+    # Create a prompt template
+    prompt_template = PromptTemplate(
+        input_variables=["query"],
+        template="You are a helpful assistant. Answer the following query: {query}"
+    )
+    
+    # Create a chain
+    return prompt_template | llm | StrOutputParser()
+
+def build_chat_messages(query):
+    return [
+        SystemMessage(content="You are a helpful assistant that provides concise answers."),
+        HumanMessage(content=query)
+    ]
+
+async def chat_response(chat_model, query):
+    response = await ainvoke(chat_model, build_chat_messages(query))
+    return response.content
+
+async def build_conversation(session_id, streaming=False):
+    # Get or create memory for this session
+    memory = await run_blocking(session_store.get_memory, session_id)
+    
+    # Create the conversation chain with memory
+    llm = registry.get_chat_model("gpt-3.5-turbo", streaming=streaming)
+    return ConversationChain(
+        llm=llm, 
+        memory=memory,
+        verbose=True
+    )
+
+def schedule_summary(session_id, memory):
+    # Fold older turns into the rolling summary without delaying the response
+    llm = registry.get_chat_model("gpt-3.5-turbo", temperature=0)
+    summarizer.schedule(memory, llm, lambda folded: run_blocking(session_store.save_fold, session_id, memory, folded))
+
+def build_agent(streaming=False):
+    # Get the shared LLM client
+    llm = registry.get_chat_model("gpt-3.5-turbo", temperature=0, streaming=streaming)
+    
+    # Define tools
+    search_tool = Tool(
+        name="Search",
+        func=lambda x: "Search results for: " + x,
+        description="Useful for searching information"
+    )
+    
+    calculator_tool = Tool(
+        name="Calculator",
+        func=calculator.run,
+        coroutine=calculator.arun,
+        description="Useful for performing calculations. Input must be an arithmetic expression, e.g. 25 * 437"
+    )
+    
+    # Initialize the agent with tools; steps are traced by AgentTelemetryHandler instead of verbose output
+    return initialize_agent(
+        tools=[search_tool, calculator_tool],
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=False
+    )
+
 @app.post("/generate", response_model=QueryResponse)
 async def generate_response(request: QueryRequest):
     try:
-        # Initialize the LLM
-        llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.7
-        )
-        
-        # Create a prompt template
-        prompt_template = PromptTemplate(
-            input_variables=["query"],
-            template="You are a helpful assistant. Answer the following query: {query}"
-        )
+        chain = build_generate_chain()
+        namespace = cache_namespace("generate", chain)
         
-        # Create a chain
-        chain = LLMChain(
-            llm=llm,
-            prompt=prompt_template
+        # Run the chain without blocking the event loop, unless a similar query was already answered;
+        # identical requests in flight share one call
+        response = await semantic_cache.get_or_compute(
+            namespace,
+            request.query,
+            lambda: coalescer.run(namespace, request.query, lambda: ainvoke(chain, {"query": request.query}))
         )
         
-        # Run the chain
-        response = chain.run(query=request.query)
-        
         return QueryResponse(response=response)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+@app.post("/generate/stream")
+async def generate_stream(request: QueryRequest):
+    """
+    Streaming variant of /generate that sends tokens as Server-Sent Events.
+    """
+    chain = build_generate_chain(streaming=True)
+    # Identical streams in flight share one call, fanned out to every client
+    return sse_response(
+        lambda callbacks: coalescer.stream(
+            cache_namespace("generate", chain),
+            request.query,
+            lambda recorders: ainvoke(chain, {"query": request.query}, config={"callbacks": recorders}),
+            callbacks
+        )
+    )
+
+@app.post("/generate_batch")
+async def generate_batch(request: Request):
+    """
+    Run many prompts through the /generate chain and stream the results back as NDJSON as they finish.
+
+    The body is a JSON array or NDJSON, each item a query string or an object
+    with a "query" and an optional "id". Failed prompts are reported in their
+    own result line without failing the batch.
+    """
+    items = parse_batch(await request.body(), request.headers.get("content-type"))
+    return batch_response(build_generate_chain(), items)
+
 @app.post("/chat")
 async def chat(request: QueryRequest):
     try:
-        # Initialize the Chat Model
-        chat_model = ChatOpenAI(model_name="gpt-3.5-turbo")
-        
-        # Create messages
-        messages = [
-            SystemMessage(content="You are a helpful assistant that provides concise answers."),
-            HumanMessage(content=request.query)
-        ]
+        # Get the shared Chat Model client
+        chat_model = registry.get_chat_model("gpt-3.5-turbo")
+        namespace = cache_namespace("chat", chat_model)
         
-        # Get response
-        response = chat_model.invoke(messages)
+        # Get response, unless a similar query was already answered; identical requests in flight share one call
+        response = await semantic_cache.get_or_compute(
+            namespace,
+            request.query,
+            lambda: coalescer.run(namespace, request.query, lambda: chat_response(chat_model, request.query))
+        )
         
-        return {"response": response.content}
+        return {"response": response}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in chat: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(request: QueryRequest):
+    """
+    Streaming variant of /chat that sends tokens as Server-Sent Events.
+    """
+    chat_model = registry.get_chat_model("gpt-3.5-turbo", streaming=True)
+    # Identical streams in flight share one call, fanned out to every client
+    return sse_response(
+        lambda callbacks: coalescer.stream(
+            cache_namespace("chat", chat_model),
+            request.query,
+            lambda recorders: ainvoke(chat_model, build_chat_messages(request.query), config={"callbacks": recorders}),
+            callbacks
+        ),
+        lambda message: {"response": message.content}
+    )
+
 @app.post("/chat_with_memory")
 async def chat_with_memory(request: ChatRequest):
     """
     Chat endpoint with conversation memory to maintain context across interactions.
     """
     try:
-        # Get or create memory for this session
-        if request.session_id not in conversation_memories:
-            conversation_memories[request.session_id] = ConversationBufferMemory()
-        
-        memory = conversation_memories[request.session_id]
-        
-        # Create the conversation chain with memory
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo")
-        conversation = ConversationChain(
-            llm=llm, 
-            memory=memory,
-            verbose=True
-        )
+        conversation = await build_conversation(request.session_id)
         
         # Get response
-        response = conversation.predict(input=request.query)
+        response = await conversation.apredict(input=request.query)
+        await run_blocking(session_store.save_memory, request.session_id, conversation.memory)
+        schedule_summary(request.session_id, conversation.memory)
         
         return {"response": response, "session_id": request.session_id}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in chat with memory: {str(e)}")
 
+@app.post("/chat_with_memory/stream")
+async def chat_with_memory_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat_with_memory that sends tokens as Server-Sent Events.
+    """
+    conversation = await build_conversation(request.session_id, streaming=True)
+    
+    async def run(callbacks):
+        response = await conversation.apredict(input=request.query, callbacks=callbacks)
+        await run_blocking(session_store.save_memory, request.session_id, conversation.memory)
+        schedule_summary(request.session_id, conversation.memory)
+        return response
+    
+    return sse_response(run, lambda response: {"response": response, "session_id": request.session_id})
+
 @app.post("/document_qa")
-async def document_qa(file: UploadFile = File(...), query: Optional[str] = None):
+async def document_qa(file: Optional[UploadFile] = File(None), query: Optional[str] = None, document_id: Optional[str] = None):
     """
     Process a document and answer questions about it using RAG (Retrieval Augmented Generation).
+
+    Documents are stored by a hash of their content, so a later call can pass the
+    returned `document_id` instead of uploading the file again.
     """
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(file.file.read())
-            temp_file_path = temp_file.name
-        
-        # Load the document
-        loader = TextLoader(temp_file_path)
-        documents = loader.load()
-        
-        # Split the text into chunks
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = text_splitter.split_documents(documents)
-        
-        # Create embeddings and store in vector database
-        embeddings = OpenAIEmbeddings()
-        vectorstore = FAISS.from_documents(chunks, embeddings)
+        embeddings = embedding_cache.get_cached_embeddings()
         
-        # Create a retrieval QA chain
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0),
-            chain_type="stuff",
-            retriever=vectorstore.as_retriever()
-        )
-        
-        # Clean up the temp file
-        os.unlink(temp_file_path)
+        if file is not None:
+            # Stream the upload to disk in blocks while hashing it
+            temp_file_path, document_id = await spool_upload(file)
+            try:
+                vectorstore = await run_blocking(document_store.get, document_id, embeddings)
+                
+                if vectorstore is None:
+                    vectorstore = await build_index(temp_file_path, file.filename, embeddings)
+                    await run_blocking(document_store.put, document_id, vectorstore)
+            finally:
+                # Clean up the temp file
+                os.unlink(temp_file_path)
+        elif document_id:
+            if not is_document_id(document_id):
+                raise HTTPException(status_code=400, detail="document_id must be a 64-character hex digest")
+            vectorstore = await run_blocking(document_store.get, document_id, embeddings)
+            if vectorstore is None:
+                raise HTTPException(status_code=404, detail=f"Unknown document_id: {document_id}")
+        else:
+            raise HTTPException(status_code=400, detail="Provide either a file or a document_id")
         
         # If query is provided, answer it
         if query:
-            answer = qa_chain.run(query)
-            return {"response": answer}
+            # Create a retrieval QA chain
+            qa_chain = RetrievalQA.from_chain_type(
+                llm=registry.get_chat_model("gpt-3.5-turbo", temperature=0),
+                chain_type="stuff",
+                retriever=vectorstore.as_retriever()
+            )
+            result = await ainvoke(qa_chain, {"query": query})
+            return {"response": result["result"], "document_id": document_id}
         else:
-            return {"message": "Document processed successfully. You can now ask questions about it using the /document_qa endpoint with a query parameter."}
+            return {
+                "message": "Document processed successfully. You can now ask questions about it using the /document_qa endpoint with the document_id and a query parameter.",
+                "document_id": document_id
+            }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in document QA: {str(e)}")
 
+@app.post("/corpus")
+async def ingest_corpus(files: List[UploadFile] = File(...)):
+    """
+    Ingest many documents into one FAISS index: text files and/or zip or tar archives of them.
+
+    Returns a job right away; poll GET /corpus/{job_id} for progress. Once it is
+    done, ask questions with /document_qa and the job's `document_id`.
+    """
+    try:
+        return await corpus_ingestion.start(files, embedding_cache.get_cached_embeddings())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error ingesting corpus: {str(e)}")
+
+@app.get("/corpus/{job_id}")
+async def corpus_progress(job_id: str):
+    """
+    Report the progress of a corpus ingestion job.
+    """
+    job = corpus_ingestion.progress(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown corpus job: {job_id}")
+    return job
+
 @app.post("/agent")
 async def run_agent(request: QueryRequest):
     """
     Use LangChain's agent capabilities to solve complex tasks.
     """
     try:
-        # Initialize the LLM
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
-        
-        # Define tools
-        search_tool = Tool(
-            name="Search",
-            func=lambda x: "Search results for: " + x,
-            description="Useful for searching information"
-        )
-        
-        calculator_tool = Tool(
-            name="Calculator",
-            func=lambda x: eval(x),
-            description="Useful for performing calculations"
-        )
-        
-        # Initialize the agent with tools
-        agent = initialize_agent(
-            tools=[search_tool, calculator_tool],
-            llm=llm,
-            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            verbose=True
-        )
+        agent = agents[False]
         
         # Run the agent
-        response = agent.run(request.query)
+        result = await ainvoke(agent, {"input": request.query}, config={"callbacks": [AgentTelemetryHandler()]})
+        response = result["output"]
         
         return {"response": response}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error running agent: {str(e)}")
 
+@app.post("/agent/stream")
+async def run_agent_stream(request: QueryRequest):
+    """
+    Streaming variant of /agent that sends tokens and intermediate steps as Server-Sent Events.
+    """
+    agent = agents[True]
+    return sse_response(
+        lambda callbacks: ainvoke(agent, {"input": request.query}, config={"callbacks": callbacks + [AgentTelemetryHandler()]}),
+        lambda result: {"response": result["output"]}
+    )
+
 @app.get("/ui", response_class=HTMLResponse)
 async def get_ui():
     return FileResponse("static/index.html")
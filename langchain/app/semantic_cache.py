@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import faiss
+
+from concurrency import run_blocking
+from clients import registry
+
+# Set to "on" to answer /generate and /chat from earlier answers to similar queries
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "off")
+# Minimum cosine similarity between two normalized queries for a stored answer to be reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# Seconds a stored answer may be served after it was generated
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+# Maximum number of stored answers before the least recently used ones are evicted
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+
+# Neighbours checked per lookup, so an expired nearest entry does not hide a live one
+_SEARCH_K = 4
+
+def normalize_query(query):
+    """Lowercase, collapse whitespace and drop trailing punctuation, so trivial variants share one entry."""
+    return re.sub(r"\s+", " ", query).strip().lower().rstrip("?!. ")
+
+def cache_namespace(endpoint, runnable):
+    """
+    Namespace of the answers produced by a chat model, or by a chain containing one.
+
+    Answers are only shared between requests to the same endpoint (same prompt
+    template) with the same model and temperature.
+    """
+    steps = getattr(runnable, "steps", [runnable])
+    llm = next(step for step in steps if hasattr(step, "model_name"))
+    return (endpoint, llm.model_name, llm.temperature)
+
+class SemanticCache:
+    """
+    Response cache that reuses the answer of an earlier, similar query.
+
+    Queries are normalized and looked up by exact text first; otherwise they
+    are embedded (through the shared embedding cache) and searched in a FAISS
+    inner-product index of normalized vectors, one index per namespace, so the
+    score is the cosine similarity. The nearest live entry at or above
+    `threshold` is a hit. Entries expire `ttl` seconds after they were stored
+    and at most `max_entries` are kept, least recently used first out.
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL_SECONDS, max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.enabled = SEMANTIC_CACHE == "on"
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._indexes = {}
+        self._exact = {}
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self.latency_saved = 0.0
+        self.lookup_seconds = 0.0
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        self._exact.pop((entry["namespace"], entry["query"]), None)
+        self._indexes[entry["namespace"]].remove_ids(np.array([entry_id], dtype="int64"))
+
+    def _live(self, entry_id, now):
+        # Return the entry if it has not expired, dropping it otherwise
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            return None
+        if now - entry["created"] >= self.ttl:
+            self._remove(entry_id)
+            self.ttl_evictions += 1
+            return None
+        self._entries.move_to_end(entry_id)
+        return entry
+
+    def _lookup_exact(self, namespace, query):
+        with self._lock:
+            entry_id = self._exact.get((namespace, query))
+            return self._live(entry_id, time.time()) if entry_id is not None else None
+
+    def _lookup_similar(self, namespace, vector):
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None or index.ntotal == 0:
+                return None
+            scores, ids = index.search(vector, min(_SEARCH_K, index.ntotal))
+            now = time.time()
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    break
+                entry = self._live(int(entry_id), now)
+                if entry is not None:
+                    return entry
+            return None
+
+    def _store(self, namespace, query, vector, answer, latency):
+        with self._lock:
+            previous = self._exact.get((namespace, query))
+            if previous is not None:
+                self._remove(previous)
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = {
+                "namespace": namespace, "query": query, "answer": answer, "latency": latency, "created": time.time()
+            }
+            self._exact[(namespace, query)] = entry_id
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.lru_evictions += 1
+
+    async def _embed(self, query):
+        # Queries bypass the persistent embedding cache: they expire with this cache, not on disk
+        vector = np.array([await registry.get_embeddings().aembed_query(query)], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    async def get_or_compute(self, namespace, query, compute):
+        """
+        Return the answer to `query`, reusing a stored answer to a similar query in the same namespace.
+
+        `compute` is a coroutine function that produces the answer on a miss.
+        Lookup errors are logged and treated as misses, so the cache never
+        fails a request that the model could answer.
+        """
+        if not self.enabled:
+            return await compute()
+
+        start = time.perf_counter()
+        normalized = normalize_query(query)
+        vector = None
+        entry = self._lookup_exact(namespace, normalized)
+        if entry is not None:
+            self.exact_hits += 1
+        else:
+            try:
+                vector = await self._embed(normalized)
+                entry = await run_blocking(self._lookup_similar, namespace, vector)
+            except Exception as e:
+                self.errors += 1
+                print(f"WARNING: Semantic cache lookup failed: {str(e)}")
+        lookup = time.perf_counter() - start
+        self.lookup_seconds += lookup
+
+        if entry is not None:
+            self.hits += 1
+            self.latency_saved += max(0.0, entry["latency"] - lookup)
+            return entry["answer"]
+
+        self.misses += 1
+        start = time.perf_counter()
+        answer = await compute()
+        if vector is not None:
+            await run_blocking(self._store, namespace, normalized, vector, answer, time.perf_counter() - start)
+        return answer
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "namespaces": len(self._indexes),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "average_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+            "errors": self.errors
+        }
+
+semantic_cache = SemanticCache()
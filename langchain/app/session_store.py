@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import sqlite3
+import weakref
+import threading
+from collections import OrderedDict
+from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+# Backend used for conversation memory: "memory" (in-process) or "sqlite" (shared, persistent)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+# Maximum number of sessions kept before the least recently used ones are evicted
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+# Seconds of inactivity after which a session is evicted
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+# SQLite file used by the sqlite backend
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.sqlite3")
+
+def dump_memory(memory):
+    """Serialize a conversation memory to a JSON-compatible dict."""
+    data = {"messages": messages_to_dict(memory.chat_memory.messages)}
+    if getattr(memory, "summary", None):
+        data["summary"] = memory.summary
+    return data
+
+def load_memory(memory, data):
+    """Restore a conversation memory from the dict produced by `dump_memory`."""
+    memory.chat_memory.messages = messages_from_dict(data.get("messages", []))
+    if "summary" in data and hasattr(memory, "summary"):
+        memory.summary = data["summary"]
+    return memory
+
+def _memory_bytes(memory):
+    size = sum(len(str(message.content).encode("utf-8")) for message in memory.chat_memory.messages)
+    return size + len(getattr(memory, "summary", "").encode("utf-8"))
+
+class InMemorySessionStore:
+    """
+    In-process session store with LRU and TTL eviction.
+
+    Memories live in this worker only and are lost on restart.
+    """
+
+    def __init__(self, new_memory=ConversationBufferMemory, max_sessions=SESSION_MAX_SESSIONS, ttl=SESSION_TTL_SECONDS):
+        self.new_memory = new_memory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl:
+                break
+            del self._sessions[session_id]
+            self.ttl_evictions += 1
+
+    def get_memory(self, session_id):
+        """Return the memory for a session, creating an empty one if needed."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            memory = entry[0] if entry else self.new_memory()
+            self._sessions[session_id] = (memory, now)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.lru_evictions += 1
+            return memory
+
+    def save_memory(self, session_id, memory):
+        """Record that a session was used; the memory object is already stored."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id] = (memory, time.time())
+                self._sessions.move_to_end(session_id)
+
+    def save_fold(self, session_id, memory, folded):
+        """Record a background fold; it was applied to the shared memory object in place."""
+        self.save_memory(session_id, memory)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def metrics(self):
+        with self._lock:
+            memories = [memory for memory, _ in self._sessions.values()]
+        return {
+            "backend": "memory",
+            "sessions": len(memories),
+            "max_sessions": self.max_sessions,
+            "memory_bytes": sum(_memory_bytes(memory) for memory in memories),
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions
+        }
+
+class SQLiteSessionStore:
+    """
+    Session store backed by a SQLite file.
+
+    Memories survive restarts and are shared by every uvicorn worker that opens
+    the same file. Each request loads the session and writes it back after the turn.
+    Every row carries a version, so a turn that was loaded before another write to
+    the same session is appended to the stored history instead of replacing it.
+    """
+
+    # Run the eviction sweep once every this many writes
+    SWEEP_INTERVAL = 100
+
+    def __init__(self, path=SESSION_DB_PATH, new_memory=ConversationBufferMemory, max_sessions=SESSION_MAX_SESSIONS, ttl=SESSION_TTL_SECONDS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.new_memory = new_memory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [column[1] for column in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "version" not in columns:
+            # Session files written before rows were versioned
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._conn.commit()
+        self._writes = 0
+        # id(memory) -> (version it was loaded at, number of messages it was loaded with)
+        self._loaded = {}
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self.merged_saves = 0
+
+    def _track(self, memory, version):
+        key = id(memory)
+        self._loaded[key] = (version, len(memory.chat_memory.messages))
+        weakref.finalize(memory, self._loaded.pop, key, None)
+
+    def get_memory(self, session_id):
+        """Load the memory for a session, or return an empty one if it is unknown or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at, version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        memory = self.new_memory()
+        if row and time.time() - row[1] < self.ttl:
+            load_memory(memory, json.loads(row[0]))
+        self._track(memory, row[2] if row else None)
+        return memory
+
+    def save_memory(self, session_id, memory):
+        """
+        Write the memory for a session back to the database.
+
+        If the stored row changed since `memory` was loaded, another turn (or a
+        background fold) was saved in between: only the messages this turn added
+        are appended to the stored history, so neither write is lost.
+        """
+        version, loaded = self._loaded.get(id(memory), (None, 0))
+        with self._lock:
+            # Take the write lock before reading so no other worker saves in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data, version FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if row is None or row[1] == version:
+                    data = dump_memory(memory)
+                    merged = False
+                else:
+                    data = json.loads(row[0])
+                    data["messages"] = data.get("messages", []) + messages_to_dict(memory.chat_memory.messages[loaded:])
+                    merged = True
+                new_version = row[1] + 1 if row else 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, updated_at, version) VALUES (?, ?, ?, ?)",
+                    (session_id, json.dumps(data), time.time(), new_version)
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            if merged:
+                self.merged_saves += 1
+            # After a merge this memory no longer matches the row, so a later save appends again
+            self._loaded[id(memory)] = (None if merged else new_version, len(memory.chat_memory.messages))
+            self._writes += 1
+            if self._writes % self.SWEEP_INTERVAL == 0:
+                self._sweep()
+
+    def save_fold(self, session_id, memory, folded):
+        """
+        Apply a background fold to the stored session.
+
+        The fold ran on a snapshot, and turns may have been saved for the session
+        since, so the stored row is re-read and only the folded prefix is replaced
+        by the new summary. The fold is dropped if the stored history no longer
+        starts with the folded messages.
+        """
+        prefix = json.loads(json.dumps(messages_to_dict(folded)))
+        with self._lock:
+            # Take the write lock before reading so no other worker saves in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                data = json.loads(row[0]) if row else None
+                if data is None or data.get("messages", [])[:len(prefix)] != prefix:
+                    self._conn.rollback()
+                    return False
+                data["messages"] = data["messages"][len(prefix):]
+                data["summary"] = memory.summary
+                self._conn.execute(
+                    "UPDATE sessions SET data = ?, version = version + 1 WHERE session_id = ?",
+                    (json.dumps(data), session_id)
+                )
+                self._conn.commit()
+                return True
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+    def _sweep(self):
+        cursor = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+        self.ttl_evictions += cursor.rowcount
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            "SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+        self.lru_evictions += cursor.rowcount
+        self._conn.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def metrics(self):
+        with self._lock:
+            sessions, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "memory_bytes": size,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+            "merged_saves": self.merged_saves
+        }
+
+def create_session_store(backend=SESSION_STORE, **kwargs):
+    """Create the session store selected by `SESSION_STORE`."""
+    if backend == "memory":
+        return InMemorySessionStore(**kwargs)
+    elif backend == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    else:
+        raise ValueError(f"Unsupported session store: {backend}")
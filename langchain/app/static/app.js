@@ -22,8 +22,55 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Session ID for memory chat
-    const sessionId = 'user_' + Math.random().toString(36).substring(2, 9);
-    let documentUploaded = false;
+    let sessionId = 'user_' + Math.random().toString(36).substring(2, 9);
+    let documentId = null;
+    
+    // POST a JSON body to a streaming endpoint and call onEvent for each Server-Sent Event.
+    // Events are read one network chunk at a time, so a slow page applies backpressure
+    // to the server instead of buffering the whole response.
+    async function streamEvents(url, body, onEvent) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify(body)
+        });
+        
+        if (!response.ok || !response.body) {
+            throw new Error('Request failed with status ' + response.status);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let eventName = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) eventName = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                
+                const payload = data ? JSON.parse(data) : {};
+                if (eventName === 'error') {
+                    throw new Error(payload.detail || 'Stream error');
+                }
+                onEvent(eventName, payload);
+            }
+        }
+    }
     
     // Simple Chat
     document.getElementById('simple-send').addEventListener('click', async () => {
@@ -34,16 +81,15 @@ document.addEventListener('DOMContentLoaded', function() {
         
         responseElement.textContent = 'Thinking...';
         try {
-            const response = await fetch('/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ query: prompt })
+            let text = '';
+            await streamEvents('/chat/stream', { query: prompt }, (event, data) => {
+                if (event === 'token') {
+                    text += data.token;
+                    responseElement.textContent = text;
+                } else if (event === 'done') {
+                    responseElement.textContent = data.response;
+                }
             });
-            
-            const data = await response.json();
-            responseElement.textContent = data.response;
         } catch (error) {
             responseElement.textContent = 'Error: ' + error.message;
         }
@@ -74,34 +120,35 @@ document.addEventListener('DOMContentLoaded', function() {
         // Scroll to bottom
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
         
+        // Assistant message is filled in as tokens arrive
+        const assistantMessageElement = document.createElement('div');
+        assistantMessageElement.classList.add('assistant-message');
+        
         try {
-            const response = await fetch('/chat_with_memory', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ 
-                    query: prompt,
-                    session_id: sessionId
-                })
+            let text = '';
+            await streamEvents('/chat_with_memory/stream', { query: prompt, session_id: sessionId }, (event, data) => {
+                if (event === 'token') {
+                    // Replace thinking message on the first token
+                    if (thinkingElement.parentNode) {
+                        messagesContainer.replaceChild(assistantMessageElement, thinkingElement);
+                    }
+                    text += data.token;
+                    assistantMessageElement.textContent = text;
+                } else if (event === 'done') {
+                    if (thinkingElement.parentNode) {
+                        messagesContainer.replaceChild(assistantMessageElement, thinkingElement);
+                    }
+                    assistantMessageElement.textContent = data.response;
+                }
+                
+                // Scroll to bottom
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
             });
-            
-            const data = await response.json();
-            
-            // Remove thinking message
-            messagesContainer.removeChild(thinkingElement);
-            
-            // Add assistant message
-            const assistantMessageElement = document.createElement('div');
-            assistantMessageElement.classList.add('assistant-message');
-            assistantMessageElement.textContent = data.response;
-            messagesContainer.appendChild(assistantMessageElement);
-            
-            // Scroll to bottom
-            messagesContainer.scrollTop = messagesContainer.scrollHeight;
         } catch (error) {
             // Remove thinking message
-            messagesContainer.removeChild(thinkingElement);
+            if (thinkingElement.parentNode) {
+                messagesContainer.removeChild(thinkingElement);
+            }
             
             // Add error message
             const errorElement = document.createElement('div');
@@ -154,7 +201,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 statusElement.textContent = data.message || 'Document uploaded and processed successfully.';
                 statusElement.className = 'success';
                 askButton.disabled = false;
-                documentUploaded = true;
+                documentId = data.document_id;
             } else {
                 statusElement.textContent = data.detail || 'Error uploading document.';
                 statusElement.className = 'error';
@@ -169,28 +216,25 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('document-ask').addEventListener('click', async () => {
         const query = document.getElementById('document-query').value.trim();
         const responseElement = document.getElementById('document-response');
-        const fileInput = document.getElementById('document-file');
         
         if (!query) return;
-        if (!documentUploaded) {
+        if (!documentId) {
             responseElement.textContent = 'Please upload a document first.';
             return;
         }
         
         responseElement.textContent = 'Thinking...';
         
-        const formData = new FormData();
-        formData.append('file', fileInput.files[0]);
-        formData.append('query', query);
+        // Ask about the stored document without uploading it again
+        const params = new URLSearchParams({ document_id: documentId, query: query });
         
         try {
-            const response = await fetch('/document_qa', {
-                method: 'POST',
-                body: formData
+            const response = await fetch('/document_qa?' + params.toString(), {
+                method: 'POST'
             });
             
             const data = await response.json();
-            responseElement.textContent = data.response;
+            responseElement.textContent = response.ok ? data.response : (data.detail || 'Error answering question.');
         } catch (error) {
             responseElement.textContent = 'Error: ' + error.message;
         }
@@ -205,16 +249,19 @@ document.addEventListener('DOMContentLoaded', function() {
         
         responseElement.textContent = 'Agent is working on your task...';
         try {
-            const response = await fetch('/agent', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ query: prompt })
+            const steps = [];
+            await streamEvents('/agent/stream', { query: prompt }, (event, data) => {
+                if (event === 'step') {
+                    steps.push('Action: ' + data.tool + '(' + JSON.stringify(data.tool_input) + ')');
+                } else if (event === 'observation') {
+                    steps.push('Observation: ' + data.output);
+                } else if (event === 'done') {
+                    steps.push('Answer: ' + data.response);
+                } else {
+                    return;
+                }
+                responseElement.textContent = steps.join('\n');
             });
-            
-            const data = await response.json();
-            responseElement.textContent = data.response;
         } catch (error) {
             responseElement.textContent = 'Error: ' + error.message;
         }
@@ -0,0 +1,93 @@
+import os
+import json
+import asyncio
+from langchain_core.callbacks import AsyncCallbackHandler
+from fastapi.responses import StreamingResponse
+
+# Maximum number of events buffered per stream before the producer waits for the client
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+# Seconds the producer may wait on a full buffer before the stream is aborted
+STREAM_STALL_TIMEOUT = float(os.getenv("STREAM_STALL_TIMEOUT", "30"))
+
+class StreamStalled(Exception):
+    """Raised when a client stops reading and the event buffer stays full."""
+
+class QueueCallbackHandler(AsyncCallbackHandler):
+    """
+    Callback handler that forwards LLM tokens and agent steps into a bounded queue.
+
+    `put` waits while the queue is full, which pauses the chain (and the upstream
+    token stream) until the client catches up instead of buffering without limit.
+    If the client stays stalled, the StreamStalled error is raised through the
+    callback manager and aborts the run rather than being logged and ignored.
+    """
+
+    raise_error = True
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    async def put(self, event, data):
+        try:
+            await asyncio.wait_for(self.queue.put((event, data)), STREAM_STALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise StreamStalled(f"Client did not read for {STREAM_STALL_TIMEOUT}s")
+
+    async def on_llm_new_token(self, token, **kwargs):
+        if token:
+            await self.put("token", {"token": token})
+
+    async def on_agent_action(self, action, **kwargs):
+        await self.put("step", {"tool": action.tool, "tool_input": action.tool_input, "log": action.log})
+
+    async def on_tool_end(self, output, **kwargs):
+        await self.put("observation", {"output": str(output)})
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _event_stream(run, to_payload):
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    handler = QueueCallbackHandler(queue)
+
+    async def producer():
+        try:
+            result = await run([handler])
+            await handler.put("done", to_payload(result))
+        except StreamStalled:
+            pass
+        except Exception as e:
+            try:
+                await handler.put("error", {"detail": str(e)})
+            except StreamStalled:
+                pass
+
+    task = asyncio.create_task(producer())
+    try:
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), STREAM_STALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                if task.done():
+                    break
+                continue
+            yield format_sse(event, data)
+            if event in ("done", "error"):
+                break
+    finally:
+        # Stop the chain if the client disconnected before it finished
+        task.cancel()
+
+def sse_response(run, to_payload=lambda result: {"response": result}):
+    """
+    Stream a LangChain run to the client as Server-Sent Events.
+
+    `run` is a coroutine function that receives the list of callbacks to attach
+    and returns the final result, which is sent as the closing `done` event.
+    """
+    return StreamingResponse(
+        _event_stream(run, to_payload),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
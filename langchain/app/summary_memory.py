@@ -0,0 +1,123 @@
+import os
+import asyncio
+from pydantic import PrivateAttr
+from langchain.memory import ConversationBufferMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.messages import get_buffer_string
+
+from tokens import count_tokens
+
+# Conversation memory type: "buffer" keeps the full transcript, "summary" keeps a token budget
+MEMORY_MODE = os.getenv("MEMORY_MODE", "buffer")
+# Token budget for the history sent with each turn (summary plus recent messages)
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+# Number of most recent messages that are never folded into the summary
+MEMORY_MIN_RECENT_MESSAGES = 2
+
+def _message_tokens(message):
+    return count_tokens(f"{message.type}: {message.content}")
+
+class TokenBudgetMemory(ConversationBufferMemory):
+    """
+    Conversation memory that keeps the prompt history within a token budget.
+
+    Older turns are folded into a rolling summary by `fold`, which runs in the
+    background after a turn. Until a fold finishes, the history is trimmed to the
+    most recent messages that fit the budget, so prompt size stays bounded on the
+    request path either way.
+    """
+
+    summary: str = ""
+    max_token_limit: int = MEMORY_TOKEN_BUDGET
+    _folding: bool = PrivateAttr(default=False)
+
+    def _recent_messages(self, messages):
+        budget = self.max_token_limit - (count_tokens(self.summary) if self.summary else 0)
+        recent = []
+        used = 0
+        for message in reversed(messages):
+            tokens = _message_tokens(message)
+            if used + tokens > budget and len(recent) >= MEMORY_MIN_RECENT_MESSAGES:
+                break
+            recent.append(message)
+            used += tokens
+        recent.reverse()
+        return recent
+
+    def _buffer_as_str(self, messages):
+        history = super()._buffer_as_str(self._recent_messages(messages))
+        if self.summary:
+            return f"Summary of earlier conversation: {self.summary}\n{history}"
+        return history
+
+    def needs_fold(self):
+        messages = self.chat_memory.messages
+        return not self._folding and len(self._recent_messages(messages)) < len(messages)
+
+    async def fold(self, llm):
+        """
+        Fold the messages that no longer fit the budget into the rolling summary.
+
+        Messages appended while the summary is generated are kept; only the
+        folded prefix is removed once the new summary is available. Returns the
+        folded messages, or an empty list if nothing was folded.
+        """
+        if self._folding:
+            return []
+        self._folding = True
+        try:
+            messages = list(self.chat_memory.messages)
+            to_fold = messages[:len(messages) - len(self._recent_messages(messages))]
+            if not to_fold:
+                return []
+
+            new_lines = get_buffer_string(to_fold, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)
+            prompt = SUMMARY_PROMPT.format(summary=self.summary, new_lines=new_lines)
+            result = await llm.ainvoke(prompt)
+
+            self.summary = result.content
+            self.chat_memory.messages = self.chat_memory.messages[len(to_fold):]
+            return to_fold
+        finally:
+            self._folding = False
+
+class BackgroundSummarizer:
+    """Runs memory folds as background tasks so they stay off the request path."""
+
+    def __init__(self):
+        self._tasks = set()
+        self.folds = 0
+        self.failures = 0
+
+    def schedule(self, memory, llm, on_folded=None):
+        """
+        Start a fold for `memory` if it is over budget.
+
+        `on_folded` is awaited with the folded messages after a successful fold.
+        """
+        if not isinstance(memory, TokenBudgetMemory) or not memory.needs_fold():
+            return
+        task = asyncio.get_running_loop().create_task(self._run(memory, llm, on_folded))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, memory, llm, on_folded):
+        try:
+            folded = await memory.fold(llm)
+            if folded:
+                self.folds += 1
+                if on_folded is not None:
+                    await on_folded(folded)
+        except Exception as e:
+            self.failures += 1
+            print(f"WARNING: conversation summary failed: {e}")
+
+    async def drain(self):
+        """Wait for the running folds to finish."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def metrics(self):
+        return {"folds": self.folds, "failures": self.failures, "running": len(self._tasks)}
+
+summarizer = BackgroundSummarizer()
@@ -0,0 +1,22 @@
+import functools
+
+# Tokenizer used by the gpt-3.5-turbo / gpt-4 family and the ada-002 embeddings
+ENCODING_NAME = "cl100k_base"
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    import tiktoken
+    return tiktoken.get_encoding(ENCODING_NAME)
+
+@functools.lru_cache(maxsize=16384)
+def count_tokens(text):
+    """
+    Count the tokens in a piece of text, caching the result per distinct text.
+
+    Falls back to a four-characters-per-token estimate when the tokenizer
+    cannot be loaded.
+    """
+    try:
+        return len(_encoding().encode(text))
+    except Exception:
+        return len(text) // 4
@@ -0,0 +1,170 @@
+import os
+import math
+import time
+import threading
+import numpy as np
+import faiss
+
+# FAISS index type of stored documents: auto, flat, ivf_flat, hnsw or ivf_pq
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "auto")
+# With "auto", documents with fewer chunks keep the exact flat index
+VECTOR_INDEX_FLAT_MAX = int(os.getenv("VECTOR_INDEX_FLAT_MAX", "20000"))
+# With "auto", documents with at least this many chunks are compressed with IVF-PQ
+VECTOR_INDEX_PQ_MIN = int(os.getenv("VECTOR_INDEX_PQ_MIN", "1000000"))
+# Inverted lists of IVF indexes; 0 picks 4 * sqrt(chunks)
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", "0"))
+# Inverted lists scanned per query
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "32"))
+# Neighbours per node of HNSW indexes
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+# Candidate list size of HNSW while building and while searching
+VECTOR_INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", "80"))
+VECTOR_INDEX_HNSW_EF_SEARCH = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "64"))
+# Bytes per vector of IVF-PQ codes; 0 picks a quarter of the dimension
+VECTOR_INDEX_PQ_BYTES = int(os.getenv("VECTOR_INDEX_PQ_BYTES", "0"))
+# Vectors sampled to train IVF and PQ indexes
+VECTOR_INDEX_TRAIN_SIZE = int(os.getenv("VECTOR_INDEX_TRAIN_SIZE", "100000"))
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# k-means wants at least this many training vectors per centroid
+_MIN_POINTS_PER_CENTROID = 39
+# Centroids per PQ sub-quantizer (8-bit codes)
+_PQ_CENTROIDS = 256
+_ADD_BATCH_SIZE = 65536
+
+def _pq_bytes(dimension, target):
+    # PQ splits the vector into equal parts, so the code size must divide the dimension
+    target = max(1, min(dimension, target or dimension // 4))
+    return max(m for m in range(1, target + 1) if dimension % m == 0)
+
+def tune(index, nprobe=VECTOR_INDEX_NPROBE, ef_search=VECTOR_INDEX_HNSW_EF_SEARCH):
+    """Apply the search-time parameters to a built or loaded index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    return index
+
+def index_type(index):
+    """Name of the index type of a FAISS index, one of INDEX_TYPES."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return "ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"
+    return "flat"
+
+class VectorIndexBuilder:
+    """
+    Turns the exact flat index built during ingestion into the configured FAISS index.
+
+    Chunks are embedded and added to a flat L2 index as they are ingested;
+    once a document is complete its vectors are moved into an IVF-Flat, HNSW
+    or IVF-PQ index, with IVF centroids and PQ codebooks trained on a random
+    sample of at most `train_size` vectors. With "auto", the type follows the
+    number of chunks: small documents stay exact, large ones get IVF-Flat and
+    very large ones IVF-PQ, whose codes take a fraction of the memory. A type
+    that needs more vectors to train than the document has falls back to flat,
+    which is exact and fast at that size.
+    """
+
+    def __init__(self, kind=VECTOR_INDEX_TYPE, flat_max=VECTOR_INDEX_FLAT_MAX, pq_min=VECTOR_INDEX_PQ_MIN,
+                 nlist=VECTOR_INDEX_NLIST, hnsw_m=VECTOR_INDEX_HNSW_M,
+                 ef_construction=VECTOR_INDEX_HNSW_EF_CONSTRUCTION, pq_bytes=VECTOR_INDEX_PQ_BYTES,
+                 train_size=VECTOR_INDEX_TRAIN_SIZE):
+        if kind != "auto" and kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown VECTOR_INDEX_TYPE {kind!r}; expected auto or one of {', '.join(INDEX_TYPES)}")
+        self.kind = kind
+        self.flat_max = flat_max
+        self.pq_min = pq_min
+        self.nlist = nlist
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.pq_bytes = pq_bytes
+        self.train_size = train_size
+        self._lock = threading.Lock()
+        self.builds = {kind: 0 for kind in INDEX_TYPES if kind != "flat"}
+        self.fallbacks = 0
+        self.build_seconds = 0.0
+
+    def choose(self, count):
+        """Index type for a document of `count` chunks."""
+        if self.kind != "auto":
+            return self.kind
+        if count < self.flat_max:
+            return "flat"
+        return "ivf_pq" if count >= self.pq_min else "ivf_flat"
+
+    def _factory_key(self, kind, count, dimension):
+        if kind == "hnsw":
+            return f"HNSW{self.hnsw_m},Flat"
+        sample = min(count, self.train_size)
+        if kind == "ivf_pq" and sample < _PQ_CENTROIDS * _MIN_POINTS_PER_CENTROID:
+            return None
+        nlist = self.nlist or int(4 * math.sqrt(count))
+        nlist = min(nlist, sample // _MIN_POINTS_PER_CENTROID)
+        if nlist < 2:
+            return None
+        if kind == "ivf_pq":
+            return f"IVF{nlist},PQ{_pq_bytes(dimension, self.pq_bytes)}x8"
+        return f"IVF{nlist},Flat"
+
+    def build(self, vectors, kind=None):
+        """
+        Build an index of type `kind` (by default chosen by size) holding `vectors`, in order.
+
+        Returns None when the type cannot be trained on so few vectors.
+        """
+        count, dimension = vectors.shape
+        kind = kind or self.choose(count)
+        if kind == "flat":
+            index = faiss.IndexFlatL2(dimension)
+        else:
+            key = self._factory_key(kind, count, dimension)
+            if key is None:
+                return None
+            index = faiss.index_factory(dimension, key, faiss.METRIC_L2)
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efConstruction = self.ef_construction
+        if not index.is_trained:
+            sample = np.random.default_rng(0).choice(count, size=min(count, self.train_size), replace=False)
+            index.train(np.ascontiguousarray(vectors[np.sort(sample)]))
+        for start in range(0, count, _ADD_BATCH_SIZE):
+            index.add(np.ascontiguousarray(vectors[start:start + _ADD_BATCH_SIZE]))
+        return tune(index)
+
+    def convert(self, vectorstore):
+        """
+        Replace the flat index of a LangChain FAISS vector store with the configured index type.
+
+        Positions are kept, so the store's docstore mapping stays valid. Returns
+        the type of the resulting index.
+        """
+        index = vectorstore.index
+        kind = self.choose(index.ntotal)
+        if kind == "flat" or not isinstance(index, faiss.IndexFlat):
+            return index_type(index)
+        # Read the flat index's vectors in place instead of copying them out
+        vectors = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+        start = time.perf_counter()
+        converted = self.build(vectors, kind)
+        with self._lock:
+            self.build_seconds += time.perf_counter() - start
+            if converted is None:
+                self.fallbacks += 1
+                return "flat"
+            self.builds[kind] += 1
+        vectorstore.index = converted
+        return kind
+
+    def metrics(self):
+        return {
+            "index_type": self.kind,
+            "builds": dict(self.builds),
+            "fallbacks_to_flat": self.fallbacks,
+            "build_seconds": round(self.build_seconds, 3)
+        }
+
+vector_index = VectorIndexBuilder()
@@ -0,0 +1,57 @@
+"""
+Throughput of /generate_batch against one /generate call per prompt.
+
+Sends a sample of the prompts one at a time over HTTP, as offline jobs used
+to, then all of them in a single NDJSON /generate_batch request, and compares
+prompts per second. The stub server can fail a fraction of calls
+(--error-rate) to exercise retries and per-item error reporting.
+
+    python bench_batch.py --prompts 2000 --latency-ms 200
+"""
+import json
+import time
+import argparse
+import httpx
+from harness import stub_openai_server, langchain_app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=2000)
+    parser.add_argument("--sequential-sample", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    prompts = [{"id": f"prompt-{i}", "query": f"Write a one-line summary of topic {i}"} for i in range(args.prompts)]
+    with stub_openai_server(latency_ms=args.latency_ms, STUB_ERROR_RATE=args.error_rate) as stub_url:
+        with langchain_app(stub_url, BATCH_CONCURRENCY=args.concurrency) as app_url:
+            with httpx.Client(base_url=app_url, timeout=None) as http:
+                start = time.perf_counter()
+                sequential_failed = 0
+                for prompt in prompts[:args.sequential_sample]:
+                    if http.post("/generate", json={"query": prompt["query"]}).status_code != 200:
+                        sequential_failed += 1
+                sequential = args.sequential_sample / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                first_result = None
+                results = []
+                body = "".join(json.dumps(prompt) + "\n" for prompt in prompts)
+                headers = {"Content-Type": "application/x-ndjson"}
+                with http.stream("POST", "/generate_batch", content=body, headers=headers) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        if line:
+                            first_result = first_result or time.perf_counter() - start
+                            results.append(json.loads(line))
+                elapsed = time.perf_counter() - start
+
+    summary = results[-1]
+    print(f"{'mode':>10} {'prompts':>8} {'failed':>7} {'prompts/s':>10}")
+    print(f"{'sequential':>10} {args.sequential_sample:>8} {sequential_failed:>7} {sequential:>10.1f}")
+    print(f"{'batch':>10} {summary['total']:>8} {summary['failed']:>7} {summary['total'] / elapsed:>10.1f}")
+    print(f"\nBatch speedup: {summary['total'] / elapsed / sequential:.1f}x, first result after {first_result * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Request coalescing benchmark for /chat and /chat/stream.
+
+Sends bursts of identical concurrent requests (a popular prompt arriving many
+times in the same second) with REQUEST_COALESCING=off and =on, and reports the
+upstream model calls, latency and, for streams, whether every client received
+the complete token stream.
+
+    python bench_coalescing.py --burst 50 --bursts 5
+"""
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+from harness import stub_openai_server, langchain_app
+
+async def _request(http, endpoint, query):
+    start = time.perf_counter()
+    if not endpoint.endswith("/stream"):
+        response = await http.post(endpoint, json={"query": query})
+        response.raise_for_status()
+        return time.perf_counter() - start, None
+    tokens = []
+    async with http.stream("POST", endpoint, json={"query": query}) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event == "token":
+                tokens.append(line)
+    return time.perf_counter() - start, len(tokens)
+
+async def _run(app_url, endpoint, burst, bursts):
+    latencies = []
+    token_counts = set()
+    async with httpx.AsyncClient(base_url=app_url, timeout=120) as http:
+        for i in range(bursts):
+            results = await asyncio.gather(
+                *(_request(http, endpoint, f"What is the most popular question number {i}?") for _ in range(burst))
+            )
+            for latency, tokens in results:
+                latencies.append(latency)
+                token_counts.add(tokens)
+        metrics = (await http.get("/metrics")).json()["coalescing"]
+    return latencies, token_counts, metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':>13} {'coalescing':>10} {'requests':>9} {'model calls':>12} {'p50 ms':>8} {'p95 ms':>8} {'tokens/client':>14}")
+    with stub_openai_server(latency_ms=args.latency_ms) as stub_url:
+        for mode in ("off", "on"):
+            with langchain_app(stub_url, REQUEST_COALESCING=mode) as app_url:
+                for endpoint in ("/chat", "/chat/stream"):
+                    calls_before = httpx.get(f"{stub_url}/stats").json()["chat_completions"]
+                    latencies, token_counts, metrics = asyncio.run(_run(app_url, endpoint, args.burst, args.bursts))
+                    calls = httpx.get(f"{stub_url}/stats").json()["chat_completions"] - calls_before
+                    latencies.sort()
+                    tokens = ",".join(str(count) for count in sorted(token_counts, key=str)) if endpoint.endswith("/stream") else "-"
+                    print(f"{endpoint:>13} {mode:>10} {len(latencies):>9} {calls:>12} "
+                          f"{statistics.median(latencies) * 1000:>8.0f} "
+                          f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000:>8.0f} {tokens:>14}")
+                print(f"{'':>13} {mode:>10} calls saved: {metrics['calls_saved']}, streams saved: {metrics['streams_saved']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Concurrency benchmark for the LangChain API.
+
+Starts the stub OpenAI server with a fixed per-call latency, then fires batches
+of concurrent requests at an endpoint and reports throughput per concurrency
+level. With the event loop free during LLM calls, throughput grows roughly
+linearly with the number of clients instead of staying flat.
+
+    python bench_concurrency.py --endpoint /chat --latency-ms 500
+"""
+import time
+import asyncio
+import argparse
+import httpx
+from harness import stub_openai_server, langchain_app
+
+async def _run_level(base_url, endpoint, clients, requests_per_client):
+    latencies = []
+
+    async def client(http):
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            response = await http.post(endpoint, json={"query": f"benchmark question {i}"})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", default="/chat")
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    args = parser.parse_args()
+
+    with stub_openai_server(latency_ms=args.latency_ms) as stub_url:
+        with langchain_app(stub_url) as app_url:
+            print(f"{'clients':>8} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+            for level in [int(x) for x in args.levels.split(",")]:
+                result = asyncio.run(_run_level(app_url, args.endpoint, level, args.requests_per_client))
+                print(f"{result['clients']:>8} {result['requests']:>9} {result['throughput']:>8.2f} "
+                      f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
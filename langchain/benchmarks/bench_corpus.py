@@ -0,0 +1,88 @@
+"""
+Corpus ingestion benchmark for POST /corpus.
+
+Builds a synthetic corpus of many small text files as a tar.gz, uploads it
+with CORPUS_WORKERS set to each of the given worker counts, polls the job until
+it is done and reports files and chunks per second and the speedup over one
+worker. Each run uses a fresh embedding cache and document store, so every
+run splits and embeds the whole corpus. Splitting only scales with workers up
+to the number of cores of the machine running the API.
+
+    python bench_corpus.py --files 10000 --workers 1,2,4,8
+"""
+import io
+import os
+import time
+import random
+import tarfile
+import argparse
+import tempfile
+import httpx
+from harness import stub_openai_server, langchain_app
+
+WORDS = (
+    "the of and to in is was for on that with as by at from it an be this are which or his her "
+    "corpus index vector search document query model token embedding chunk split batch process "
+    "river mountain city history science music garden market winter summer ocean forest signal"
+).split()
+
+def build_corpus(path, files, words_per_file, seed=0):
+    rng = random.Random(seed)
+    with tarfile.open(path, "w:gz") as archive:
+        for i in range(files):
+            paragraphs = []
+            remaining = words_per_file
+            while remaining > 0:
+                count = min(remaining, rng.randint(40, 120))
+                paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(count)) + ".")
+                remaining -= count
+            data = "\n\n".join(paragraphs).encode("utf-8")
+            info = tarfile.TarInfo(f"docs/{i // 1000:02d}/doc-{i:05d}.txt")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+def ingest(app_url, corpus_path):
+    with httpx.Client(base_url=app_url, timeout=600) as http:
+        start = time.perf_counter()
+        with open(corpus_path, "rb") as f:
+            response = http.post("/corpus", files=[("files", ("corpus.tar.gz", f, "application/gzip"))])
+        response.raise_for_status()
+        job = response.json()
+        while job["status"] not in ("done", "failed"):
+            time.sleep(0.2)
+            job = http.get(f"/corpus/{job['job_id']}").json()
+        if job["status"] == "failed":
+            raise RuntimeError(f"Ingestion failed: {job['error']}")
+        return time.perf_counter() - start, job
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--words-per-file", type=int, default=600)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'files':>7} {'chunks':>8} {'seconds':>8} {'files/s':>8} {'chunks/s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        corpus_path = os.path.join(corpus_dir, "corpus.tar.gz")
+        build_corpus(corpus_path, args.files, args.words_per_file)
+        baseline = None
+        with stub_openai_server(STUB_EMBEDDING_LATENCY_MS=args.embedding_latency_ms) as stub_url:
+            for workers in [int(count) for count in args.workers.split(",")]:
+                with tempfile.TemporaryDirectory() as data_dir:
+                    with langchain_app(
+                        stub_url,
+                        CORPUS_WORKERS=workers,
+                        EMBEDDING_CACHE_PATH=f"{data_dir}/embeddings.sqlite3",
+                        DOCUMENT_STORE_DIR=f"{data_dir}/documents"
+                    ) as app_url:
+                        seconds, job = ingest(app_url, corpus_path)
+                baseline = baseline or seconds
+                print(f"{workers:>8} {job['files_total']:>7} {job['chunks_indexed']:>8} {seconds:>8.1f} "
+                      f"{job['files_total'] / seconds:>8.0f} {job['chunks_indexed'] / seconds:>9.0f} "
+                      f"{baseline / seconds:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
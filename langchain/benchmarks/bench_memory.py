@@ -0,0 +1,48 @@
+"""
+Per-turn latency benchmark for /chat_with_memory over long sessions.
+
+Runs the same long conversation against the API with MEMORY_MODE=buffer (full
+transcript every turn) and MEMORY_MODE=summary (token budget with a rolling
+summary). The stub server adds latency proportional to the prompt size, so
+buffer mode slows down as the session grows while summary mode stays flat.
+
+    python bench_memory.py --turns 200
+"""
+import time
+import argparse
+import statistics
+import httpx
+from harness import stub_openai_server, langchain_app
+
+def run_session(app_url, turns):
+    latencies = []
+    with httpx.Client(base_url=app_url, timeout=120) as http:
+        for turn in range(turns):
+            start = time.perf_counter()
+            response = http.post(
+                "/chat_with_memory",
+                json={"query": f"Turn {turn}: tell me one more fact about the topic.", "session_id": "bench"}
+            )
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--latency-ms-per-1k-chars", type=float, default=10)
+    parser.add_argument("--token-budget", type=int, default=1000)
+    args = parser.parse_args()
+
+    window = max(1, args.turns // 10)
+    print(f"{'mode':>8} {'first ' + str(window) + ' ms':>14} {'last ' + str(window) + ' ms':>14} {'total s':>9}")
+    with stub_openai_server(latency_ms=args.latency_ms, STUB_LATENCY_MS_PER_1K_CHARS=args.latency_ms_per_1k_chars) as stub_url:
+        for mode in ("buffer", "summary"):
+            with langchain_app(stub_url, MEMORY_MODE=mode, MEMORY_TOKEN_BUDGET=args.token_budget) as app_url:
+                latencies = run_session(app_url, args.turns)
+            print(f"{mode:>8} {statistics.mean(latencies[:window]):>14.0f} "
+                  f"{statistics.mean(latencies[-window:]):>14.0f} {sum(latencies) / 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
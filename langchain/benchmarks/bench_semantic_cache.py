@@ -0,0 +1,100 @@
+"""
+Semantic cache benchmark for /chat.
+
+Replays a workload of repeated questions, asked in slightly different ways,
+against the API with SEMANTIC_CACHE=off and =on. Each question comes in three
+variants: the original, a lowercase copy without punctuation (an exact hit
+after normalization) and one with an extra leading word (a similarity hit).
+The stub server's embeddings are bags of words, so the similarity of the
+variants is set by the words they share rather than by their meaning; the
+threshold is chosen accordingly.
+
+    python bench_semantic_cache.py --requests 300 --threshold 0.9
+"""
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+import httpx
+from harness import stub_openai_server, langchain_app
+
+QUESTIONS = [
+    "What is the capital of France?",
+    "How does photosynthesis work in plants?",
+    "Who wrote the novel Pride and Prejudice?",
+    "Explain the theory of general relativity",
+    "What are the health benefits of green tea?",
+    "How do vaccines train the immune system?",
+    "Why is the sky blue during the day?",
+    "What causes earthquakes along fault lines?",
+    "How many planets orbit our sun?",
+    "What does a database index speed up?",
+    "Summarize the plot of Romeo and Juliet",
+    "How do I reverse a list in Python?",
+    "What is the boiling point of water at sea level?",
+    "Which ocean is the largest on Earth?",
+    "How does compound interest grow savings?",
+    "What language is spoken in Brazil?",
+    "Describe the water cycle briefly",
+    "What is machine learning used for?",
+    "How tall is Mount Everest?",
+    "Why do leaves change color in autumn?"
+]
+
+def variants(question):
+    plain = question.lower().rstrip("?").replace(",", "")
+    return [question, plain, "So, " + question]
+
+async def _replay(base_url, queries, clients):
+    latencies = []
+    queue = asyncio.Queue()
+    for query in queries:
+        queue.put_nowait(query)
+
+    async def client(http):
+        while not queue.empty():
+            query = queue.get_nowait()
+            start = time.perf_counter()
+            response = await http.post("/chat", json={"query": query})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as http:
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        metrics = (await http.get("/metrics")).json()["semantic_cache"]
+    return latencies, metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [variant for question in QUESTIONS for variant in variants(question)]
+    queries = [rng.choice(pool) for _ in range(args.requests)]
+
+    print(f"{'cache':>6} {'model calls':>12} {'mean ms':>8} {'p50 ms':>8} {'hit rate':>9} {'saved s':>8}")
+    with stub_openai_server(latency_ms=args.latency_ms, STUB_EMBEDDING_LATENCY_MS=args.embedding_latency_ms) as stub_url:
+        for mode in ("off", "on"):
+            with tempfile.TemporaryDirectory() as data_dir:
+                with langchain_app(
+                    stub_url,
+                    SEMANTIC_CACHE=mode,
+                    SEMANTIC_CACHE_THRESHOLD=args.threshold,
+                    EMBEDDING_CACHE_PATH=f"{data_dir}/embeddings.sqlite3"
+                ) as app_url:
+                    calls_before = httpx.get(f"{stub_url}/stats").json()["chat_completions"]
+                    latencies, metrics = asyncio.run(_replay(app_url, queries, args.clients))
+                    calls = httpx.get(f"{stub_url}/stats").json()["chat_completions"] - calls_before
+            print(f"{mode:>6} {calls:>12} {statistics.mean(latencies) * 1000:>8.0f} "
+                  f"{statistics.median(latencies) * 1000:>8.0f} {metrics['hit_rate']:>9.2f} "
+                  f"{metrics['latency_saved_seconds']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
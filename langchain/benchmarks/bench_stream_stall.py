@@ -0,0 +1,73 @@
+"""
+Stalled client check for /chat/stream.
+
+Calls the /chat/stream handler in-process against the stub server, reads the
+first event and then stops reading, with request coalescing off and on. Once
+the event buffer is full the run should be aborted after STREAM_STALL_TIMEOUT
+and the upstream completion closed long before it would have finished. The
+client is simulated in-process because over loopback the kernel's socket
+buffers would hold the whole stub completion and the server would never see
+a stall. Exits with an error if an upstream call is not closed.
+
+    python bench_stream_stall.py --stall-timeout 2
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import httpx
+from harness import APP_DIR, stub_openai_server
+
+async def _stall(main, stub_url, query, stall_timeout):
+    response = await main.chat_stream(main.QueryRequest(query=query))
+    events = response.body_iterator
+    await events.__anext__()
+    aborted_before = httpx.get(f"{stub_url}/stats").json()["streams_aborted"]
+    start = time.perf_counter()
+    deadline = start + 10 * stall_timeout
+    aborted = False
+    # Keep the stream open without reading from it
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+        if httpx.get(f"{stub_url}/stats").json()["streams_aborted"] > aborted_before:
+            aborted = True
+            break
+    await events.aclose()
+    return aborted, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stall-timeout", type=float, default=2)
+    parser.add_argument("--completion-words", type=int, default=2000)
+    parser.add_argument("--token-interval-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    failed = False
+    full_stream = args.completion_words * args.token_interval_ms / 1000
+    print(f"full completion: {full_stream:.0f} s")
+    print(f"{'coalescing':>10} {'aborted':>8} {'upstream ran on s':>18}")
+    with stub_openai_server(latency_ms=50, STUB_TOKEN_INTERVAL_MS=args.token_interval_ms,
+                            STUB_COMPLETION_WORDS=args.completion_words) as stub_url:
+        os.environ.update({
+            "OPENAI_API_KEY": "sk-stub",
+            "OPENAI_BASE_URL": f"{stub_url}/v1",
+            "OPENAI_API_BASE": f"{stub_url}/v1",
+            "STREAM_QUEUE_SIZE": "8",
+            "STREAM_STALL_TIMEOUT": str(args.stall_timeout)
+        })
+        sys.path.insert(0, APP_DIR)
+        os.chdir(APP_DIR)
+        import main as app_main
+
+        for mode in ("off", "on"):
+            app_main.coalescer.enabled = mode == "on"
+            aborted, ran_on = asyncio.run(
+                _stall(app_main, stub_url, f"Tell me a long story, coalescing {mode}", args.stall_timeout)
+            )
+            failed = failed or not aborted
+            print(f"{mode:>10} {str(aborted):>8} {ran_on:>18.1f}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+FAISS index type benchmark for the document store.
+
+Builds every index type of `vector_index.py` (flat, IVF-Flat, HNSW, IVF-PQ)
+over a synthetic corpus of clustered, normalized vectors, standing in for
+chunk embeddings, and reports build time, index size, single-query latency
+and recall@k against the exact flat index. Queries are perturbed copies of
+corpus vectors, so each has a real neighbourhood to find.
+
+    python bench_vector_index.py --vectors 100000 --dimension 256 --k 10
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import numpy as np
+import faiss
+from harness import APP_DIR
+
+sys.path.insert(0, APP_DIR)
+from vector_index import INDEX_TYPES, VectorIndexBuilder
+
+def synthetic_corpus(count, dimension, clusters, queries, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)]
+    vectors += 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    picks = vectors[rng.integers(count, size=queries)]
+    query_vectors = picks + 0.05 * rng.standard_normal(picks.shape).astype(np.float32)
+    faiss.normalize_L2(query_vectors)
+    return vectors, query_vectors
+
+def measure(index, queries, k):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids[0])
+    return latencies, np.array(results)
+
+def recall(results, truth, k):
+    return statistics.mean(len(set(found) & set(expected)) / k for found, expected in zip(results, truth))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors, queries = synthetic_corpus(args.vectors, args.dimension, args.clusters, args.queries)
+    builder = VectorIndexBuilder(kind="auto")
+    print(f"{args.vectors} vectors of dimension {args.dimension}, {faiss.omp_get_max_threads()} threads; "
+          f"auto picks {builder.choose(args.vectors)}")
+    print(f"{'index':>9} {'build s':>8} {'size MB':>8} {'p50 ms':>7} {'p99 ms':>7} {f'recall@{args.k}':>10}")
+
+    truth = None
+    for kind in INDEX_TYPES:
+        start = time.perf_counter()
+        index = builder.build(vectors, kind)
+        build_seconds = time.perf_counter() - start
+        size = faiss.serialize_index(index).nbytes / 1e6
+        latencies, results = measure(index, queries, args.k)
+        if truth is None:
+            truth = results
+        latencies.sort()
+        print(f"{kind:>9} {build_seconds:>8.1f} {size:>8.1f} "
+              f"{statistics.median(latencies) * 1000:>7.2f} {latencies[int(len(latencies) * 0.99)] * 1000:>7.2f} "
+              f"{recall(results, truth, args.k):>10.3f}")
+
+if __name__ == "__main__":
+    main()
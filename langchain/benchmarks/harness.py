@@ -0,0 +1,60 @@
+"""
+Helpers shared by the benchmark scripts: start the stub OpenAI server and the
+LangChain API as uvicorn subprocesses and wait for them to accept requests.
+"""
+import os
+import sys
+import time
+import subprocess
+import contextlib
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "app")
+
+STUB_PORT = int(os.getenv("STUB_PORT", "9001"))
+APP_PORT = int(os.getenv("APP_PORT", "8001"))
+
+def _wait_until_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+@contextlib.contextmanager
+def _uvicorn(module, cwd, port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=cwd,
+        env=env
+    )
+    try:
+        _wait_until_ready(f"http://127.0.0.1:{port}/")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+@contextlib.contextmanager
+def stub_openai_server(latency_ms=500, **extra_env):
+    """Run the stub OpenAI server with the given latency and yield its base URL."""
+    env = os.environ.copy()
+    env["STUB_LATENCY_MS"] = str(latency_ms)
+    env.update({key: str(value) for key, value in extra_env.items()})
+    with _uvicorn("stub_openai_server:app", BENCHMARKS_DIR, STUB_PORT, env) as url:
+        yield url
+
+@contextlib.contextmanager
+def langchain_app(stub_url, **extra_env):
+    """Run the LangChain API against the stub server and yield its base URL."""
+    env = os.environ.copy()
+    env["OPENAI_API_KEY"] = "sk-stub"
+    env["OPENAI_BASE_URL"] = f"{stub_url}/v1"
+    env["OPENAI_API_BASE"] = f"{stub_url}/v1"
+    env.update({key: str(value) for key, value in extra_env.items()})
+    with _uvicorn("main:app", APP_DIR, APP_PORT, env) as url:
+        yield url
@@ -0,0 +1,148 @@
+"""
+Minimal stand-in for the OpenAI HTTP API used by the benchmarks.
+
+Serves `/v1/chat/completions` (plain and streamed) and `/v1/embeddings` with a
+configurable artificial latency so the API can be load tested without a real key.
+
+    STUB_LATENCY_MS=500 uvicorn stub_openai_server:app --port 9001
+"""
+import os
+import re
+import time
+import json
+import asyncio
+import random
+import base64
+import hashlib
+import functools
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Time spent "thinking" before the first token is returned
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "500"))
+# Extra latency per 1,000 prompt characters, to model prompt processing time
+LATENCY_MS_PER_1K_CHARS = float(os.getenv("STUB_LATENCY_MS_PER_1K_CHARS", "0"))
+# Delay between streamed tokens
+TOKEN_INTERVAL_MS = float(os.getenv("STUB_TOKEN_INTERVAL_MS", "20"))
+# Number of words in each completion
+COMPLETION_WORDS = int(os.getenv("STUB_COMPLETION_WORDS", "20"))
+# Dimension of the returned embedding vectors
+EMBEDDING_DIM = int(os.getenv("STUB_EMBEDDING_DIM", "256"))
+# Fraction of chat completions answered with a 503 error
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+# Latency of embedding requests
+EMBEDDING_LATENCY_MS = float(os.getenv("STUB_EMBEDDING_LATENCY_MS", str(LATENCY_MS)))
+
+app = FastAPI(title="Stub OpenAI Server")
+
+stats = {"chat_completions": 0, "errors": 0, "streams_aborted": 0, "embedding_requests": 0, "embedding_inputs": 0}
+
+def _completion_words(messages):
+    last = messages[-1]["content"] if messages else ""
+    if isinstance(last, list):
+        last = " ".join(part.get("text", "") for part in last)
+    # Agents expect ReAct style output: call the calculator once, then answer
+    transcript = json.dumps(messages)
+    if "Final Answer" in transcript:
+        if "Calculator" in transcript and transcript.count("Observation:") <= 1:
+            return ["Thought:", "I", "should", "calculate.\nAction:", "Calculator\nAction", "Input:", "2", "+", "2"]
+        return ["Final", "Answer:"] + ["stub"] * COMPLETION_WORDS
+    seed = hashlib.sha256(last.encode("utf-8")).hexdigest()
+    return [seed[i % len(seed):i % len(seed) + 4] for i in range(COMPLETION_WORDS)]
+
+@functools.lru_cache(maxsize=100000)
+def _word_vector(word):
+    digest = np.frombuffer(hashlib.sha256(word.encode("utf-8")).digest(), dtype=np.uint8)
+    return (np.resize(digest, EMBEDDING_DIM).astype(np.float32) - 128) / 128
+
+def _embedding(text):
+    # Bag of words: texts sharing most of their words get similar vectors
+    words = re.findall(r"\w+", str(text).lower()) or [str(text)]
+    values = np.sum([_word_vector(word) for word in words], axis=0)
+    return (values / (np.linalg.norm(values) or 1.0)).astype(np.float32)
+
+def _encode_embedding(vector, encoding_format):
+    # The OpenAI client asks for base64 unless told otherwise, as the real API supports
+    if encoding_format == "base64":
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["chat_completions"] += 1
+    words = _completion_words(body.get("messages", []))
+    created = int(time.time())
+    model = body.get("model", "stub")
+
+    prompt_chars = len(json.dumps(body.get("messages", [])))
+    await asyncio.sleep((LATENCY_MS + LATENCY_MS_PER_1K_CHARS * prompt_chars / 1000) / 1000)
+
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Stub overloaded", "type": "server_error"}}, status_code=503)
+
+    if not body.get("stream"):
+        return JSONResponse({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)}
+        })
+
+    async def event_stream():
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": (" " if i else "") + word}, "finish_reason": None}]
+            }
+            try:
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(TOKEN_INTERVAL_MS / 1000)
+            except (asyncio.CancelledError, GeneratorExit):
+                # The caller closed the stream before the end
+                stats["streams_aborted"] += 1
+                raise
+        done = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input", [])
+    if not isinstance(inputs, list) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    stats["embedding_requests"] += 1
+    stats["embedding_inputs"] += len(inputs)
+
+    await asyncio.sleep(EMBEDDING_LATENCY_MS / 1000)
+
+    return JSONResponse({
+        "object": "list",
+        "model": body.get("model", "stub"),
+        "data": [{"object": "embedding", "index": i, "embedding": _encode_embedding(_embedding(item), body.get("encoding_format"))} for i, item in enumerate(inputs)],
+        "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}
+    })
+
+@app.get("/stats")
+async def get_stats():
+    return stats